@@ -0,0 +1,281 @@
+import connexion
+from flask import jsonify
+import logging
+import traceback
+from ..utils.messages import generic_message
+from ..db import db
+from ..db_models.site import Site
+from ..db_models.site_summary import SiteSummary
+from ..db_models.deployment_template import DeploymentTemplate
+from ..utils.deployment_engine import compile_template, TemplateError
+from ..utils.conditional import conditional_get
+
+
+def _template_fields(request_json, template=None):
+    """
+    Validated (name, description, steps, is_default) from a request body;
+    values missing from the body keep those of `template`. Raises
+    TemplateError with a client message when invalid.
+    """
+    name = request_json.get("name", template.name if template else None)
+    description = request_json.get("description", template.description if template else None)
+    steps = request_json.get("steps", template.steps if template else None)
+    is_default = request_json.get("is_default", template.is_default if template else False)
+
+    if not name or not isinstance(name, str):
+        raise TemplateError("name is required")
+    if not isinstance(is_default, bool):
+        raise TemplateError("is_default must be a boolean")
+    # Compiling validates the step definitions and normalizes them
+    compiled = compile_template(steps, name=name)
+    steps = [dict(step) for step in compiled.steps]
+    return name, description, steps, is_default
+
+
+def deployment_progress_get():  # noqa: E501
+    """Get deployment progress across all sites
+
+    Aggregated from the site_summary progress/current_step columns with one
+    GROUP BY query, instead of fetching every site's deployment page.
+
+    :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
+    """
+    result = 400
+    payload = {"message": generic_message}
+
+    try:
+        not_modified, headers = conditional_get((SiteSummary.__tablename__,))
+        if not_modified:
+            return not_modified
+
+        rows = SiteSummary.deployment_progress()
+        if rows is None:
+            return jsonify(payload), result
+
+        sites = completed = not_started = 0
+        progress_total = 0.0
+        by_step = []
+        for current_step, step_sites, average_progress, step_completed, step_not_started in rows:
+            average_progress = float(average_progress or 0)
+            sites += step_sites
+            completed += int(step_completed or 0)
+            not_started += int(step_not_started or 0)
+            progress_total += average_progress * step_sites
+            if current_step is not None:
+                by_step.append({
+                    "current_step": current_step,
+                    "sites": step_sites,
+                    "average_progress": round(average_progress, 1),
+                })
+        by_step.sort(key=lambda step: (-step["sites"], step["current_step"]))
+
+        payload = {
+            "message": "Success",
+            "data": {
+                "sites": sites,
+                "average_progress": round(progress_total / sites, 1) if sites else 0,
+                "completed": completed,
+                "in_progress": sites - completed - not_started,
+                "not_started": not_started,
+                "by_step": by_step,
+            },
+        }
+        return jsonify(payload), 200, headers
+
+    except Exception as error:
+        logging.error(f"[deployment_progress_get] Error: {error}\n{traceback.format_exc()}")
+        result = 500
+        payload = {"message": generic_message}
+
+    return jsonify(payload), result
+
+
+def deployment_templates_get():  # noqa: E501
+    """Get the deployment step templates
+
+     # noqa: E501
+
+    :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
+    """
+    result = 400
+    payload = {"message": generic_message}
+
+    try:
+        not_modified, headers = conditional_get((DeploymentTemplate.__tablename__,))
+        if not_modified:
+            return not_modified
+
+        templates = DeploymentTemplate.get_all()
+        if templates is None:
+            return jsonify(payload), result
+
+        payload = {"message": "Success", "data": [template.to_dict() for template in templates]}
+        return jsonify(payload), 200, headers
+
+    except Exception as error:
+        logging.error(f"[deployment_templates_get] Error: {error}\n{traceback.format_exc()}")
+        result = 500
+        payload = {"message": generic_message}
+
+    return jsonify(payload), result
+
+
+def deployment_templates_post(body):  # noqa: E501
+    """Create a deployment step template
+
+     # noqa: E501
+
+    :param body: {"name", "description", "steps", "is_default"}
+    :type body: dict | bytes
+
+    :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
+    """
+    result = 400
+    payload = {"message": generic_message}
+
+    try:
+        request_json = connexion.request.get_json() if connexion.request.is_json else (body or {})
+
+        try:
+            name, description, steps, is_default = _template_fields(request_json)
+        except TemplateError as error:
+            payload = {"message": str(error)}
+            return jsonify(payload), result
+
+        template = DeploymentTemplate(name, steps, description=description, is_default=is_default)
+        created = template.create_row(commit=False)
+        if created is None:
+            payload = {"message": f"A template named '{name}' already exists"}
+            return jsonify(payload), 409
+        if not created:
+            return jsonify(payload), result
+
+        if is_default:
+            DeploymentTemplate.clear_default(except_id=template.id)
+        db.session.commit()
+
+        logging.info(f"[deployment_templates_post] Created template id={template.id} name={name}")
+        payload = {"message": "Template created successfully", "data": template.to_dict()}
+        result = 200
+
+    except Exception as error:
+        db.session.rollback()
+        logging.error(f"[deployment_templates_post] Error: {error}\n{traceback.format_exc()}")
+        result = 500
+        payload = {"message": generic_message}
+
+    return jsonify(payload), result
+
+
+def deployment_templates_id_put(id, body):  # noqa: E501
+    """Update a deployment step template
+
+    Every update bumps the template version; sites using it are validated
+    against the new steps from their next save on.
+
+    :param id: Template ID
+    :type id: int
+    :param body: any of {"name", "description", "steps", "is_default"}
+    :type body: dict | bytes
+
+    :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
+    """
+    result = 400
+    payload = {"message": generic_message}
+
+    try:
+        request_json = connexion.request.get_json() if connexion.request.is_json else (body or {})
+
+        template = DeploymentTemplate.get_by_id(id)
+        if not template:
+            payload = {"message": "Template not found"}
+            return jsonify(payload), 404
+
+        try:
+            name, description, steps, is_default = _template_fields(request_json, template)
+        except TemplateError as error:
+            payload = {"message": str(error)}
+            return jsonify(payload), result
+
+        if template.is_default and not is_default:
+            payload = {"message": "Make another template the default instead"}
+            return jsonify(payload), result
+
+        template.name = name
+        template.description = description
+        template.steps = steps
+        template.is_default = is_default
+        if is_default:
+            DeploymentTemplate.clear_default(except_id=template.id)
+
+        updated = template.update_row()
+        if updated is None:
+            payload = {"message": f"A template named '{name}' already exists"}
+            return jsonify(payload), 409
+        if not updated:
+            return jsonify(payload), result
+
+        logging.info(f"[deployment_templates_id_put] Updated template id={template.id} to version {template.version}")
+        payload = {"message": "Template updated successfully", "data": template.to_dict()}
+        result = 200
+
+    except Exception as error:
+        db.session.rollback()
+        logging.error(f"[deployment_templates_id_put] Error: {error}\n{traceback.format_exc()}")
+        result = 500
+        payload = {"message": generic_message}
+
+    return jsonify(payload), result
+
+
+def site_deployment_template_put(site_id, body):  # noqa: E501
+    """Choose the deployment step template of a site
+
+    :param site_id: Site ID
+    :type site_id: int
+    :param body: {"template_id": int or null for the default template}
+    :type body: dict | bytes
+
+    :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
+    """
+    result = 400
+    payload = {"message": generic_message}
+
+    try:
+        request_json = connexion.request.get_json() if connexion.request.is_json else (body or {})
+        if "template_id" not in request_json:
+            payload = {"message": "template_id is required"}
+            return jsonify(payload), result
+
+        site = Site.get_by_id(site_id)
+        if not site:
+            payload = {"message": "Site not found"}
+            return jsonify(payload), 404
+
+        template_id = request_json.get("template_id")
+        if template_id is not None:
+            try:
+                template_id = int(template_id)
+            except (TypeError, ValueError):
+                payload = {"message": "Invalid template_id"}
+                return jsonify(payload), result
+            if not DeploymentTemplate.get_by_id(template_id):
+                payload = {"message": "Template not found"}
+                return jsonify(payload), 404
+
+        site.deployment_template_id = template_id
+        if not site.update_row():
+            return jsonify(payload), result
+
+        logging.info(f"[site_deployment_template_put] Site {site_id} now uses template {template_id}")
+        payload = {"message": "Deployment template updated successfully",
+                   "data": {"site_id": site.id, "template_id": template_id}}
+        result = 200
+
+    except Exception as error:
+        db.session.rollback()
+        logging.error(f"[site_deployment_template_put] Error: {error}\n{traceback.format_exc()}")
+        result = 500
+        payload = {"message": generic_message}
+
+    return jsonify(payload), result
@@ -9,7 +9,9 @@ from ..db import db
 from ..db_models.go_live_data import GoLiveData
 from ..db_models.site import Site
 from ..db_models.user import User
+from ..utils.principals import get_principal_by_id
 from ..db_models.procurement_data import ProcurementData
+from ..utils.site_summary import refresh_site_summary
 
 # TODO: Define role constants - these should match your role system
 # Assuming: 1=Admin, 2=Operations Manager, 3=Deployment Engineer
@@ -26,7 +28,7 @@ def get_current_user():
     user_id = request.headers.get('X-User-Id')  # Placeholder
     if user_id:
         try:
-            return User.get_by_id(int(user_id))
+            return get_principal_by_id(int(user_id))
         except:
             return None
     return None
@@ -228,6 +230,7 @@ def site_go_live_activate(site_id, body):  # noqa: E501
         # Update site status to 'live'
         site.status = 'live'
         try:
+            refresh_site_summary(site.id)
             site.update_row()
         except Exception as site_error:
             db.session.rollback()
@@ -350,6 +353,7 @@ def site_go_live_deactivate(site_id, body):  # noqa: E501
         # Update site status back to 'procurement_done'
         site.status = 'procurement_done'
         try:
+            refresh_site_summary(site.id)
             site.update_row()
         except Exception as site_error:
             db.session.rollback()
@@ -6,6 +6,7 @@ from flask import jsonify
 from ..models.organization_request import OrganizationRequest  # noqa: E501
 from ..db_models.organization import Organization
 from ..utils import messages, transform_data
+from ..utils.conditional import conditional_get
 
 
 
@@ -36,12 +37,17 @@ def organization_get(organization_id=None):  # noqa: E501
     result = 400
 
     try:
+        not_modified, headers = conditional_get(("organization",))
+        if not_modified:
+            return not_modified
+
         # When no organization_id is provided OR it is "all", return all organizations
         if organization_id is None or str(organization_id).lower() == "all":
             orgs = Organization.get_all_orgs() or []
             all_orgs = transform_data.transform_orgs(orgs)
             payload = {"message": "details fetched succesfully", "data": all_orgs}
             result = 200
+            return jsonify(payload), result, headers
         else:
             # For specific organization, ensure we have a valid integer ID
             try:
@@ -55,6 +61,7 @@ def organization_get(organization_id=None):  # noqa: E501
 
             payload = {"message": "details fetched succesfully", "data": _org}
             result = 200
+            return jsonify(payload), result, headers
 
     except Exception as error:
         print(error)
@@ -7,6 +7,7 @@ from ..config import Config
 from flask_mail import Mail, Message
 from ..db_models.user import User
 from ..utils.common_functions import get_user_details
+from ..utils.cache import get_cache
 import random
 import time
 import logging
@@ -19,13 +20,15 @@ flask_app = app.app
 flask_app.config.from_object(Config)
 mail = Mail(flask_app)
 
-# In-memory store for demo — replace with Redis in production
-otp_store = {"sarthakg35@gmail.com": {"otp": "123456", "timestamp": time.time()}}
+OTP_EXPIRY_SECONDS = 300
+
+# Shared across workers when CACHE_BACKEND=redis; entries expire on their own
+otp_store = get_cache("otp", maxsize=10000, ttl=OTP_EXPIRY_SECONDS)
 
 def generate_otp(email):
     """Generate a 6-digit OTP and store it with timestamp."""
     otp = str(random.randint(100000, 999999))
-    otp_store[email] = {"otp": otp, "timestamp": time.time()}
+    otp_store.set(email, {"otp": otp, "timestamp": time.time()})
     return otp
 
 
@@ -139,21 +142,18 @@ def send_otp_post(body):  # noqa: E501
 
 dummy_emails = ['sarthak@gmail.com','madhu@gmail.com']
 
-def verify_otp(email,otp,expiry=300):
-    record = otp_store.get(email)
+def verify_otp(email,otp,expiry=OTP_EXPIRY_SECONDS):
+    # Consumed atomically: of concurrent verifications only one gets the
+    # record, and a wrong guess uses it up as well
+    record = otp_store.pop(email)
 
     if not record:
         return False
     
     if time.time() - record["timestamp"] > expiry:
-        otp_store.pop(email,None)
         return False
     
-    if record["otp"] == otp:
-        otp_store.pop(email,None)
-        return True
-    
-    return False
+    return record["otp"] == otp
         
 def verify_otp_post(body):  # noqa: E501
     """verify otp
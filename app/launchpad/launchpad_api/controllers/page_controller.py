@@ -2,26 +2,37 @@ import connexion
 import json
 import traceback
 import logging
-from flask import jsonify
+import itertools
+from flask import jsonify, Response, stream_with_context
+from flask import json as flask_json
 from ..models.page_request import PageRequest  # noqa: E501
 from ..utils import messages ,transform_data
 from ..utils.deployment_utils import (
-    get_default_steps,
     parse_steps_field,
-    validate_step,
-    validate_step_progression,
-    calculate_progress,
-    are_all_steps_completed,
     validate_notes_field,
     validate_installation_fields
 )
+from ..utils.deployment_engine import get_template, get_site_template, EMPTY_CHECKLIST
 from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import defer
 
 from ..db_models.site import Site
 from ..db_models.page import Page
 from ..db_models.section import Section
 from ..db import db
 from ..db_models.fields import Field
+from ..utils.site_summary import refresh_site_summary
+from ..utils.conditional import conditional_get
+from ..utils.queries import get_page_rows, iter_site_page_rows, get_page_rows_for_sites
+from ..utils.cache_hooks import record_change
+from ..utils.json_patch import (
+    load_document,
+    apply_json_patch,
+    apply_merge_patch,
+    JsonPatchError,
+    JsonPatchConflict
+)
 
 
 def page_delete(page_id):  # noqa: E501
@@ -37,42 +48,39 @@ def page_delete(page_id):  # noqa: E501
     return 'do some magic!'
 
 
-def create_page_response(page, sections, fields):
+def create_page_response(rows):
     """
     Build a structured response for a page with its sections and fields.
 
     Args:
-        page: Page model instance
-        sections: list of Section model instances
-        fields: list of Field model instances
+        rows: (site_id, Page, Section, Field) rows of a single page from
+              get_page_rows() / iter_site_page_rows(), ordered by section
+              then field
 
     Returns:
         dict: Serialized page data including sections and their fields
     """
     # Transform page
-    page_data = transform_data.transform_page(page)
-
-    # Prepare mapping of section_id → fields
-    section_fields_map = {}
-    for field in fields or []:
-        section_id = getattr(field, "section_id", None)
-        if section_id not in section_fields_map:
-            section_fields_map[section_id] = []
-        section_fields_map[section_id].append(transform_data.transform_field(field))
+    page_data = transform_data.transform_page(rows[0][1])
 
-    # Transform sections and attach their fields
+    # Rows arrive grouped by section, so each section is built in one pass
     sections_data = []
-    for section in sections or []:
-        section_data = transform_data.transform_section(section)
-        section_data["fields"] = section_fields_map.get(section_data["section_id"], [])
-        sections_data.append(section_data)
+    section_data = None
+    for _, _, section, field in rows:
+        if section is None:
+            continue
+        if section_data is None or section_data["section_id"] != section.id:
+            section_data = transform_data.transform_section(section)
+            section_data["fields"] = []
+            sections_data.append(section_data)
+        if field is not None:
+            section_data["fields"].append(transform_data.transform_field(field))
 
     # Final structured page response
     page_data["sections"] = sections_data
 
     return page_data
 
-
 def page_get(page_name, site_id):  # noqa: E501
     """Get list of pages
 
@@ -105,10 +113,21 @@ def page_get(page_name, site_id):  # noqa: E501
             result = 400
             payload = {"message": "Invalid Site ID"}
             return jsonify(payload), result
+
+        not_modified, headers = conditional_get(("site", "page", "section", "field"))
+        if not_modified:
+            return not_modified
         
-        # First verify the site exists
-        site = Site.get_by_id(site_id_int)
-        if not site:
+        # Site, page, sections and fields in a single round trip
+        rows = get_page_rows(site_id_int, page_name)
+
+        if rows is None:
+            logging.error(f"[page_get] Error fetching page_name={page_name}, site_id={site_id_int}")
+            result = 500
+            payload = {"message":"Error fetching page"}
+            return jsonify(payload),result
+
+        if not rows:
             logging.warning(f"[page_get] Site not found: site_id={site_id_int}")
             result = 404
             payload = {"message": "Site not found"}
@@ -116,56 +135,20 @@ def page_get(page_name, site_id):  # noqa: E501
         
         # Use the validated integer site_id for the page lookup
         site_id = site_id_int
-        
-        # Then check if the page exists
-        page = Page.get_by_siteid_and_pagename(site_id, page_name)
 
-        if not page:
+        if rows[0][1] is None:
             logging.warning(f"[page_get] Page not found: page_name={page_name}, site_id={site_id}")
             result = 404
             payload = {"message": f"Page '{page_name}' not found for site {site_id}"}
             return jsonify(payload), result
-        
-        logging.info(f"[page_get] Found page id={page.id}, fetching sections...")
-        
-        sections = Section.get_by_pageid(page.id)
-        
-        # Handle None (error) vs empty list (no sections yet - valid state)
-        if sections is None:
-            logging.error(f"[page_get] Error fetching sections for page_id={page.id}")
-            result = 500
-            payload = {"message":"Error fetching sections"}
-            return jsonify(payload),result
-        
-        logging.info(f"[page_get] Found {len(sections)} sections for page_id={page.id}")
-        
-        # If no sections, return page with empty sections array (valid state)
-        if not sections:
-            page_data = transform_data.transform_page(page)
-            page_data["sections"] = []
-            payload = {"message":"Succesfully fetched the data","data":page_data}
-            result = 200
-            return jsonify(payload),result
 
-        section_ids = [section.id for section in sections]
-        logging.info(f"[page_get] Fetching fields for section_ids={section_ids}")
-
-        fields = Field.get_by_section_ids(section_ids)
-        
-        # Handle None (error) vs empty list (no fields yet - valid state)
-        if fields is None:
-            logging.error(f"[page_get] Error fetching fields for section_ids={section_ids}")
-            result = 500
-            payload = {"message":"Error fetching fields"}
-            return jsonify(payload),result
-        
-        logging.info(f"[page_get] Found {len(fields)} fields across {len(sections)} sections")
-        
-        # Even if no fields, return the page with sections (fields can be empty arrays)
-        page_data = create_page_response(page,sections,fields or [])
+        # Sections and fields can be empty (valid state)
+        page_data = create_page_response(rows)
+        logging.info(f"[page_get] Found {len(page_data['sections'])} sections for page_id={page_data['page_id']}")
 
         payload = {"message":"Succesfully fetched the data","data":page_data}
         result = 200
+        return jsonify(payload),result,headers
 
         
     except Exception as error:
@@ -177,6 +160,147 @@ def page_get(page_name, site_id):  # noqa: E501
 
     return jsonify(payload),result
 
+def site_pages_get(site_id, pages=None):  # noqa: E501
+    """Get every page of a site with its sections and fields
+
+     # noqa: E501
+
+    Replaces one page_get call per page. All pages come from a single query
+    and the JSON body is streamed page by page as rows arrive.
+
+    :param site_id: 
+    :type site_id: int
+    :param pages: Optional comma separated page names to restrict to
+    :type pages: str
+
+    :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
+    """
+
+    result = 400
+    payload = {"message":messages.generic_message}
+
+    try:
+        logging.info(f"[site_pages_get] Fetching pages={pages}, site_id={site_id}")
+
+        try:
+            site_id = int(site_id)
+        except (TypeError, ValueError):
+            result = 400
+            payload = {"message": "Invalid Site ID"}
+            return jsonify(payload), result
+
+        page_names = [name.strip() for name in (pages or "").split(",") if name.strip()] or None
+
+        not_modified, headers = conditional_get(("site", "page", "section", "field"))
+        if not_modified:
+            return not_modified
+
+        rows = iter_site_page_rows(site_id, page_names)
+        first = next(rows, None)
+        if first is None:
+            logging.warning(f"[site_pages_get] Site not found: site_id={site_id}")
+            result = 404
+            payload = {"message": "Site not found"}
+            return jsonify(payload), result
+
+        def generate():
+            yield '{"message":"Succesfully fetched the data","data":{"site_id":%d,"pages":[' % site_id
+            if first[1] is not None:
+                # Rows arrive grouped by page; emit each page once it is complete
+                page_rows = itertools.chain([first], rows)
+                for index, (_, group) in enumerate(itertools.groupby(page_rows, key=lambda row: row[1].id)):
+                    yield ("," if index else "") + flask_json.dumps(create_page_response(list(group)))
+            yield "]}}"
+
+        return Response(stream_with_context(generate()), status=200,
+                        mimetype="application/json", headers=headers)
+
+    except Exception as error:
+        logging.error(f"[site_pages_get] Exception: {error}")
+        logging.error(traceback.format_exc())
+        result = 500
+        payload = {"message":messages.generic_message}
+
+    return jsonify(payload),result
+
+# Upper bound on site ids accepted by page_batch_get
+MAX_BATCH_SITES = 1000
+
+
+def page_batch_get(page_name, site_ids):  # noqa: E501
+    """Get the same page for many sites
+
+     # noqa: E501
+
+    Used by dashboards that render one page (e.g. deployment) for a list of
+    sites. Backed by IN-filtered joins, chunked for long id lists.
+
+    :param page_name: Name of the page to fetch for every site
+    :type page_name: str
+    :param site_ids: Comma separated site ids
+    :type site_ids: str
+
+    :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
+    """
+
+    result = 400
+    payload = {"message":messages.generic_message}
+
+    try:
+        try:
+            ids = list(dict.fromkeys(int(value) for value in (site_ids or "").split(",") if value.strip()))
+        except ValueError:
+            result = 400
+            payload = {"message": "Invalid Site ID"}
+            return jsonify(payload), result
+
+        if not ids:
+            result = 400
+            payload = {"message": "Site IDs are required"}
+            return jsonify(payload), result
+
+        if len(ids) > MAX_BATCH_SITES:
+            result = 400
+            payload = {"message": f"At most {MAX_BATCH_SITES} site ids can be requested at once"}
+            return jsonify(payload), result
+
+        logging.info(f"[page_batch_get] Fetching page_name={page_name} for {len(ids)} sites")
+
+        not_modified, headers = conditional_get(("site", "page", "section", "field"))
+        if not_modified:
+            return not_modified
+
+        rows = get_page_rows_for_sites(ids, page_name)
+        if rows is None:
+            result = 500
+            payload = {"message":"Error fetching pages"}
+            return jsonify(payload),result
+
+        pages_by_site = {}
+        for site_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+            group = list(group)
+            if group[0][1] is not None:
+                pages_by_site[site_id] = create_page_response(group)
+
+        data = {
+            "page_name": page_name,
+            "pages": [pages_by_site[site_id] for site_id in ids if site_id in pages_by_site],
+            # Sites that do not exist or have no such page
+            "not_found": [site_id for site_id in ids if site_id not in pages_by_site],
+        }
+
+        payload = {"message":"Succesfully fetched the data","data":data}
+        result = 200
+        return jsonify(payload),result,headers
+
+    except Exception as error:
+        logging.error(f"[page_batch_get] Exception: {error}")
+        logging.error(traceback.format_exc())
+        result = 500
+        payload = {"message":messages.generic_message}
+
+    return jsonify(payload),result
+
 # """
 #     In the page_post , i am making following assumptions
 #     1. It doesn't have any sections yet
@@ -201,11 +325,135 @@ def create_page(page_name,site_id):
     page_id = new_page.create_row(commit=False)
     return page_id
 
-def create_section(section_name,page_id):
-    new_section = Section(section_name,page_id)
-    section_id = new_section.create_row(commit=False)
+def stored_field_value(field_value):
+    """
+    Value as written to the field_value JSON column: JSON text from the client
+    is decoded so objects are stored as objects ({"value": x}), as page_put
+    stores them, instead of as a JSON string holding the object. Text that is
+    not JSON is stored as a plain string.
+    """
+    if isinstance(field_value, str):
+        try:
+            return json.loads(field_value)
+        except (json.JSONDecodeError, TypeError):
+            return field_value
+    return field_value
 
-    return section_id
+
+def field_error_key(section_name, field_name=None):
+    """Key of an entry in the page_post error map ("section" or "section.field")."""
+    return section_name if field_name is None else f"{section_name}.{field_name}"
+
+
+def validate_page_sections(page_name, sections, template=None):
+    """
+    Validate every section and field of a PageRequest before anything is written.
+
+    Fills in the default deployment steps where they are missing (mutating
+    `sections`), then returns a dict of error messages keyed by
+    field_error_key(); an empty dict means the whole page can be inserted.
+    Deployment steps are checked against `template` (a CompiledTemplate,
+    default: the default template).
+    """
+    if page_name == "deployment" and template is None:
+        template = get_template()
+
+    errors = {}
+    seen_sections = set()
+
+    for section in sections:
+        section_name = section.section_name
+        fields = section.fields or []
+        section.fields = fields
+
+        if not section_name:
+            errors[field_error_key("")] = "Section name is required"
+            continue
+        if section_name in seen_sections:
+            errors[field_error_key(section_name)] = f"Duplicate section '{section_name}'. Each section_name must be unique per page."
+            continue
+        seen_sections.add(section_name)
+
+        # Deployment-specific logic: Initialize default steps for deployment_checklist
+        if page_name == "deployment" and section_name == "deployment_checklist":
+            steps_field = next((field for field in fields if field.field_name == "steps"), None)
+
+            # If no steps field or empty, initialize with default steps
+            if not steps_field or not steps_field.field_value:
+                default_steps = template.default_steps()
+                if steps_field:
+                    steps_field.field_value = default_steps
+                else:
+                    from ..models.page_request_sections_inner_fields_inner import PageRequestSectionsInnerFieldsInner
+                    fields.append(PageRequestSectionsInnerFieldsInner(
+                        field_name="steps",
+                        field_value=default_steps
+                    ))
+
+        # Installation fields are validated together, once per section
+        if page_name == "deployment" and section_name == "installation":
+            installation_fields = {
+                f.field_name: f.field_value for f in fields
+                if f.field_name in ["deployment_engineer", "start_date", "target_date", "progress"]
+            }
+            is_valid, error_msg = validate_installation_fields(installation_fields)
+            if not is_valid:
+                errors[field_error_key(section_name)] = f"Invalid installation field: {error_msg}"
+
+        seen_fields = set()
+        for field in fields:
+            field_name = field.field_name
+            field_value = field.field_value
+            key = field_error_key(section_name, field_name)
+
+            if not field_name:
+                errors[key] = "Field name is required"
+                continue
+            if field_value is None:
+                errors[key] = "field_value is required"
+                continue
+            if field_name in seen_fields:
+                errors[key] = f"Duplicate field in section '{section_name}'. Each field_name must be unique per section."
+                continue
+            seen_fields.add(field_name)
+
+            # For deployment page, validate field values
+            if page_name != "deployment":
+                continue
+
+            if section_name == "deployment_checklist" and field_name == "steps":
+                steps = parse_steps_field(field_value)
+                if steps is None:
+                    errors[key] = "Invalid steps field: must be a valid JSON array"
+                    continue
+
+                evaluation = template.evaluate(steps)
+                if not evaluation.valid:
+                    errors[key] = evaluation.error
+
+            elif section_name == "testing" and field_name == "notes":
+                is_valid, notes, error_msg = validate_notes_field(field_value)
+                if not is_valid:
+                    errors[key] = f"Invalid notes field: {error_msg}"
+
+    return errors
+
+
+def checklist_evaluation(sections, template):
+    """
+    StepEvaluation of the deployment_checklist steps of a validated page, or
+    None when the page has no (non-empty) checklist.
+    """
+    if template is None:
+        return None
+    for section in sections:
+        if section.section_name != "deployment_checklist":
+            continue
+        for field in section.fields or []:
+            if field.field_name == "steps":
+                steps = parse_steps_field(field.field_value)
+                return template.evaluate(steps) if steps else None
+    return None
 
 
 def page_post(body):  # noqa: E501
@@ -213,6 +461,11 @@ def page_post(body):  # noqa: E501
 
      # noqa: E501
 
+    The whole request is validated before anything is written; on failure the
+    response carries an `errors` map keyed by "section" or "section.field".
+    Site, page, sections and fields are then inserted with batched statements
+    and committed once, so a page is either created completely or not at all.
+
     :param page_request: 
     :type page_request: dict | bytes
 
@@ -228,10 +481,21 @@ def page_post(body):  # noqa: E501
     try:
         site_id = page_request.site_id
         status = page_request.status
+        page_name = page_request.page_name
+        sections = page_request.sections or []
+
+        # Validate everything up front; nothing is written if any field fails
+        template = get_site_template(site_id) if page_name == "deployment" else None
+        errors = validate_page_sections(page_name, sections, template)
+        if errors:
+            logging.warning(f"[page_post] Validation failed for page_name={page_name}: {errors}")
+            result = 400
+            payload = {"message": next(iter(errors.values())), "errors": errors}
+            return jsonify(payload), result
+
         # check if site exists , if not create a site
         if not site_id:
             site_id = create_site(status)
-        
 
         if not site_id:
             result = 400
@@ -239,139 +503,56 @@ def page_post(body):  # noqa: E501
             return jsonify(payload),result
 
         # create a page
-        page_name = page_request.page_name
-
         page_id = create_page(page_name,site_id)
 
         if not page_id:
             result = 400
             payload = {"message":"Invalid page details"}
             return jsonify(payload),result
-        
+
+        # All sections in one INSERT, then all fields in one INSERT
+        section_ids = Section.insert_multiple([section.section_name for section in sections], page_id)
+
+        all_fields = []
+        for section in sections:
+            for field in section.fields:
+                all_fields.append({
+                    "field_name": field.field_name,
+                    "field_value": stored_field_value(field.field_value),
+                    "section_id": section_ids[section.section_name],
+                })
+        Field.insert_multiple(all_fields)
+        record_change(db.session, site_ids=[site_id], tables=(Section.__tablename__, Field.__tablename__))
+
+        fields_by_section = {}
+        for field in sorted(Field.get_by_section_ids(list(section_ids.values())) or [], key=lambda f: f.id):
+            fields_by_section.setdefault(field.section_id, []).append(field)
+
         data = {
             "site_id":site_id,
             "page_id":page_id,
             "page_name":page_name,
-            "sections":[]
+            "sections":[
+                {
+                    "section_id": section_ids[section.section_name],
+                    "section_name": section.section_name,
+                    "fields": transform_data.transform_fields(fields_by_section.get(section_ids[section.section_name], [])),
+                }
+                for section in sections
+            ]
         }
 
-        sections = page_request.sections
-
-        section_details = []
-        for section in sections:
-            section_detail = {}
-            section_name = section.section_name
-            section_id = create_section(section_name,page_id)
-            
-            if not section_id:
-                result = 400
-                payload = {"message":f"Error creating section {section_name}"}
-                return jsonify(payload),result
-            
-            section_detail = {"section_id":section_id,"section_name":section_name,"fields":[]}
-            fields = section.fields
-
-            all_fields = []
-            
-            # Deployment-specific logic: Initialize default steps for deployment_checklist
-            if page_name == "deployment" and section_name == "deployment_checklist":
-                # Check if steps field exists and is empty
-                steps_field = None
-                for field in fields:
-                    if field.field_name == "steps":
-                        steps_field = field
-                        break
-                
-                # If no steps field or empty, initialize with default steps
-                if not steps_field or not steps_field.field_value:
-                    default_steps = get_default_steps()
-                    # Create or update the steps field
-                    if steps_field:
-                        steps_field.field_value = default_steps
-                    else:
-                        # Create new field for steps
-                        from ..models.page_request_sections_inner_fields_inner import PageRequestSectionsInnerFieldsInner
-                        steps_field = PageRequestSectionsInnerFieldsInner(
-                            field_name="steps",
-                            field_value=default_steps
-                        )
-                        fields.append(steps_field)
-            
-            for field in fields:
-                field_name = field.field_name
-                field_value = field.field_value
-                
-                # For deployment page, validate field values
-                if page_name == "deployment":
-                    if section_name == "deployment_checklist" and field_name == "steps":
-                        # Validate steps field
-                        steps = parse_steps_field(field_value)
-                        if steps is None:
-                            result = 400
-                            payload = {"message": "Invalid steps field: must be a valid JSON array"}
-                            return jsonify(payload), result
-                        
-                        # Validate each step
-                        for step in steps:
-                            is_valid, error_msg = validate_step(step)
-                            if not is_valid:
-                                result = 400
-                                payload = {"message": f"Invalid step: {error_msg}"}
-                                return jsonify(payload), result
-                        
-                        # Validate step progression
-                        is_valid, error_msg = validate_step_progression(steps)
-                        if not is_valid:
-                            result = 400
-                            payload = {"message": f"Step progression error: {error_msg}"}
-                            return jsonify(payload), result
-                    
-                    elif section_name == "installation":
-                        # Validate installation fields
-                        installation_fields = {}
-                        for f in fields:
-                            if f.field_name in ["deployment_engineer", "start_date", "target_date", "progress"]:
-                                installation_fields[f.field_name] = f.field_value
-                        
-                        is_valid, error_msg = validate_installation_fields(installation_fields)
-                        if not is_valid:
-                            result = 400
-                            payload = {"message": f"Invalid installation field: {error_msg}"}
-                            return jsonify(payload), result
-                    
-                    elif section_name == "testing" and field_name == "notes":
-                        # Validate notes field
-                        is_valid, notes, error_msg = validate_notes_field(field_value)
-                        if not is_valid:
-                            result = 400
-                            payload = {"message": f"Invalid notes field: {error_msg}"}
-                            return jsonify(payload), result
-
-                new_field = {"field_name":field_name,"field_value":json.dumps(field_value) if not isinstance(field_value, str) else field_value,"section_id":section_id}
-                all_fields.append(new_field)
-
-
-            field_details = Field.create_multiple(all_fields)
-            
-            if field_details is None:
-                # IntegrityError → duplicate field name in section
-                payload = {"message": f"Duplicate field in section '{section_name}'. Each field_name must be unique per section."}
-                result = 400
-                return payload,result
-            elif field_details is False:
-                payload = {"message": f"Error inserting fields for section {section_name}"}
-                result = 400
-                return payload,result
-            
-            section_detail['fields'] = transform_data.transform_fields(field_details)
-        
-            section_details.append(section_detail)
-
-        data["sections"] = section_details
+        refresh_site_summary(site_id, deployment=checklist_evaluation(sections, template))
         db.session.commit()
         result = 200
         payload = {"message":"Page saved successfully","data":data}
 
+    except IntegrityError as error:
+        db.session.rollback()
+        logging.error(f"[page_post] IntegrityError: {error}")
+        result = 400
+        payload = {"message":"Duplicate section or field for this page"}
+
     except Exception as error:
         db.session.rollback()
         result = 400
@@ -380,6 +561,41 @@ def page_post(body):  # noqa: E501
 
     return jsonify(payload),result
 
+def resolve_field_patch(field, field_detail):
+    """
+    Replace a field's field_patch / field_merge_patch with the patched value.
+
+    Args:
+        field: request field (PageRequestSectionsInnerFieldsInner)
+        field_detail: stored Field row the patch applies to
+
+    Returns:
+        tuple: (patched, error_message, error_status); field.field_value holds
+               the new document when patched is True
+    """
+    if field.field_patch is not None and field.field_merge_patch is not None:
+        return False, f"Field {field.field_id}: send either field_patch or field_merge_patch, not both", 400
+
+    if field.field_patch is None and field.field_merge_patch is None:
+        if field.field_value is None:
+            return False, f"Field {field.field_id}: field_value, field_patch or field_merge_patch is required", 400
+        return False, None, None
+
+    current = load_document(field_detail.field_value)
+    try:
+        if field.field_patch is not None:
+            field.field_value = apply_json_patch(current, field.field_patch)
+        else:
+            field.field_value = apply_merge_patch(current, field.field_merge_patch)
+    except JsonPatchConflict as error:
+        # The client's view of the value is stale
+        return False, f"Field {field.field_id}: {error}", 409
+    except JsonPatchError as error:
+        return False, f"Field {field.field_id}: invalid patch: {error}", 400
+
+    return True, None, None
+
+
 def page_put(body):  # noqa: E501
     """Update an existing page
 
@@ -441,35 +657,74 @@ def page_put(body):  # noqa: E501
         page.update_row(False) 
         
         
-        sections = page_request.sections
+        sections = page_request.sections or []
+
+        # Prefetch every referenced section and field with one IN query each
+        section_ids = {section.section_id for section in sections}
+        field_ids = {field.field_id for section in sections for field in (section.fields or [])}
+
+        section_map = {s.id: s for s in (Section.get_by_ids(list(section_ids)) or [])}
+        field_map = {f.id: f for f in (Field.get_by_ids(list(field_ids)) or [])}
+
+        if None in section_ids or len(section_map) != len(section_ids):
+            result = 400
+            payload = {"message":"Invalid Section ID"}
+            return jsonify(payload),result
+
+        if None in field_ids or len(field_map) != len(field_ids):
+            result = 400
+            payload = {"message":"Invalid Field ID"}
+            return jsonify(payload),result
+
+        # Fields sent as a patch get their full new value computed from the
+        # stored one, so the validation below sees complete documents
+        for section in sections:
+            for field in section.fields or []:
+                patched, error_message, error_status = resolve_field_patch(field, field_map[field.field_id])
+                if error_message:
+                    result = error_status
+                    payload = {"message": error_message}
+                    return jsonify(payload), result
+                if patched:
+                    logging.info(f"[page_put] Applied patch to field_id={field.field_id}")
         
         # Deployment-specific logic: Track if we need to update progress or site status
-        deployment_steps_updated = False
-        deployment_steps = None
+        deployment_evaluation = None
+        checklist_emptied = False
         installation_progress_field = None
+        template = get_template(site.deployment_template_id) if page.page_name == "deployment" else None
+
+        # field_id -> new value, written in one batched UPDATE below
+        field_updates = {}
         
         for section in sections:
-            section_id = section.section_id
-            section_detail = Section.get_by_id(section_id)
-
-            if not section_detail:
-                result = 400
-                payload = {"message":"Invalid Section ID"}
-                return jsonify(payload),result
+            section_detail = section_map[section.section_id]
 
             section_detail.updated_at = datetime.utcnow()
             section_detail.update_row(False)
-            fields = section.fields
+            fields = section.fields or []
+
+            # Installation fields are validated together, once per section
+            if page.page_name == "deployment" and section_detail.section_name == "installation" and fields:
+                installation_fields = {}
+                for f in fields:
+                    f_detail = field_map[f.field_id]
+                    if f_detail.field_name in ["deployment_engineer", "start_date", "target_date", "progress"]:
+                        installation_fields[f_detail.field_name] = f.field_value if hasattr(f, 'field_value') else f_detail.field_value
+
+                is_valid, error_msg = validate_installation_fields(installation_fields)
+                if not is_valid:
+                    result = 400
+                    payload = {"message": f"Invalid installation field: {error_msg}"}
+                    return jsonify(payload), result
            
             for field in fields:
-                field_id = field.field_id
-                field_detail = Field.get_by_id(field_id)
-                
-                if not field_detail:
-                    result = 400
-                    payload = {"message":"Invalid Field ID"}
-                    return jsonify(payload),result
-                
+                field_detail = field_map[field.field_id]
+
+                # Handle field_value - it might be a string (JSON) or already parsed.
+                # Parsed once here; the deployment checks below reuse it
+                field_value_to_store = stored_field_value(field.field_value)
+
                 # Deployment-specific validation and processing
                 if page.page_name == "deployment":
                     section_name = section_detail.section_name
@@ -477,50 +732,29 @@ def page_put(body):  # noqa: E501
                     
                     # Validate and process deployment_checklist section
                     if section_name == "deployment_checklist" and field_name == "steps":
-                        # Parse and validate steps
-                        steps = parse_steps_field(field.field_value)
+                        steps = parse_steps_field(field_value_to_store)
                         if steps is None:
                             result = 400
                             payload = {"message": "Invalid steps field: must be a valid JSON array"}
                             return jsonify(payload), result
-                        
-                        # Validate each step
-                        for step in steps:
-                            is_valid, error_msg = validate_step(step)
-                            if not is_valid:
-                                result = 400
-                                payload = {"message": f"Invalid step: {error_msg}"}
-                                return jsonify(payload), result
-                        
-                        # Validate step progression
-                        is_valid, error_msg = validate_step_progression(steps)
-                        if not is_valid:
+
+                        # Validate, order-check and summarize in one pass
+                        evaluation = template.evaluate(steps)
+                        if not evaluation.valid:
                             result = 400
-                            payload = {"message": f"Step progression error: {error_msg}"}
+                            payload = {"message": evaluation.error}
                             return jsonify(payload), result
-                        
-                        # Store steps for progress calculation
-                        deployment_steps = steps
-                        deployment_steps_updated = True
+
+                        # Keep the evaluation for the progress update; an emptied
+                        # checklist only resets the summary's progress
+                        if steps:
+                            deployment_evaluation = evaluation
+                        else:
+                            checklist_emptied = True
                     
-                    # Validate installation section fields
-                    elif section_name == "installation":
-                        installation_fields = {}
-                        for f in fields:
-                            if f.field_id:
-                                f_detail = Field.get_by_id(f.field_id)
-                                if f_detail and f_detail.field_name in ["deployment_engineer", "start_date", "target_date", "progress"]:
-                                    installation_fields[f_detail.field_name] = f.field_value if hasattr(f, 'field_value') else f_detail.field_value
-                        
-                        is_valid, error_msg = validate_installation_fields(installation_fields)
-                        if not is_valid:
-                            result = 400
-                            payload = {"message": f"Invalid installation field: {error_msg}"}
-                            return jsonify(payload), result
-                        
-                        # Track progress field for auto-update
-                        if field_name == "progress":
-                            installation_progress_field = field_detail
+                    # Track progress field for auto-update
+                    elif section_name == "installation" and field_name == "progress":
+                        installation_progress_field = field_detail
                     
                     # Validate testing section notes
                     elif section_name == "testing" and field_name == "notes":
@@ -529,55 +763,46 @@ def page_put(body):  # noqa: E501
                             result = 400
                             payload = {"message": f"Invalid notes field: {error_msg}"}
                             return jsonify(payload), result
-                
-                # Update field value
-                # Handle field_value - it might be a string (JSON) or already parsed
-                # SQLAlchemy JSON column automatically handles dict/list, but we need to parse JSON strings
-                field_value_to_store = field.field_value
-                if isinstance(field_value_to_store, str):
-                    # Try to parse as JSON if it's a string
-                    try:
-                        parsed = json.loads(field_value_to_store)
-                        field_value_to_store = parsed  # Store as dict/list for JSON column
-                    except (json.JSONDecodeError, TypeError):
-                        # If it's not valid JSON, store as string
-                        pass
-                # If it's already a dict/list, SQLAlchemy JSON column will handle it
-                
-                field_detail.field_value = field_value_to_store
-                field_detail.update_row(False)
+
+                # Only changed values are written
+                if field_value_to_store != field_detail.field_value:
+                    field_updates[field_detail.id] = field_value_to_store
         
         # Deployment-specific: Auto-calculate progress and update site status
-        if page.page_name == "deployment" and deployment_steps_updated and deployment_steps:
-            # Calculate progress
-            progress = calculate_progress(deployment_steps)
+        if deployment_evaluation is not None:
+            progress = deployment_evaluation.progress
             
             # Update progress field if it exists
+            if not installation_progress_field:
+                # Try to find the progress field of the installation section
+                installation_progress_field = (
+                    Field.query.join(Section, Field.section_id == Section.id)
+                    .options(defer(Field.field_value))  # only the id is needed
+                    .filter(
+                        Section.page_id == page_id,
+                        Section.section_name == "installation",
+                        Field.field_name == "progress"
+                    )
+                    .first()
+                )
             if installation_progress_field:
-                installation_progress_field.field_value = str(progress)
-                installation_progress_field.update_row(False)
-            else:
-                # Try to find and update progress field
-                deployment_sections = Section.get_by_pageid(page_id)
-                if deployment_sections:
-                    for sec in deployment_sections:
-                        if sec.section_name == "installation":
-                            progress_fields = Field.query.filter(
-                                Field.section_id == sec.id,
-                                Field.field_name == "progress"
-                            ).all()
-                            if progress_fields:
-                                progress_fields[0].field_value = str(progress)
-                                progress_fields[0].update_row(False)
+                field_updates[installation_progress_field.id] = str(progress)
             
             # Check if all steps are completed and update site status
-            if are_all_steps_completed(deployment_steps):
+            if deployment_evaluation.completed:
                 if site.status != "deployed":
                     site.status = "deployed"
                     site.updated_at = datetime.utcnow()
                     site.update_row(False)
                     logging.info(f"[page_put] Updated site {site_id} status to 'deployed' - all deployment steps completed")
+
+        # All changed field values in one executemany UPDATE
+        if field_updates:
+            Field.update_values(field_updates)
+            record_change(db.session, site_ids=[site.id], tables=(Field.__tablename__,))
                 
+        # Progress and current step land on site_summary in the same commit
+        refresh_site_summary(site_id, deployment=EMPTY_CHECKLIST if checklist_emptied else deployment_evaluation)
         db.session.commit()
         result = 200
         payload = {"message":"Page updated successfully"}
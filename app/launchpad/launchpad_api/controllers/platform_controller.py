@@ -10,6 +10,46 @@ from ..db_models.software_module import SoftwareModule
 from ..db_models.hardware_category import HardwareCategory
 from ..db_models.hardware_item import HardwareItem
 from ..db_models.recommendation_rule import RecommendationRule
+from ..utils.catalog_snapshot import get_catalog_snapshot
+
+
+def platform_catalog_get():  # noqa: E501
+    """Get the whole platform catalog
+
+    Software and hardware categories, software modules, hardware items and
+    recommendation rules in one response, with the catalog version.
+
+     # noqa: E501
+
+    :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
+    """
+    result = 400
+    payload = {"message": generic_message}
+
+    try:
+        logging.info("[platform_catalog_get] Fetching platform catalog")
+
+        snapshot = get_catalog_snapshot()
+        not_modified, headers = snapshot.conditional()
+        if not_modified:
+            return not_modified
+
+        # Get optional query parameters
+        is_active = request.args.get('is_active', type=str)
+        active_only = None
+        if is_active:
+            active_only = is_active.lower() == 'true'
+
+        result = 200
+        return snapshot.catalog_response(active_only=active_only), result, headers
+
+    except Exception as error:
+        logging.error(f"[platform_catalog_get] Error: {error}")
+        print(error)
+        result = 400
+        payload = {"message": generic_message}
+
+    return jsonify(payload), result
 
 
 def platform_software_categories_get():  # noqa: E501
@@ -24,6 +64,11 @@ def platform_software_categories_get():  # noqa: E501
 
     try:
         logging.info("[platform_software_categories_get] Fetching software categories")
+
+        snapshot = get_catalog_snapshot()
+        not_modified, headers = snapshot.conditional()
+        if not_modified:
+            return not_modified
         
         # Get optional query parameters
         is_active = request.args.get('is_active', type=str)
@@ -31,14 +76,9 @@ def platform_software_categories_get():  # noqa: E501
         if is_active:
             active_only = is_active.lower() == 'true'
 
-        categories = SoftwareCategory.get_all(active_only=active_only) or []
-        categories_data = [cat.to_dict() for cat in categories]
-
-        payload = {
-            "message": "Successfully fetched software categories",
-            "data": categories_data
-        }
         result = 200
+        return snapshot.response("software_categories", "Successfully fetched software categories",
+                                 active_only=active_only), result, headers
 
     except Exception as error:
         logging.error(f"[platform_software_categories_get] Error: {error}")
@@ -61,6 +101,11 @@ def platform_hardware_categories_get():  # noqa: E501
 
     try:
         logging.info("[platform_hardware_categories_get] Fetching hardware categories")
+
+        snapshot = get_catalog_snapshot()
+        not_modified, headers = snapshot.conditional()
+        if not_modified:
+            return not_modified
         
         # Get optional query parameters
         is_active = request.args.get('is_active', type=str)
@@ -68,14 +113,9 @@ def platform_hardware_categories_get():  # noqa: E501
         if is_active:
             active_only = is_active.lower() == 'true'
 
-        categories = HardwareCategory.get_all(active_only=active_only) or []
-        categories_data = [cat.to_dict() for cat in categories]
-
-        payload = {
-            "message": "Successfully fetched hardware categories",
-            "data": categories_data
-        }
         result = 200
+        return snapshot.response("hardware_categories", "Successfully fetched hardware categories",
+                                 active_only=active_only), result, headers
 
     except Exception as error:
         logging.error(f"[platform_hardware_categories_get] Error: {error}")
@@ -98,6 +138,11 @@ def platform_software_modules_get():  # noqa: E501
 
     try:
         logging.info("[platform_software_modules_get] Fetching software modules")
+
+        snapshot = get_catalog_snapshot()
+        not_modified, headers = snapshot.conditional()
+        if not_modified:
+            return not_modified
         
         # Get optional query parameters
         category_ids_param = request.args.get('category_ids', type=str)
@@ -115,14 +160,9 @@ def platform_software_modules_get():  # noqa: E501
         if is_active:
             active_only = is_active.lower() == 'true'
 
-        modules = SoftwareModule.get_all(category_ids=category_ids, active_only=active_only) or []
-        modules_data = [module.to_dict() for module in modules]
-
-        payload = {
-            "message": "Successfully fetched software modules",
-            "data": modules_data
-        }
         result = 200
+        return snapshot.response("software_modules", "Successfully fetched software modules",
+                                 active_only=active_only, category_ids=category_ids), result, headers
 
     except Exception as error:
         logging.error(f"[platform_software_modules_get] Error: {error}")
@@ -145,6 +185,11 @@ def platform_hardware_items_get():  # noqa: E501
 
     try:
         logging.info("[platform_hardware_items_get] Fetching hardware items")
+
+        snapshot = get_catalog_snapshot()
+        not_modified, headers = snapshot.conditional()
+        if not_modified:
+            return not_modified
         
         # Get optional query parameters
         category_ids_param = request.args.get('category_ids', type=str)
@@ -162,14 +207,9 @@ def platform_hardware_items_get():  # noqa: E501
         if is_active:
             active_only = is_active.lower() == 'true'
 
-        items = HardwareItem.get_all(category_ids=category_ids, active_only=active_only) or []
-        items_data = [item.to_dict() for item in items]
-
-        payload = {
-            "message": "Successfully fetched hardware items",
-            "data": items_data
-        }
         result = 200
+        return snapshot.response("hardware_items", "Successfully fetched hardware items",
+                                 active_only=active_only, category_ids=category_ids), result, headers
 
     except Exception as error:
         logging.error(f"[platform_hardware_items_get] Error: {error}")
@@ -192,6 +232,11 @@ def platform_recommendation_rules_get():  # noqa: E501
 
     try:
         logging.info("[platform_recommendation_rules_get] Fetching recommendation rules")
+
+        snapshot = get_catalog_snapshot()
+        not_modified, headers = snapshot.conditional()
+        if not_modified:
+            return not_modified
         
         # Get optional query parameters
         category_ids_param = request.args.get('category_ids', type=str)
@@ -204,14 +249,9 @@ def platform_recommendation_rules_get():  # noqa: E501
                 logging.warning(f"[platform_recommendation_rules_get] Invalid category_ids: {category_ids_param}")
                 category_ids = None
 
-        rules = RecommendationRule.get_all(category_ids=category_ids) or []
-        rules_data = [rule.to_dict() for rule in rules]
-
-        payload = {
-            "message": "Successfully fetched recommendation rules",
-            "data": rules_data
-        }
         result = 200
+        return snapshot.response("recommendation_rules", "Successfully fetched recommendation rules",
+                                 category_ids=category_ids), result, headers
 
     except Exception as error:
         logging.error(f"[platform_recommendation_rules_get] Error: {error}")
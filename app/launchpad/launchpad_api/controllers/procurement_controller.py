@@ -9,6 +9,8 @@ from ..db import db
 from ..db_models.procurement_data import ProcurementData
 from ..db_models.site import Site
 from ..db_models.user import User
+from ..utils.principals import get_principal_by_id
+from ..utils.site_summary import refresh_site_summary
 
 # Role constants - matching scoping_approval_controller
 ADMIN_ROLE = 1
@@ -24,7 +26,7 @@ def get_current_user():
     user_id = request.headers.get('X-User-Id')  # Placeholder
     if user_id:
         try:
-            return User.get_by_id(int(user_id))
+            return get_principal_by_id(int(user_id))
         except:
             return None
     return None
@@ -451,6 +453,7 @@ def site_procurement_complete_post(site_id, body):  # noqa: E501
 
         # Update site status to 'procurement_done'
         site.status = 'procurement_done'
+        refresh_site_summary(site.id)
         site.update_row()
 
         payload = {
@@ -7,10 +7,17 @@ from sqlalchemy.exc import IntegrityError
 from ..utils.messages import generic_message
 from ..db import db
 from ..db_models.scoping_approval import ScopingApproval
-from ..db_models.approval_action import ApprovalAction
 from ..db_models.site import Site
 from ..db_models.user import User
+from ..utils.principals import get_principal_by_email, get_principal_by_id
+from ..utils.conditional import conditional_get
+from ..utils.pagination import encode_cursor, decode_cursor, parse_limit
 from ..utils.cookie_manager import decrypt_token
+from ..utils.site_summary import refresh_site_summary
+from ..utils.approval_audit import record_action
+from ..utils.cost_engine import quote_selection, CostError, SERVER_QUOTE_KEY
+from ..utils.approval_diff import approval_version_diff
+from ..utils.approval_stats import approval_stats
 
 # TODO: Define role constants - these should match your role system
 # Assuming: 1=Admin, 2=Operations Manager, 3=Deployment Engineer
@@ -32,7 +39,7 @@ def get_current_user():
             email = decrypt_token(token)
             if email:
                 # Get user from database by email
-                user = User.get_by_email(email)
+                user = get_principal_by_email(email)
                 if user:
                     logging.info(f"[get_current_user] Successfully authenticated user via cookie: {email} (ID: {user.id}, Role: {user.role})")
                     return user
@@ -43,7 +50,7 @@ def get_current_user():
         user_id = request.headers.get('X-User-Id')
         if user_id:
             try:
-                user = User.get_by_id(int(user_id))
+                user = get_principal_by_id(int(user_id))
                 if user:
                     logging.info(f"[get_current_user] Using X-User-Id header (dev mode): User ID {user_id} (Role: {user.role})")
                     return user
@@ -68,6 +75,22 @@ def check_role(user, allowed_roles):
     return user.role in allowed_roles
 
 
+def priced_cost_breakdown(selected_software, selected_hardware, cost_summary=None):
+    """
+    cost_breakdown of a submission: the client's cost_summary figures at the
+    top level as before, plus the catalog-priced lines and totals under
+    "server_quote" for reviewers. Raises CostError.
+    """
+    quote = quote_selection(selected_software, selected_hardware)
+    cost_breakdown = dict(cost_summary) if isinstance(cost_summary, dict) else {}
+    cost_breakdown[SERVER_QUOTE_KEY] = quote
+    submitted_total = cost_breakdown.get("totalInvestment")
+    if submitted_total is not None and submitted_total != quote["totalInvestment"]:
+        logging.info(f"[priced_cost_breakdown] Client totalInvestment {submitted_total} "
+                     f"differs from catalog price {quote['totalInvestment']}")
+    return cost_breakdown
+
+
 def site_scoping_submit(site_id, body):  # noqa: E501
     """Submit scoping for approval
 
@@ -134,8 +157,12 @@ def site_scoping_submit(site_id, body):  # noqa: E501
             payload = {"message": "At least one software or hardware item must be selected"}
             return jsonify(payload), result
 
-        # Validate software and hardware IDs exist and are active
-        # TODO: Add validation for software/hardware IDs if needed
+        # Validate software and hardware IDs and price them from the catalog
+        try:
+            cost_breakdown = priced_cost_breakdown(selected_software, selected_hardware, cost_summary)
+        except CostError as error:
+            payload = {"message": str(error), "invalid_items": error.invalid}
+            return jsonify(payload), result
 
         # Create scoping data structure
         scoping_data = {
@@ -150,27 +177,23 @@ def site_scoping_submit(site_id, body):  # noqa: E501
             deployment_engineer_id=current_user.id,
             deployment_engineer_name=current_user.name,
             scoping_data=scoping_data,
-            cost_breakdown=cost_summary,
+            cost_breakdown=cost_breakdown,
             status='pending',
             version=1
         )
 
         try:
-            approval_id = approval.create_row()
-            
-            # Create audit trail entry
-            try:
-                action = ApprovalAction(
-                    approval_id=approval_id,
-                    action='submit',
-                    performed_by=current_user.id,
-                    performed_by_role='deployment_engineer',
-                    comment=f"Scoping submitted for {site_name}"
-                )
-                action.create_row()
-            except Exception as action_error:
-                logging.warning(f"[site_scoping_submit] Failed to create audit trail: {str(action_error)}")
-                # Don't fail the request if audit trail fails
+            approval_id = approval.create_row(commit=False)
+
+            # Audit trail entry, committed together with the approval
+            record_action(
+                approval_id=approval_id,
+                action='submit',
+                performed_by=current_user.id,
+                performed_by_role='deployment_engineer',
+                comment=f"Scoping submitted for {site_name}"
+            )
+            db.session.commit()
 
             payload = {
                 "message": "Scoping submitted for approval successfully",
@@ -281,6 +304,13 @@ def site_scoping_resubmit(site_id, body):  # noqa: E501
             payload = {"message": "site_name is required"}
             return jsonify(payload), result
 
+        # Validate software and hardware IDs and price them from the catalog
+        try:
+            cost_breakdown = priced_cost_breakdown(selected_software, selected_hardware, cost_summary)
+        except CostError as error:
+            payload = {"message": str(error), "invalid_items": error.invalid}
+            return jsonify(payload), result
+
         # Create scoping data structure
         scoping_data = {
             "selected_software": selected_software,
@@ -295,27 +325,24 @@ def site_scoping_resubmit(site_id, body):  # noqa: E501
             deployment_engineer_id=current_user.id,
             deployment_engineer_name=current_user.name,
             scoping_data=scoping_data,
-            cost_breakdown=cost_summary,
+            cost_breakdown=cost_breakdown,
             status='pending',
             version=new_version,
             previous_version_id=previous_approval_id_int
         )
 
         try:
-            approval_id = approval.create_row()
-            
-            # Create audit trail entry
-            try:
-                action = ApprovalAction(
-                    approval_id=approval_id,
-                    action='resubmit',
-                    performed_by=current_user.id,
-                    performed_by_role='deployment_engineer',
-                    comment=f"Scoping resubmitted for {site_name} (version {new_version})"
-                )
-                action.create_row()
-            except Exception as action_error:
-                logging.warning(f"[site_scoping_resubmit] Failed to create audit trail: {str(action_error)}")
+            approval_id = approval.create_row(commit=False)
+
+            # Audit trail entry, committed together with the approval
+            record_action(
+                approval_id=approval_id,
+                action='resubmit',
+                performed_by=current_user.id,
+                performed_by_role='deployment_engineer',
+                comment=f"Scoping resubmitted for {site_name} (version {new_version})"
+            )
+            db.session.commit()
 
             payload = {
                 "message": "Scoping resubmitted successfully",
@@ -354,6 +381,11 @@ def scoping_approvals_get():  # noqa: E501
     Query parameters:
     - status: Filter by status (pending, approved, rejected, changes_requested)
     - site_id: Filter by site ID
+    - limit: Page size; when omitted every matching approval is returned
+    - after: Cursor returned as next_cursor by the previous page
+    - view: full (default) or summary, which leaves out scoping_data and
+      cost_breakdown (fetch those through GET /scoping-approvals/{id})
+    - current: true to only return the current approval of each site
 
     :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
     """
@@ -369,6 +401,14 @@ def scoping_approvals_get():  # noqa: E501
             payload = {"message": "Authentication required"}
             return jsonify(payload), 401
 
+        # Per principal: what a user may see depends on who they are
+        not_modified, headers = conditional_get(
+            ("scoping_approvals",),
+            variant=f"{request.full_path}|{current_user.id}|{current_user.role}",
+        )
+        if not_modified:
+            return not_modified
+
         # Get query parameters
         status = request.args.get('status')
         site_id = request.args.get('site_id')
@@ -384,6 +424,7 @@ def scoping_approvals_get():  # noqa: E501
                         "data": approval.to_dict()
                     }
                     result = 200
+                    return jsonify(payload), result, headers
                 else:
                     payload = {"message": "Scoping approval not found for this site"}
                     result = 404
@@ -391,18 +432,44 @@ def scoping_approvals_get():  # noqa: E501
                 payload = {"message": "Invalid site_id"}
                 return jsonify(payload), result
         else:
-            # Get all approvals with filters
-            approvals = ScopingApproval.get_all(status=status, site_id=None)
+            view = request.args.get('view') or "full"
+            if view not in ScopingApproval.VIEWS:
+                payload = {"message": f"Invalid view, expected one of: {', '.join(ScopingApproval.VIEWS)}"}
+                return jsonify(payload), result
+
+            try:
+                limit = parse_limit(request.args.get('limit'))
+                cursor = decode_cursor(request.args.get('after'), 2)
+                if cursor:
+                    datetime.fromisoformat(cursor[0])
+                    int(cursor[1])
+            except (TypeError, ValueError):
+                payload = {"message": "Invalid limit or cursor"}
+                return jsonify(payload), result
+
+            current = (request.args.get('current') or "").lower() in ("true", "1")
+
+            # Get one page of approvals with filters, newest first
+            approvals = ScopingApproval.get_page(limit=limit, after=cursor, status=status, view=view,
+                                                 current=current)
             if approvals is None:
                 payload = {"message": "Error fetching approvals"}
                 result = 500
             else:
-                approvals_data = [approval.to_dict() for approval in approvals]
+                next_cursor = None
+                if limit and len(approvals) > limit:
+                    approvals = approvals[:limit]
+                    next_cursor = encode_cursor(*approvals[-1].cursor_key())
+
+                approvals_data = [approval.to_dict(include_blobs=view == "full") for approval in approvals]
                 payload = {
                     "message": "Successfully fetched scoping approvals",
                     "data": approvals_data
                 }
+                if limit:
+                    payload["next_cursor"] = next_cursor
                 result = 200
+                return jsonify(payload), result, headers
 
     except Exception as error:
         error_trace = traceback.format_exc()
@@ -414,6 +481,56 @@ def scoping_approvals_get():  # noqa: E501
     return jsonify(payload), result
 
 
+def scoping_approvals_stats_get():  # noqa: E501
+    """Get approval queue counters
+
+    pending / approved / rejected / changes_requested counts in total, per
+    deployment engineer and per site.
+
+    Query parameters:
+    - current: only count the current (latest version) approval of each site
+
+    :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
+    """
+    result = 400
+    payload = {"message": generic_message}
+
+    try:
+        logging.info("[scoping_approvals_stats_get] Fetching approval counters")
+
+        # Get current user
+        current_user = get_current_user()
+        if not current_user:
+            payload = {"message": "Authentication required"}
+            return jsonify(payload), 401
+
+        not_modified, headers = conditional_get(("scoping_approvals",))
+        if not_modified:
+            return not_modified
+
+        current = (request.args.get('current') or "").lower() in ("true", "1")
+        stats = approval_stats(current=current)
+        if stats is None:
+            payload = {"message": "Error counting approvals"}
+            result = 500
+        else:
+            payload = {
+                "message": "Successfully fetched approval counters",
+                "data": stats
+            }
+            result = 200
+            return jsonify(payload), result, headers
+
+    except Exception as error:
+        error_trace = traceback.format_exc()
+        logging.error(f"[scoping_approvals_stats_get] Unexpected error: {str(error)}")
+        logging.error(f"[scoping_approvals_stats_get] Full traceback: {error_trace}")
+        result = 500
+        payload = {"message": "An unexpected error occurred while counting approvals"}
+
+    return jsonify(payload), result
+
+
 def scoping_approvals_id_get(approval_id):  # noqa: E501
     """Get scoping approval by ID
 
@@ -462,6 +579,65 @@ def scoping_approvals_id_get(approval_id):  # noqa: E501
     return jsonify(payload), result
 
 
+def scoping_approvals_id_diff_get(approval_id):  # noqa: E501
+    """Diff a scoping approval against an earlier version
+
+    Query parameters:
+    - against: id of an earlier version in the same resubmission chain
+      (default: the previous version)
+
+    :param approval_id: Approval ID
+    :type approval_id: int
+
+    :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
+    """
+    result = 400
+    payload = {"message": generic_message}
+
+    try:
+        logging.info(f"[scoping_approvals_id_diff_get] Diffing approval id={approval_id}")
+
+        # Get current user
+        current_user = get_current_user()
+        if not current_user:
+            payload = {"message": "Authentication required"}
+            return jsonify(payload), 401
+
+        # Validate approval_id / against
+        try:
+            approval_id_int = int(approval_id)
+            against = request.args.get("against")
+            against_int = int(against) if against else None
+        except (TypeError, ValueError):
+            payload = {"message": "Invalid approval ID"}
+            return jsonify(payload), result
+
+        try:
+            diff = approval_version_diff(approval_id_int, against_int)
+        except ValueError as error:
+            payload = {"message": str(error)}
+            return jsonify(payload), result
+
+        if diff is None:
+            payload = {"message": "Scoping approval not found"}
+            return jsonify(payload), 404
+
+        payload = {
+            "message": "Successfully computed scoping approval diff",
+            "data": diff
+        }
+        result = 200
+
+    except Exception as error:
+        error_trace = traceback.format_exc()
+        logging.error(f"[scoping_approvals_id_diff_get] Unexpected error: {str(error)}")
+        logging.error(f"[scoping_approvals_id_diff_get] Full traceback: {error_trace}")
+        result = 500
+        payload = {"message": "An unexpected error occurred while computing the diff"}
+
+    return jsonify(payload), result
+
+
 def scoping_approvals_id_approve(approval_id, body):  # noqa: E501
     """Approve a scoping request
 
@@ -522,26 +698,24 @@ def scoping_approvals_id_approve(approval_id, body):  # noqa: E501
         approval.ops_manager_name = current_user.name if current_user.role == OPS_MANAGER_ROLE else approval.ops_manager_name
 
         try:
-            approval.update_row()
-            
+            approval.update_row(commit=False)
+
             # Update site status
             site = Site.get_by_id(approval.site_id)
             if site:
                 site.status = 'approved'
-                site.update_row()
-
-            # Create audit trail entry
-            try:
-                action = ApprovalAction(
-                    approval_id=approval_id_int,
-                    action='approve',
-                    performed_by=current_user.id,
-                    performed_by_role='admin' if current_user.role == ADMIN_ROLE else 'ops_manager',
-                    comment=comment
-                )
-                action.create_row()
-            except Exception as action_error:
-                logging.warning(f"[scoping_approvals_id_approve] Failed to create audit trail: {str(action_error)}")
+                site.update_row(False)
+                refresh_site_summary(site.id)
+
+            # Approval, site status and audit trail entry in one commit
+            record_action(
+                approval_id=approval_id_int,
+                action='approve',
+                performed_by=current_user.id,
+                performed_by_role='admin' if current_user.role == ADMIN_ROLE else 'ops_manager',
+                comment=comment
+            )
+            db.session.commit()
 
             payload = {
                 "message": "Scoping approved successfully",
@@ -630,20 +804,17 @@ def scoping_approvals_id_reject(approval_id, body):  # noqa: E501
         approval.ops_manager_name = current_user.name if current_user.role == OPS_MANAGER_ROLE else approval.ops_manager_name
 
         try:
-            approval.update_row()
-
-            # Create audit trail entry
-            try:
-                action = ApprovalAction(
-                    approval_id=approval_id_int,
-                    action='reject',
-                    performed_by=current_user.id,
-                    performed_by_role='admin' if current_user.role == ADMIN_ROLE else 'ops_manager',
-                    comment=comment
-                )
-                action.create_row()
-            except Exception as action_error:
-                logging.warning(f"[scoping_approvals_id_reject] Failed to create audit trail: {str(action_error)}")
+            approval.update_row(commit=False)
+
+            # Approval and audit trail entry in one commit
+            record_action(
+                approval_id=approval_id_int,
+                action='reject',
+                performed_by=current_user.id,
+                performed_by_role='admin' if current_user.role == ADMIN_ROLE else 'ops_manager',
+                comment=comment
+            )
+            db.session.commit()
 
             payload = {
                 "message": "Scoping rejected successfully",
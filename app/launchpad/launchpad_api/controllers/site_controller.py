@@ -2,16 +2,51 @@ import connexion
 from flask import jsonify
 import logging
 import traceback
-from sqlalchemy.exc import IntegrityError, OperationalError
 from ..utils.messages import generic_message
 from ..db_models.site import Site
-from ..db_models.page import Page
-from ..db_models.section import Section
-from ..db_models.fields import Field
+from ..db_models.site_summary import SiteSummary
+from ..db_models.site_tombstone import SiteTombstone
 from ..db import db
-from ..utils.queries import get_all_site_details
-from collections import defaultdict
-import json
+from ..utils.site_summary import refresh_site_summary, normalize_status
+from ..utils.pagination import parse_limit, encode_cursor, decode_cursor
+from ..utils.conditional import conditional_get
+from ..utils.cache import site_cache, site_tag, SITE_ANY_TAG, SITE_LIST_TAG, SITE_LIST_PARTIAL_TAG
+from ..utils.site_search import site_search_index
+from ..utils.queries import get_changed_site_ids, chunked, IN_CHUNK_SIZE
+from ..utils.site_purge import site_purge_worker
+from datetime import date, datetime, timedelta
+
+# /site/changes: each cursor re-reads this many seconds before the previous
+# call, so rows written by transactions still open at that time are not missed
+CHANGES_OVERLAP_SECONDS = 5
+# Tombstones older than this are pruned; older cursors get a full reset
+TOMBSTONE_RETENTION_DAYS = 30
+# Most sites accepted by one POST /site/bulk-delete
+MAX_BULK_DELETE_SITES = 500
+# Sites in these states can no longer be deleted
+NON_DELETABLE_STATUSES = {"deployed", "live"}
+
+def record_site_tombstone(site_id):
+    """Leave a tombstone for /site/changes and prune expired ones (no commit)."""
+    SiteTombstone.record(site_id)
+    SiteTombstone.prune(datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS))
+
+
+def soft_delete_sites(sites):
+    """
+    Mark `sites` deleted without committing: they vanish from lookups,
+    listings, search and /site/changes as soon as the caller commits, and
+    site_purge_worker removes their rows afterwards.
+    """
+    now = datetime.utcnow()
+    site_ids = [site.id for site in sites]
+    for site in sites:
+        site.deleted_at = now
+        record_site_tombstone(site.id)
+    for chunk in chunked(site_ids, IN_CHUNK_SIZE):
+        for summary in SiteSummary.get_by_site_ids(chunk) or []:
+            db.session.delete(summary)
+
 
 def site_delete(site_id):  # noqa: E501
     """Delete a site
@@ -54,9 +89,8 @@ def site_delete(site_id):  # noqa: E501
 
         # Business rule: allow delete only for non-live deployments
         normalized_status = str(site.status or "").strip().lower()
-        non_deletable_statuses = {"deployed", "live"}
 
-        if normalized_status in non_deletable_statuses:
+        if normalized_status in NON_DELETABLE_STATUSES:
             payload = {
                 "message": "Cannot delete a site once it is deployed or live"
             }
@@ -65,75 +99,17 @@ def site_delete(site_id):  # noqa: E501
             )
             return jsonify(payload), result
 
-        # Try to delete the site - CASCADE should handle related records
-        # If that fails, manually delete related records
         try:
-            # First, try simple delete (relying on CASCADE if database has it)
-            db.session.delete(site)
+            # Hide the site now; its rows are purged in the background in
+            # small chunks instead of one long cascading delete
+            soft_delete_sites([site])
             db.session.commit()
-            
-            logging.info(f"[site_delete] Successfully deleted site id={site_id_int} (with CASCADE)")
+            site_purge_worker.enqueue([site_id_int])
+
+            logging.info(f"[site_delete] Soft deleted site id={site_id_int}, purge scheduled")
             payload = {"message": "Site deleted successfully"}
             result = 200
-            
-        except (IntegrityError, OperationalError) as db_error:
-            # CASCADE might not be working - manually delete related records
-            db.session.rollback()
-            logging.warning(
-                f"[site_delete] CASCADE delete failed for site {site_id_int}. "
-                f"Error: {str(db_error)}. Attempting manual cascade delete..."
-            )
-            
-            try:
-                # Re-fetch site to ensure we have a valid object after rollback
-                site = Site.get_by_id(site_id_int)
-                if not site:
-                    payload = {"message": "Site not found after rollback"}
-                    result = 404
-                    return jsonify(payload), result
-                
-                # Get all pages for this site
-                pages = Page.query.filter(Page.site_id == site_id_int).all()
-                page_ids = [page.id for page in pages] if pages else []
-                
-                if page_ids:
-                    # Get all sections for these pages
-                    sections = Section.query.filter(Section.page_id.in_(page_ids)).all()
-                    section_ids = [section.id for section in sections] if sections else []
-                    
-                    if section_ids:
-                        # Delete all fields for these sections
-                        fields_deleted = Field.query.filter(Field.section_id.in_(section_ids)).delete(synchronize_session=False)
-                        logging.info(f"[site_delete] Deleted {fields_deleted} fields for site {site_id_int}")
-                    
-                    # Delete all sections
-                    sections_deleted = Section.query.filter(Section.page_id.in_(page_ids)).delete(synchronize_session=False)
-                    logging.info(f"[site_delete] Deleted {sections_deleted} sections for site {site_id_int}")
-                
-                # Delete all pages
-                pages_deleted = Page.query.filter(Page.site_id == site_id_int).delete(synchronize_session=False)
-                logging.info(f"[site_delete] Deleted {pages_deleted} pages for site {site_id_int}")
-                
-                # Now delete the site
-                db.session.delete(site)
-                db.session.commit()
-                
-                logging.info(f"[site_delete] Successfully deleted site id={site_id_int} (manual cascade)")
-                payload = {"message": "Site deleted successfully"}
-                result = 200
-                
-            except Exception as manual_delete_error:
-                db.session.rollback()
-                logging.error(
-                    f"[site_delete] Manual cascade delete also failed for site {site_id_int}. "
-                    f"Error: {str(manual_delete_error)}\n"
-                    f"Traceback: {traceback.format_exc()}"
-                )
-                payload = {
-                    "message": f"Unable to delete the site due to an internal error: {str(manual_delete_error)}"
-                }
-                result = 500
-                
+
         except Exception as error:
             db.session.rollback()
             logging.error(
@@ -155,6 +131,86 @@ def site_delete(site_id):  # noqa: E501
 
     return jsonify(payload), result
 
+
+def site_bulk_delete(body):  # noqa: E501
+    """Delete many sites
+
+    Soft deletes every deletable site in one transaction and hands them to
+    the background purge worker, like site_delete.
+
+    :param body: {"site_ids": [...]}
+    :type body: dict | bytes
+
+    :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
+    """
+    result = 400
+    payload = {"message": generic_message}
+
+    try:
+        request_json = connexion.request.get_json() if connexion.request.is_json else (body or {})
+        raw_ids = request_json.get("site_ids")
+
+        if not isinstance(raw_ids, list) or not raw_ids:
+            payload = {"message": "site_ids is required"}
+            return jsonify(payload), result
+
+        try:
+            site_ids = list(dict.fromkeys(int(site_id) for site_id in raw_ids))
+        except (TypeError, ValueError):
+            payload = {"message": "site_ids must be integers"}
+            return jsonify(payload), result
+
+        if len(site_ids) > MAX_BULK_DELETE_SITES:
+            payload = {"message": f"At most {MAX_BULK_DELETE_SITES} sites can be deleted at once"}
+            return jsonify(payload), result
+
+        logging.info(f"[site_bulk_delete] Incoming request to delete {len(site_ids)} sites")
+
+        sites = []
+        for chunk in chunked(site_ids, IN_CHUNK_SIZE):
+            sites.extend(Site.query.filter(Site.id.in_(chunk), Site.deleted_at.is_(None)).all())
+
+        deletable = [site for site in sites
+                     if str(site.status or "").strip().lower() not in NON_DELETABLE_STATUSES]
+        rejected = sorted(site.id for site in sites if site not in deletable)
+        found = {site.id for site in sites}
+        not_found = [site_id for site_id in site_ids if site_id not in found]
+
+        try:
+            if deletable:
+                soft_delete_sites(deletable)
+                db.session.commit()
+                site_purge_worker.enqueue([site.id for site in deletable])
+        except Exception as error:
+            db.session.rollback()
+            logging.error(
+                f"[site_bulk_delete] Unexpected error deleting sites: {str(error)}\n"
+                f"Traceback: {traceback.format_exc()}"
+            )
+            payload = {"message": f"Unable to delete the sites due to an internal error: {str(error)}"}
+            return jsonify(payload), 500
+
+        logging.info(
+            f"[site_bulk_delete] Soft deleted {len(deletable)} sites, "
+            f"rejected={len(rejected)}, not_found={len(not_found)}"
+        )
+        payload = {
+            "message": "Sites deleted successfully",
+            "data": {
+                "deleted": sorted(site.id for site in deletable),
+                "rejected": rejected,
+                "not_found": not_found,
+            },
+        }
+        result = 200
+
+    except Exception as error:
+        logging.error(f"[site_bulk_delete] Exception: {error}\n{traceback.format_exc()}")
+        result = 500
+        payload = {"message": generic_message}
+
+    return jsonify(payload), result
+
 def site_get(id):  # noqa: E501
     """Get list of sites
 
@@ -192,9 +248,11 @@ def site_post(body):  # noqa: E501
 
         # We currently only persist site status; name and other details live in the page/field structure.
         site = Site(status=status)
-        site_id = site.create_row()
+        site_id = site.create_row(commit=False)
 
         if site_id:
+            refresh_site_summary(site_id)
+            db.session.commit()
             payload = {
                 "message": "Site Created Succesfully",
                 "data": {
@@ -208,6 +266,7 @@ def site_post(body):  # noqa: E501
             result = 400
 
     except Exception as error:
+        db.session.rollback()
         print(error)
         result = 400
         payload = {"message": generic_message}
@@ -244,7 +303,9 @@ def site_put(body):  # noqa: E501
 
         if site:
             site.status = status
-            site.update_row()
+            site.update_row(commit=False)
+            refresh_site_summary(site.id)
+            db.session.commit()
             payload = {"message": "Site updated successfully"}
             result = 200
 
@@ -253,134 +314,126 @@ def site_put(body):  # noqa: E501
             result = 400
         
     except Exception as error:
+        db.session.rollback()
         print(error)
         result = 400
         payload = {"message": generic_message}
 
     return jsonify(payload),result
 
-def site_all_get():  # noqa: E501
+def _load_site_listing(limit, cursor, status, organization, sort, filters=None):
+    """Build one page of the site listing from site_summary; None on failure."""
+    # One row per site from the site_summary projection (no EAV pivot)
+    filters = filters or {}
+    summaries = SiteSummary.get_page(limit=limit, after=cursor, status=status,
+                                     organization=organization, sort=sort, **filters)
+    total = SiteSummary.count(status=status, organization=organization, **filters)
+
+    if summaries is None or total is None:
+        return None
+
+    next_cursor = None
+    if limit and len(summaries) > limit:
+        summaries = summaries[:limit]
+        next_cursor = encode_cursor(*summaries[-1].cursor_key(sort))
+
+    return {
+        "data": [summary.to_dict() for summary in summaries],
+        "next_cursor": next_cursor,
+        "total": total,
+    }
+
+
+def site_all_get(limit=None, after=None, status=None, organization=None, sort=None,
+                 sector=None, target_live_from=None, target_live_to=None):  # noqa: E501
     """Get list of sites
 
      # noqa: E501
 
+    :param limit: Page size; when omitted every matching site is returned
+    :type limit: int
+    :param after: Cursor returned as next_cursor by the previous page
+    :type after: str
+    :param status: Only return sites with this status
+    :type status: str
+    :param organization: Only return sites of this organization (name or id)
+    :type organization: str
+    :param sort: site_id (default) or target_live_date
+    :type sort: str
+    :param sector: Only return sites of this sector
+    :type sector: str
+    :param target_live_from: Only return sites going live on or after this date (YYYY-MM-DD)
+    :type target_live_from: str
+    :param target_live_to: Only return sites going live on or before this date (YYYY-MM-DD)
+    :type target_live_to: str
 
     :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
     """
     result = 400
     payload = {"message": generic_message}
 
-    def _extract_display_value(value):
-        """
-        Helper to normalize field values that might be stored as simple
-        strings or small JSON objects (e.g. {\"value\": \"asda\"}).
-        """
+    try:
+        not_modified, headers = conditional_get(("site_summary",))
+        if not_modified:
+            return not_modified
+
+        sort = sort or "site_id"
+        if sort not in SiteSummary.SORT_KEYS:
+            payload = {"message": f"Invalid sort, expected one of: {', '.join(SiteSummary.SORT_KEYS)}"}
+            return jsonify(payload), result
+
         try:
-            if isinstance(value, dict):
-                # Common patterns used for field_value payloads
-                for key in ("value", "text", "label"):
-                    if key in value:
-                        return value[key]
-            return value
-        except Exception:
-            return value
-
-    def _normalize_status(status):
-        """Map internal statuses to the canonical values used by the frontend."""
-        if not status:
-            return status
-
-        s = str(status).strip().lower()
-        mapping = {
-            "site-created": "Created",
-            "created": "Created",
-            "site_study_done": "site_study_done",
-            "site-study-done": "site_study_done",
-            "scoping_done": "scoping_done",
-            "scoping-done": "scoping_done",
-            "approved": "approved",
-            "procurement_done": "procurement_done",
-            "procurement-done": "procurement_done",
-            "deployed": "deployed",
-            "live": "live",
-        }
-        return mapping.get(s, status)
+            limit = parse_limit(limit)
+            cursor = decode_cursor(after, 2 if sort == "target_live_date" else 1)
+            if cursor:
+                int(cursor[-1])
+                if sort == "target_live_date" and cursor[0] is not None:
+                    date.fromisoformat(cursor[0])
+        except (TypeError, ValueError):
+            payload = {"message": "Invalid limit or cursor"}
+            return jsonify(payload), result
 
-    try:
-        all_sites = get_all_site_details()
-        sites = defaultdict(dict)
+        try:
+            filters = {
+                "sector": sector,
+                "live_from": date.fromisoformat(target_live_from) if target_live_from else None,
+                "live_to": date.fromisoformat(target_live_to) if target_live_to else None,
+            }
+        except (TypeError, ValueError):
+            payload = {"message": "Invalid target_live_from or target_live_to, expected YYYY-MM-DD"}
+            return jsonify(payload), result
+
+        status = normalize_status(status) if status else None
+
+        filtered = bool(limit or cursor or status or organization or any(filters.values()))
+        key = ("site-all", limit, after, status, organization, sort, sector, target_live_from, target_live_to)
+
+        def tags(listing):
+            if filtered:
+                return (SITE_LIST_TAG, SITE_LIST_PARTIAL_TAG, SITE_ANY_TAG)
+            return {site_tag(site["site_id"]) for site in listing["data"]} | {SITE_LIST_TAG, SITE_ANY_TAG}
 
-        if all_sites is None:
+        listing = site_cache.get_or_load(
+            key,
+            lambda: _load_site_listing(limit, cursor, status, organization, sort, filters),
+            tags=tags,
+        )
+
+        if listing is None:
             payload = {"message": "Unable to fetch sites"}
             result = 400
             return jsonify(payload), result
 
-        # Aggregate raw data by site_id
-        for site in all_sites:
-            site_id = site.id
-            _site = sites.get(site_id, {})
-            _site["site_id"] = site_id
-            _site["status"] = _normalize_status(site.status)
-
-            if getattr(site, "field_name", None):
-                raw_value = site.field_value
-                # Handle field values that might be:
-                # 1. Plain strings: "Site Name"
-                # 2. JSON-encoded strings: "\"Site Name\"" or "{\"value\": \"Site Name\"}"
-                # 3. Already parsed objects/dicts: {"value": "Site Name"}
-                try:
-                    if isinstance(raw_value, str):
-                        # Try to parse as JSON (handles JSON-encoded strings)
-                        try:
-                            value = json.loads(raw_value)
-                        except (json.JSONDecodeError, ValueError):
-                            # Not valid JSON, use as plain string
-                            value = raw_value
-                    else:
-                        # Already an object/dict, use as-is
-                        value = raw_value
-                except Exception:
-                    # Fallback: use raw value if anything goes wrong
-                    value = raw_value
-
-                _site[site.field_name] = value
-
-            sites[site_id] = _site
-
-        # Normalize field names and shapes to what the frontend expects
-        normalized_sites = []
-        for _site in sites.values():
-            # Derive primary name from site_name if present
-            if "site_name" in _site and _site.get("site_name") is not None:
-                _site["name"] = _extract_display_value(_site["site_name"])
-
-            # Organization name: org_name -> organization_name
-            org_name = _site.get("organization_name") or _site.get("org_name")
-            if org_name is not None:
-                _site["organization_name"] = _extract_display_value(org_name)
-
-            # Unit code: prefer unit_code field, fall back to unit_id
-            unit = _site.get("unit_code") or _site.get("unit_id")
-            if unit is not None:
-                _site["unit_code"] = _extract_display_value(unit)
-
-            # Normalize commonly used fields (if present)
-            for key in [
-                "target_live_date",
-                "suggested_go_live",
-                "assigned_ops_manager",
-                "assigned_deployment_engineer",
-                "sector",
-                "organization_logo",
-                "organization_id",
-            ]:
-                if key in _site and _site[key] is not None:
-                    _site[key] = _extract_display_value(_site[key])
-
-            normalized_sites.append(_site)
+        normalized_sites = listing["data"]
+        next_cursor = listing["next_cursor"]
+        total = listing["total"]
 
         payload = {"data": normalized_sites, "message": "Succesfully fetched sites"}
+        if limit:
+            payload["next_cursor"] = next_cursor
         result = 200
+        headers["X-Total-Count"] = str(total)
+        return jsonify(payload), result, headers
 
     except Exception as error:
         logging.info(error)
@@ -388,4 +441,113 @@ def site_all_get():  # noqa: E501
         result = 400
         payload = {"message": generic_message}
 
-    return jsonify(payload), result
\ No newline at end of file
+    return jsonify(payload), result
+
+
+def site_search_get(q, limit=None):  # noqa: E501
+    """Search sites by name, organization, unit code or assigned people
+
+     # noqa: E501
+
+    Every word of `q` must match a word (or word prefix) of the site, so the
+    endpoint can back a typeahead. Served from the in-process search index.
+
+    :param q: Search text
+    :type q: str
+    :param limit: Maximum number of results (default 20)
+    :type limit: int
+
+    :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
+    """
+    result = 400
+    payload = {"message": generic_message}
+
+    try:
+        try:
+            limit = parse_limit(limit, default=20)
+        except (TypeError, ValueError):
+            payload = {"message": "Invalid limit"}
+            return jsonify(payload), result
+
+        sites = site_search_index.search(q, limit=limit)
+        payload = {"data": sites, "message": "Succesfully fetched sites"}
+        result = 200
+
+    except Exception as error:
+        logging.error(f"[site_search_get] Exception: {error}")
+        logging.error(traceback.format_exc())
+        result = 500
+        payload = {"message": generic_message}
+
+    return jsonify(payload), result
+
+
+def site_changes_get(since=None):  # noqa: E501
+    """Get sites changed since a cursor
+
+     # noqa: E501
+
+    Returns the summaries of sites whose site/page/section/field rows were
+    written since the cursor, the ids of sites deleted since then, and the
+    cursor for the next call. Without a cursor (or with one older than the
+    tombstone retention) every site is returned with reset=true and clients
+    should replace their copy.
+
+    :param since: next_cursor returned by the previous call
+    :type since: str
+
+    :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
+    """
+    result = 400
+    payload = {"message": generic_message}
+
+    try:
+        try:
+            cursor = decode_cursor(since, 1)
+            since_at = datetime.fromisoformat(cursor[0]) if cursor else None
+        except (TypeError, ValueError):
+            payload = {"message": "Invalid cursor"}
+            return jsonify(payload), result
+
+        started_at = datetime.utcnow()
+        reset = since_at is None or since_at < started_at - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+
+        if reset:
+            summaries = SiteSummary.get_all()
+            deleted = []
+        else:
+            site_ids = get_changed_site_ids(since_at)
+            deleted = SiteTombstone.get_since(since_at)
+            if site_ids is None or deleted is None:
+                payload = {"message": "Unable to fetch site changes"}
+                return jsonify(payload), result
+
+            summaries = []
+            for chunk in chunked(site_ids):
+                rows = SiteSummary.get_by_site_ids(chunk)
+                if rows is None:
+                    summaries = None
+                    break
+                summaries.extend(rows)
+
+        if summaries is None:
+            payload = {"message": "Unable to fetch site changes"}
+            return jsonify(payload), result
+
+        logging.info(f"[site_changes_get] since={since_at} reset={reset} changed={len(summaries)} deleted={len(deleted)}")
+        payload = {
+            "data": [summary.to_dict() for summary in summaries],
+            "deleted": deleted,
+            "reset": reset,
+            "next_cursor": encode_cursor(started_at - timedelta(seconds=CHANGES_OVERLAP_SECONDS)),
+            "message": "Succesfully fetched site changes",
+        }
+        result = 200
+
+    except Exception as error:
+        logging.error(f"[site_changes_get] Exception: {error}")
+        logging.error(traceback.format_exc())
+        result = 500
+        payload = {"message": generic_message}
+
+    return jsonify(payload), result
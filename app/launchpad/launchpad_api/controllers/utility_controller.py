@@ -4,6 +4,7 @@ from google.cloud import storage
 from ..models.generate_upload_url_post_request import GenerateUploadUrlPostRequest  # noqa: E501
 from .. import util
 from ..utils import messages
+from ..utils.cache import all_cache_stats
 from flask import jsonify
 import datetime
 
@@ -51,3 +52,25 @@ def generate_upload_url_post(body):  # noqa: E501
         result = 400
         payload = {"message":messages.generic_message}
     return jsonify(payload),result
+
+
+def cache_stats_get():  # noqa: E501
+    """Get hit/miss/eviction counters of the in-process caches
+
+     # noqa: E501
+
+
+    :rtype: Union[object, Tuple[object, int], Tuple[object, int, Dict[str, str]]
+    """
+    result = 400
+    payload = {"message":messages.generic_message}
+
+    try:
+        payload = {"message":"Cache stats","data":all_cache_stats()}
+        result = 200
+    except Exception as error:
+        logging.info(error)
+        print(error)
+        result = 400
+        payload = {"message":messages.generic_message}
+    return jsonify(payload),result
@@ -1,5 +1,9 @@
 from .scoping_approval import ScopingApproval
 from .approval_action import ApprovalAction
+from .approval_audit_outbox import ApprovalAuditOutbox
 from .go_live_data import GoLiveData
 from .procurement_data import ProcurementData
 
+from .site_summary import SiteSummary
+from .site_tombstone import SiteTombstone
+from .deployment_template import DeploymentTemplate
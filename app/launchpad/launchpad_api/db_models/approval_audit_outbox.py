@@ -0,0 +1,102 @@
+from datetime import datetime
+from ..db import db
+import traceback
+
+class ApprovalAuditOutbox(db.Model):
+    """An approval action waiting to be written to approval_actions.
+
+    Rows are added in the same transaction as the approval change they
+    describe and moved to approval_actions (and any downstream sinks) by the
+    drainer in utils/approval_audit.py, which deletes them once delivered.
+    Rows that keep failing are dead-lettered (dead_lettered_at set) and
+    skipped from then on; they stay in the table for inspection.
+    """
+    __tablename__ = 'approval_audit_outbox'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    approval_id = db.Column(db.Integer, db.ForeignKey('scoping_approvals.id', ondelete='CASCADE'), nullable=False)
+    action = db.Column(db.String(50), nullable=False)
+    performed_by = db.Column(db.Integer, nullable=False)
+    performed_by_role = db.Column(db.String(50), nullable=False)
+    performed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    comment = db.Column(db.Text, nullable=True)
+    action_metadata = db.Column(db.JSON, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    dead_lettered_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_approval_audit_outbox_dead_lettered', 'dead_lettered_at', 'id'),
+    )
+
+    def __init__(self, approval_id, action, performed_by, performed_by_role, comment=None, action_metadata=None):
+        self.approval_id = approval_id
+        self.action = action
+        self.performed_by = performed_by
+        self.performed_by_role = performed_by_role
+        self.comment = comment
+        self.action_metadata = action_metadata
+        self.performed_at = datetime.utcnow()
+        self.attempts = 0
+
+    def __repr__(self):
+        return f"<ApprovalAuditOutbox(id={self.id}, approval_id={self.approval_id}, action='{self.action}')>"
+
+    def to_action(self):
+        """Column values of the approval_actions row this entry becomes."""
+        return {
+            "approval_id": self.approval_id,
+            "action": self.action,
+            "performed_by": self.performed_by,
+            "performed_by_role": self.performed_by_role,
+            "performed_at": self.performed_at,
+            "comment": self.comment,
+            "action_metadata": self.action_metadata,
+            "created_at": self.created_at or self.performed_at,
+        }
+
+    @staticmethod
+    def get_batch(limit):
+        """Oldest `limit` live entries, locked (SKIP LOCKED) so concurrent drainers split the work."""
+        try:
+            return (
+                ApprovalAuditOutbox.query
+                .filter(ApprovalAuditOutbox.dead_lettered_at.is_(None))
+                .order_by(ApprovalAuditOutbox.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return None
+
+    @staticmethod
+    def pending_count():
+        """Number of entries not delivered yet, dead-lettered ones excluded."""
+        try:
+            return (
+                db.session.query(db.func.count(ApprovalAuditOutbox.id))
+                .filter(ApprovalAuditOutbox.dead_lettered_at.is_(None))
+                .scalar()
+            )
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return None
+
+    @staticmethod
+    def dead_letter_count():
+        """Number of entries given up on after too many failed attempts."""
+        try:
+            return (
+                db.session.query(db.func.count(ApprovalAuditOutbox.id))
+                .filter(ApprovalAuditOutbox.dead_lettered_at.isnot(None))
+                .scalar()
+            )
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return None
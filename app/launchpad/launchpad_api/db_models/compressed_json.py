@@ -0,0 +1,153 @@
+"""
+Compressed JSON column type.
+
+CompressedJSON stores JSON documents compressed once their serialized size
+reaches a threshold; smaller documents are stored as plain JSON so the common
+case costs nothing. Two storage modes:
+
+- binary (default): LONGBLOB holding one marker byte followed by the payload
+  (b"j" plain JSON, b"z" zlib, b"s" zstd). Used for blobs nobody queries in
+  SQL, e.g. scoping_approvals.scoping_data / cost_breakdown.
+- envelope: keeps a JSON column and stores large values as
+  {"$compressed": "zlib", "data": "<base64>"}. Used for field.field_value,
+  whose small values must stay readable by MySQL JSON functions.
+
+Reads accept legacy uncompressed JSON in either mode, so existing rows stay
+readable until utils/blob_migration.py rewrites them. Writes do not: in binary
+mode the column must already be LONGBLOB on MySQL (a JSON column rejects the
+marker-prefixed payload), so the schema bootstrap in main.py switches
+scoping_data / cost_breakdown over (blob_migration.alter_columns()) before the
+application writes to them.
+
+Values are decoded (and decompressed) when the row is loaded, not on first
+access. Columns that listings do not need must therefore not be loaded at all:
+the scoping_approvals blobs are deferred() on the model, while field.field_value
+is loaded with every Field, so queries that only need field ids defer() it.
+
+BLOB_CODEC=zstd selects zstd for new writes (requires the zstandard package);
+the default is zlib from the standard library.
+"""
+
+import base64
+import json
+import os
+import zlib
+
+from sqlalchemy.types import TypeDecorator, LargeBinary, JSON
+from sqlalchemy.dialects.mysql import LONGBLOB
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional, zlib is the default codec
+    zstandard = None
+
+
+PLAIN_MARKER = b"j"
+ZLIB_MARKER = b"z"
+ZSTD_MARKER = b"s"
+
+ENVELOPE_KEY = "$compressed"
+
+BLOB_CODEC = os.getenv("BLOB_CODEC", "zlib").lower()
+# Serialized size (bytes) from which values are compressed
+BLOB_COMPRESSION_THRESHOLD = int(os.getenv("BLOB_COMPRESSION_THRESHOLD", "1024"))
+
+
+def _compress(raw, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("BLOB_CODEC=zstd but the zstandard package is not installed")
+        return ZSTD_MARKER, zstandard.ZstdCompressor(level=3).compress(raw)
+    return ZLIB_MARKER, zlib.compress(raw, 6)
+
+
+def _decompress(marker, payload):
+    if marker == ZLIB_MARKER:
+        return zlib.decompress(payload)
+    if marker == ZSTD_MARKER:
+        if zstandard is None:
+            raise RuntimeError("Value is zstd compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f"Unknown compression marker {marker!r}")
+
+
+_CODEC_NAMES = {ZLIB_MARKER: "zlib", ZSTD_MARKER: "zstd"}
+_CODEC_MARKERS = {name: marker for marker, name in _CODEC_NAMES.items()}
+
+
+def encode(value, threshold=None, codec=None, envelope=False):
+    """Python value -> stored representation (bytes, or a JSON value when envelope)."""
+    if value is None:
+        return None
+    threshold = BLOB_COMPRESSION_THRESHOLD if threshold is None else threshold
+    raw = json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    if len(raw) < threshold:
+        return value if envelope else PLAIN_MARKER + raw
+
+    marker, payload = _compress(raw, codec or BLOB_CODEC)
+    if len(payload) >= len(raw):
+        # Incompressible; not worth the decode cost
+        return value if envelope else PLAIN_MARKER + raw
+    if envelope:
+        return {ENVELOPE_KEY: _CODEC_NAMES[marker], "data": base64.b64encode(payload).decode("ascii")}
+    return marker + payload
+
+
+def is_compressed(stored):
+    """True if `stored` (bytes or an envelope) holds a compressed payload."""
+    if isinstance(stored, dict):
+        return stored.get(ENVELOPE_KEY) in _CODEC_MARKERS and set(stored) == {ENVELOPE_KEY, "data"}
+    if isinstance(stored, (bytes, bytearray, memoryview)):
+        return bytes(stored[:1]) in (ZLIB_MARKER, ZSTD_MARKER)
+    return False
+
+
+def decode(stored, envelope=False):
+    """Stored representation -> Python value; accepts legacy plain JSON."""
+    if stored is None:
+        return None
+
+    if envelope:
+        # The JSON column has already parsed the value
+        if is_compressed(stored):
+            raw = _decompress(_CODEC_MARKERS[stored[ENVELOPE_KEY]], base64.b64decode(stored["data"]))
+            return json.loads(raw)
+        return stored
+
+    if isinstance(stored, str):
+        # Legacy JSON text read through a driver that returns str
+        return json.loads(stored)
+    stored = bytes(stored)
+    marker, payload = stored[:1], stored[1:]
+    if marker == PLAIN_MARKER:
+        return json.loads(payload)
+    if marker in (ZLIB_MARKER, ZSTD_MARKER):
+        return json.loads(_decompress(marker, payload))
+    # Legacy JSON text written before the column was converted
+    return json.loads(stored)
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON column compressed above `threshold` bytes (see module docstring)."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, threshold=None, envelope=False, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threshold = threshold
+        self.envelope = envelope
+
+    def load_dialect_impl(self, dialect):
+        if self.envelope:
+            return dialect.type_descriptor(JSON())
+        if dialect.name == "mysql":
+            return dialect.type_descriptor(LONGBLOB())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        return encode(value, threshold=self.threshold, envelope=self.envelope)
+
+    def process_result_value(self, value, dialect):
+        return decode(value, envelope=self.envelope)
@@ -0,0 +1,130 @@
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+import logging
+from ..db import db
+import traceback
+
+class DeploymentTemplate(db.Model):
+    """A deployment checklist: the ordered steps a site must go through.
+
+    `steps` is a list of step definitions:
+        {"id": "hardware_delivery", "name": "Hardware Delivery",
+         "estimatedHours": 4, "requires": ["deliveryReceipt"]}
+    where `requires` lists the keys a step must carry once completed.
+    `version` is bumped on every change so compiled copies (see
+    utils/deployment_engine.py) can be cached per version.
+    """
+    __tablename__ = 'deployment_templates'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    name = db.Column(db.String(255), nullable=False, unique=True)
+    description = db.Column(db.Text, nullable=True)
+    steps = db.Column(db.JSON, nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    is_default = db.Column(db.Boolean, nullable=False, default=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __init__(self, name, steps, description=None, is_default=False):
+        self.name = name
+        self.steps = steps
+        self.description = description
+        self.is_default = is_default
+        self.version = 1
+
+    def __repr__(self):
+        return f"<DeploymentTemplate(id={self.id}, name='{self.name}', version={self.version})>"
+
+    def to_dict(self):
+        """Convert model to dictionary for JSON serialization."""
+        return {
+            "id": str(self.id),
+            "name": self.name,
+            "description": self.description,
+            "steps": self.steps,
+            "version": self.version,
+            "is_default": self.is_default,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def create_row(self, commit=True):
+        """Insert a new DeploymentTemplate record into the database."""
+        try:
+            db.session.add(self)
+            db.session.flush()
+            if commit:
+                db.session.commit()
+            return self
+        except IntegrityError:
+            db.session.rollback()
+            logging.warning(f"[DeploymentTemplate.create_row] Duplicate template name '{self.name}'")
+            return None
+        except Exception:
+            db.session.rollback()
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return False
+
+    def update_row(self, commit=True):
+        """Commit changes made to this template and bump its version."""
+        try:
+            self.version = (self.version or 0) + 1
+            db.session.add(self)
+            if commit:
+                db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+            logging.warning(f"[DeploymentTemplate.update_row] Duplicate template name '{self.name}'")
+            return None
+        except Exception:
+            db.session.rollback()
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return False
+
+    @staticmethod
+    def get_by_id(template_id):
+        """Fetch a DeploymentTemplate record safely by ID."""
+        try:
+            return DeploymentTemplate.query.get(template_id)
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return None
+
+    @staticmethod
+    def get_all():
+        """Fetch all templates, default first."""
+        try:
+            return DeploymentTemplate.query.order_by(
+                DeploymentTemplate.is_default.desc(), DeploymentTemplate.name
+            ).all()
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return None
+
+    @staticmethod
+    def get_version(template_id=None):
+        """(id, version) of a template, or of the default one when template_id is None."""
+        try:
+            query = db.session.query(DeploymentTemplate.id, DeploymentTemplate.version)
+            if template_id is None:
+                query = query.filter(DeploymentTemplate.is_default.is_(True)).order_by(DeploymentTemplate.id)
+            else:
+                query = query.filter(DeploymentTemplate.id == template_id)
+            return query.first()
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return None
+
+    @staticmethod
+    def clear_default(except_id=None):
+        """Unset is_default on every other template; does not commit."""
+        query = DeploymentTemplate.query.filter(DeploymentTemplate.is_default.is_(True))
+        if except_id is not None:
+            query = query.filter(DeploymentTemplate.id != except_id)
+        return query.update({DeploymentTemplate.is_default: False}, synchronize_session=False)
@@ -1,7 +1,8 @@
 from datetime import datetime
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, bindparam
 from sqlalchemy.exc import IntegrityError
 from ..db import db
+from .compressed_json import CompressedJSON
 import traceback
 
 class Field(db.Model):
@@ -9,10 +10,12 @@ class Field(db.Model):
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     field_name = db.Column(db.String(255), nullable=False)
-    field_value = db.Column(db.JSON, nullable=True)  # stores JSON data
+    # stores JSON data; large values are compressed inside a JSON envelope so
+    # small ones stay readable by SQL JSON functions
+    field_value = db.Column(CompressedJSON(envelope=True), nullable=True)
     section_id = db.Column(db.Integer, db.ForeignKey('section.id',ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     __table_args__ = (
         UniqueConstraint('field_name', 'section_id', name='uix_fieldname_sectionid'),
@@ -75,6 +78,26 @@ class Field(db.Model):
             print(traceback.format_exc())
             return False
 
+    @staticmethod
+    def insert_multiple(data_list):
+        """
+        Insert many Field records with a single executemany INSERT.
+
+        :param data_list: List of dicts with field_name, field_value, section_id
+        :return: number of fields inserted
+
+        Does not commit; IntegrityError propagates to the caller's transaction.
+        Use get_by_section_ids() to read the created rows back.
+        """
+        if not data_list:
+            return 0
+
+        now = datetime.utcnow()
+        db.session.execute(Field.__table__.insert(), [
+            dict(data, created_at=now, updated_at=now) for data in data_list
+        ])
+        return len(data_list)
+
     def update_row(self,commit=True):
         """Commit changes made to an existing Site record."""
         try:
@@ -138,6 +161,48 @@ class Field(db.Model):
             print(exceptionstring)
             return None
 
+    @staticmethod
+    def get_by_ids(field_ids):
+        """Fetch Field records safely by multiple field IDs."""
+        try:
+            if not field_ids:
+                return []
+
+            fields = Field.query.filter(Field.id.in_(field_ids)).all()
+            return fields
+        except Exception:
+            import traceback
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return None
+
+    @staticmethod
+    def update_values(values):
+        """
+        Write many field values with a single executemany UPDATE.
+
+        :param values: dict of {field_id: field_value}
+        :return: number of fields written
+
+        Does not commit. Runs as Core SQL, so ORM instances already loaded for
+        these ids are stale until expired/refreshed.
+        """
+        if not values:
+            return 0
+
+        table = Field.__table__
+        now = datetime.utcnow()
+        stmt = (
+            table.update()
+            .where(table.c.id == bindparam("_field_id"))
+            .values(field_value=bindparam("_field_value"), updated_at=bindparam("_updated_at"))
+        )
+        db.session.execute(stmt, [
+            {"_field_id": field_id, "_field_value": value, "_updated_at": now}
+            for field_id, value in values.items()
+        ])
+        return len(values)
+
     def check_all_ids_exist(field_ids):
         """Fetch all sections by IDs and ensure they all exist."""
         try:
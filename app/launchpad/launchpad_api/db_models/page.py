@@ -10,7 +10,7 @@ class Page(db.Model):
     page_name = db.Column(db.String(255), nullable=False)
     site_id = db.Column(db.Integer, db.ForeignKey('site.id',ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     __table_args__ = (
         UniqueConstraint('page_name', 'site_id', name='uix_pagename_siteid'),
@@ -40,10 +40,12 @@ class Page(db.Model):
             print(exceptionstring)
             return False
 
-    def update_row(self):
+    def update_row(self,commit=True):
         """Commit updates made to this Page record."""
         try:
-            db.session.commit()
+            db.session.add(self)
+            if commit:
+                db.session.commit()
             return True
         except Exception:
             db.session.rollback()
@@ -1,14 +1,19 @@
 from datetime import datetime
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import delete
+from sqlalchemy import delete, update, select, func, case, and_, or_, true, literal
+from sqlalchemy.orm import deferred, undefer_group, load_only
 import logging
 from ..db import db
+from .compressed_json import CompressedJSON
 import traceback
 import json
 
 class ScopingApproval(db.Model):
     __tablename__ = 'scoping_approvals'
 
+    # ?view= values of the approval listing; "summary" leaves out the JSON blobs
+    VIEWS = ("full", "summary")
+
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     site_id = db.Column(db.Integer, db.ForeignKey('site.id', ondelete='CASCADE'), nullable=False)
     site_name = db.Column(db.String(255), nullable=False)
@@ -22,13 +27,37 @@ class ScopingApproval(db.Model):
     reviewed_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     review_comment = db.Column(db.Text, nullable=True)
     rejection_reason = db.Column(db.Text, nullable=True)
-    scoping_data = db.Column(db.JSON, nullable=False)  # Contains selected_software and selected_hardware
-    cost_breakdown = db.Column(db.JSON, nullable=False)  # Contains cost summary
+    # Large JSON documents: stored compressed and only loaded when accessed
+    # (or when a query undefers the "blobs" group)
+    scoping_data = deferred(db.Column(CompressedJSON, nullable=False), group="blobs")  # Contains selected_software and selected_hardware
+    cost_breakdown = deferred(db.Column(CompressedJSON, nullable=False), group="blobs")  # Contains cost summary
     version = db.Column(db.Integer, nullable=False, default=1)
     previous_version_id = db.Column(db.Integer, db.ForeignKey('scoping_approvals.id'), nullable=True)
+    # The site's current approval (highest version, then newest); kept up to
+    # date by create_row() / delete_row() through mark_latest()
+    is_latest = db.Column(db.Boolean, nullable=False, default=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Keyset pagination of the listing (newest first)
+        db.Index('idx_scoping_approvals_created_at_id', 'created_at', 'id'),
+        # get_pending_by_site_id() / get_by_site_id()
+        db.Index('idx_scoping_approvals_site_status', 'site_id', 'status'),
+        db.Index('idx_scoping_approvals_site_version', 'site_id', 'version'),
+        # Current approval of every site
+        db.Index('idx_scoping_approvals_latest_site', 'is_latest', 'site_id'),
+        # Covers the GROUP BY of get_status_counts()
+        db.Index('idx_scoping_approvals_status_engineer_site', 'status', 'deployment_engineer_id', 'site_id'),
+    )
+
+    # Rank of an approval within its site, current one first
+    LATEST_ORDER = ('version', 'created_at', 'id')
+
+    # Resubmissions followed by get_version_chain(); also stops a corrupt
+    # previous_version_id cycle
+    MAX_VERSION_CHAIN = 100
+
     # Relationships
     site = db.relationship('Site', backref=db.backref('scoping_approvals', lazy=True))
     deployment_engineer = db.relationship('User', foreign_keys=[deployment_engineer_id], backref='submitted_approvals')
@@ -50,13 +79,14 @@ class ScopingApproval(db.Model):
         self.cost_breakdown = cost_breakdown if isinstance(cost_breakdown, dict) else json.loads(cost_breakdown) if isinstance(cost_breakdown, str) else cost_breakdown
         self.version = version
         self.previous_version_id = previous_version_id
+        self.is_latest = True
 
     def __repr__(self):
         return f"<ScopingApproval(id={self.id}, site_id={self.site_id}, status='{self.status}')>"
 
-    def to_dict(self):
-        """Convert the model to a dictionary."""
-        return {
+    def to_dict(self, include_blobs=True):
+        """Convert the model to a dictionary; without the JSON blobs when include_blobs is False."""
+        _approval = {
             'id': str(self.id),
             'site_id': str(self.site_id),
             'site_name': self.site_name,
@@ -70,19 +100,28 @@ class ScopingApproval(db.Model):
             'reviewed_by': str(self.reviewed_by) if self.reviewed_by else None,
             'review_comment': self.review_comment,
             'rejection_reason': self.rejection_reason,
-            'scoping_data': self.scoping_data,
-            'cost_breakdown': self.cost_breakdown,
             'version': self.version,
             'previous_version_id': str(self.previous_version_id) if self.previous_version_id else None,
+            'is_latest': bool(self.is_latest),
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        # Not touching the attributes keeps deferred blob columns unloaded
+        if include_blobs:
+            _approval['scoping_data'] = self.scoping_data
+            _approval['cost_breakdown'] = self.cost_breakdown
+        return _approval
+
+    def cursor_key(self):
+        """Sort key values of this row, as stored in a pagination cursor."""
+        return (self.created_at, self.id)
 
     def create_row(self, commit=True):
         """Insert a new ScopingApproval record into the database."""
         try:
             db.session.add(self)
             db.session.flush()
+            ScopingApproval.mark_latest(self.site_id)
             if commit:
                 db.session.commit()
             return self.id
@@ -129,6 +168,8 @@ class ScopingApproval(db.Model):
             deleted_count = result.rowcount
             
             if deleted_count > 0:
+                if self.is_latest:
+                    ScopingApproval.mark_latest(self.site_id)
                 db.session.commit()
                 return self.id
             else:
@@ -148,32 +189,189 @@ class ScopingApproval(db.Model):
             logging.error(f"[ScopingApproval.delete_row] Full traceback: {exceptionstring}")
             raise
 
+    @staticmethod
+    def _latest_ordering():
+        return [getattr(ScopingApproval, column).desc() for column in ScopingApproval.LATEST_ORDER]
+
+    @staticmethod
+    def mark_latest(site_id):
+        """
+        Move is_latest to the site's current approval; does not commit.
+        Two UPDATEs on the (site_id, ...) indexes.
+        """
+        current_id = (
+            db.session.query(ScopingApproval.id)
+            .filter(ScopingApproval.site_id == site_id)
+            .order_by(*ScopingApproval._latest_ordering())
+            .limit(1)
+            .scalar()
+        )
+        db.session.execute(
+            update(ScopingApproval)
+            .where(ScopingApproval.site_id == site_id, ScopingApproval.is_latest == true(),
+                   ScopingApproval.id != current_id)
+            .values(is_latest=False)
+            .execution_options(synchronize_session=False)
+        )
+        if current_id is not None:
+            db.session.execute(
+                update(ScopingApproval)
+                .where(ScopingApproval.id == current_id)
+                .values(is_latest=True)
+                .execution_options(synchronize_session=False)
+            )
+        return current_id
+
+    @staticmethod
+    def backfill_latest():
+        """
+        Recompute is_latest for every site with one set-based UPDATE ranking
+        the approvals with ROW_NUMBER() per site; only runs when some site
+        has several (or no) approvals flagged. Returns whether it ran.
+        """
+        try:
+            flagged = func.sum(case((ScopingApproval.is_latest == true(), 1), else_=0))
+            inconsistent = (
+                db.session.query(ScopingApproval.site_id)
+                .group_by(ScopingApproval.site_id)
+                .having(flagged != 1)
+                .limit(1)
+                .first()
+            )
+            if inconsistent is None:
+                return False
+
+            rank = func.row_number().over(
+                partition_by=ScopingApproval.site_id,
+                order_by=ScopingApproval._latest_ordering(),
+            ).label("site_rank")
+            ranked = select(ScopingApproval.id.label("id"), rank).subquery("ranked")
+            current_ids = select(ranked.c.id).where(ranked.c.site_rank == 1)
+
+            db.session.execute(
+                update(ScopingApproval)
+                .values(is_latest=ScopingApproval.id.in_(current_ids))
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            logging.info("[ScopingApproval.backfill_latest] Recomputed is_latest flags")
+            return True
+        except Exception:
+            db.session.rollback()
+            exceptionstring = traceback.format_exc()
+            logging.error(f"[ScopingApproval.backfill_latest] Error: {exceptionstring}")
+            return False
+
     @staticmethod
     def get_by_id(approval_id):
         """Fetch a ScopingApproval record safely by ID."""
         try:
-            approval = ScopingApproval.query.get(approval_id)
+            approval = ScopingApproval.query.options(undefer_group("blobs")).get(approval_id)
             return approval
         except Exception:
             exceptionstring = traceback.format_exc()
             logging.error(f"[ScopingApproval.get_by_id] Error: {exceptionstring}")
             return None
 
+    @staticmethod
+    def get_version_chain(approval_id, max_depth=None):
+        """
+        Scalar rows (id, site_id, version, previous_version_id, created_at,
+        depth) of `approval_id` and every earlier version it was resubmitted
+        from, newest first, in one recursive query along previous_version_id.
+        Empty when the approval does not exist.
+        """
+        try:
+            max_depth = max_depth or ScopingApproval.MAX_VERSION_CHAIN
+            approvals = ScopingApproval.__table__
+            chain = (
+                select(approvals.c.id, approvals.c.previous_version_id, literal(0).label("depth"))
+                .where(approvals.c.id == approval_id)
+                .cte("version_chain", recursive=True)
+            )
+            parent = approvals.alias("parent")
+            chain = chain.union_all(
+                select(parent.c.id, parent.c.previous_version_id, (chain.c.depth + 1).label("depth"))
+                .where(parent.c.id == chain.c.previous_version_id, chain.c.depth < max_depth)
+            )
+            return (
+                db.session.query(
+                    ScopingApproval.id, ScopingApproval.site_id, ScopingApproval.version,
+                    ScopingApproval.previous_version_id, ScopingApproval.created_at, chain.c.depth,
+                )
+                .join(chain, chain.c.id == ScopingApproval.id)
+                .order_by(chain.c.depth)
+                .all()
+            )
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            logging.error(f"[ScopingApproval.get_version_chain] Error: {exceptionstring}")
+            return None
+
     @staticmethod
     def get_by_site_id(site_id, status=None):
         """Get the most recent scoping approval for a site, optionally filtered by status."""
         try:
-            query = ScopingApproval.query.filter_by(site_id=site_id)
+            query = ScopingApproval.query.options(undefer_group("blobs")).filter_by(site_id=site_id)
             if status:
                 query = query.filter_by(status=status)
             # Get the most recent one (highest version or latest created_at)
-            approval = query.order_by(ScopingApproval.version.desc(), ScopingApproval.created_at.desc()).first()
+            approval = query.order_by(*ScopingApproval._latest_ordering()).first()
             return approval
         except Exception:
             exceptionstring = traceback.format_exc()
             logging.error(f"[ScopingApproval.get_by_site_id] Error: {exceptionstring}")
             return None
 
+    @staticmethod
+    def get_current_by_site_ids(site_ids=None, status=None):
+        """
+        {site_id: current approval} for `site_ids` (every site when None) in
+        one query on the (is_latest, site_id) index, blobs deferred.
+        """
+        try:
+            query = ScopingApproval.query.filter(ScopingApproval.is_latest == true())
+            if site_ids is not None:
+                if not site_ids:
+                    return {}
+                query = query.filter(ScopingApproval.site_id.in_(site_ids))
+            if status:
+                query = query.filter_by(status=status)
+            return {approval.site_id: approval for approval in query.all()}
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            logging.error(f"[ScopingApproval.get_current_by_site_ids] Error: {exceptionstring}")
+            return None
+
+    @staticmethod
+    def get_status_counts(current=False):
+        """
+        Approval counts in one GROUP BY status, deployment_engineer_id,
+        site_id query: (status, deployment_engineer_id, engineer name,
+        site_id, site_name, count) rows. With current=True only the current
+        approval of each site is counted.
+        """
+        try:
+            query = db.session.query(
+                ScopingApproval.status,
+                ScopingApproval.deployment_engineer_id,
+                func.max(ScopingApproval.deployment_engineer_name).label("deployment_engineer_name"),
+                ScopingApproval.site_id,
+                func.max(ScopingApproval.site_name).label("site_name"),
+                func.count(ScopingApproval.id).label("count"),
+            )
+            if current:
+                query = query.filter(ScopingApproval.is_latest == true())
+            return (
+                query.group_by(ScopingApproval.status, ScopingApproval.deployment_engineer_id,
+                               ScopingApproval.site_id)
+                .all()
+            )
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            logging.error(f"[ScopingApproval.get_status_counts] Error: {exceptionstring}")
+            return None
+
     @staticmethod
     def get_pending_by_site_id(site_id):
         """Check if there's a pending approval for a site."""
@@ -189,7 +387,7 @@ class ScopingApproval(db.Model):
     def get_all(status=None, site_id=None):
         """Fetch all ScopingApproval records with optional filters."""
         try:
-            query = ScopingApproval.query
+            query = ScopingApproval.query.options(undefer_group("blobs"))
             if status:
                 query = query.filter_by(status=status)
             if site_id:
@@ -202,3 +400,44 @@ class ScopingApproval(db.Model):
             logging.error(f"[ScopingApproval.get_all] Error: {exceptionstring}")
             return None
 
+
+    @staticmethod
+    def get_page(limit=None, after=None, status=None, site_id=None, view="full", current=False):
+        """
+        Fetch one keyset page of the approval listing, newest first; with
+        current=True only the current approval of each site (is_latest).
+
+        `after` is the decoded cursor of the previous page: [created_at, id].
+        With view="summary" only the scalar columns are selected; the JSON
+        blobs are left to get_by_id(). Returns limit + 1 rows when limit is
+        set so the caller can tell whether a next page exists.
+        """
+        try:
+            query = ScopingApproval.query
+            if view == "summary":
+                query = query.options(load_only(*[
+                    column.key for column in ScopingApproval.__table__.columns
+                    if column.key not in ('scoping_data', 'cost_breakdown')
+                ]))
+            else:
+                query = query.options(undefer_group("blobs"))
+            if status:
+                query = query.filter_by(status=status)
+            if site_id:
+                query = query.filter_by(site_id=site_id)
+            if current:
+                query = query.filter(ScopingApproval.is_latest == true())
+            if after:
+                after_created_at = datetime.fromisoformat(after[0])
+                query = query.filter(or_(
+                    ScopingApproval.created_at < after_created_at,
+                    and_(ScopingApproval.created_at == after_created_at, ScopingApproval.id < after[1]),
+                ))
+            query = query.order_by(ScopingApproval.created_at.desc(), ScopingApproval.id.desc())
+            if limit:
+                query = query.limit(limit + 1)
+            return query.all()
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            logging.error(f"[ScopingApproval.get_page] Error: {exceptionstring}")
+            return None
@@ -1,7 +1,7 @@
 from datetime import datetime
 from ..db import db
 import traceback
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, select
 
 class Section(db.Model):
     __tablename__ = 'section'
@@ -10,7 +10,7 @@ class Section(db.Model):
     section_name = db.Column(db.String(255), nullable=False)
     page_id = db.Column(db.Integer, db.ForeignKey('page.id',ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     __table_args__ = (
         UniqueConstraint('section_name', 'page_id', name='uix_sectionname_pageid'),
@@ -41,6 +41,32 @@ class Section(db.Model):
             print(exceptionstring)
             return False
 
+    @staticmethod
+    def insert_multiple(section_names, page_id):
+        """
+        Insert the sections of a new page with a single executemany INSERT.
+
+        :param section_names: list of section names (unique within the page)
+        :param page_id: id of the page they belong to
+        :return: dict of {section_name: section_id}
+
+        Does not commit; IntegrityError propagates to the caller's transaction.
+        """
+        if not section_names:
+            return {}
+
+        now = datetime.utcnow()
+        db.session.execute(Section.__table__.insert(), [
+            {"section_name": name, "page_id": page_id, "created_at": now, "updated_at": now}
+            for name in section_names
+        ])
+        rows = db.session.execute(
+            select(Section.__table__.c.section_name, Section.__table__.c.id)
+            .where(Section.__table__.c.page_id == page_id,
+                   Section.__table__.c.section_name.in_(section_names))
+        )
+        return {name: section_id for name, section_id in rows}
+
     def update_row(self,commit=True):
         """Commit changes made to an existing Site record."""
         try:
@@ -8,7 +8,11 @@ class Site(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     status = db.Column(db.String(50), nullable=False, default='created')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Set when the site is deleted; its rows are then purged in the background
+    deleted_at = db.Column(db.DateTime, nullable=True, index=True)
+    # Deployment checklist of this site; NULL uses the default template
+    deployment_template_id = db.Column(db.Integer, db.ForeignKey('deployment_templates.id', ondelete='SET NULL'), nullable=True)
 
     def __init__(self, status='created'):
         self.status = status
@@ -59,9 +63,11 @@ class Site(db.Model):
 
     @staticmethod
     def get_by_id(site_id):
-        """Fetch a Site record safely by ID."""
+        """Fetch a Site record safely by ID (None once it is deleted)."""
         try:
             site = Site.query.get(site_id)
+            if site is not None and site.deleted_at is not None:
+                return None
             return site
         except Exception:
             exceptionstring = traceback.format_exc()
@@ -88,7 +94,7 @@ class Site(db.Model):
     @staticmethod
     def get_all_sites():
         try:
-            all_sites = Site.query.all()
+            all_sites = Site.query.filter(Site.deleted_at.is_(None)).all()
             return all_sites
         except Exception:
             exceptionstring = traceback.format_exc()
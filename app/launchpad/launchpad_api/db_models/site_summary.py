@@ -0,0 +1,212 @@
+from datetime import datetime, date
+from sqlalchemy import and_, or_, func, case
+from ..db import db
+import traceback
+
+class SiteSummary(db.Model):
+    """One-row-per-site projection of the create_site/general_info fields.
+
+    Kept in sync by utils.site_summary.refresh_site_summary() inside the same
+    transaction as the write that changed the underlying site/page/field rows.
+    """
+    __tablename__ = 'site_summary'
+
+    # ?sort= values accepted by the site listing
+    SORT_KEYS = ("site_id", "target_live_date")
+
+    site_id = db.Column(db.Integer, db.ForeignKey('site.id', ondelete='CASCADE'), primary_key=True, autoincrement=False)
+    site_name = db.Column(db.String(255), nullable=True)
+    organization_id = db.Column(db.String(64), nullable=True)
+    organization_name = db.Column(db.String(255), nullable=True, index=True)
+    organization_logo = db.Column(db.String(512), nullable=True)
+    unit_code = db.Column(db.String(100), nullable=True)
+    sector = db.Column(db.String(100), nullable=True, index=True)
+    target_live_date = db.Column(db.Date, nullable=True, index=True)
+    suggested_go_live = db.Column(db.String(50), nullable=True)
+    assigned_ops_manager = db.Column(db.String(255), nullable=True)
+    assigned_deployment_engineer = db.Column(db.String(255), nullable=True)
+    status = db.Column(db.String(50), nullable=True, index=True)
+    # Deployment checklist state, written by page_put / page_post from the
+    # step engine evaluation; NULL until the site has a checklist
+    progress = db.Column(db.SmallInteger, nullable=True, index=True)
+    current_step = db.Column(db.String(100), nullable=True)
+    # Every other general_info field_name -> decoded value (and the raw text
+    # of a target_live_date that is not a date), returned as-is by to_dict()
+    extra = db.Column(db.JSON, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Covers the GROUP BY of deployment_progress()
+        db.Index('idx_site_summary_current_step_progress', 'current_step', 'progress'),
+    )
+
+    def __init__(self, site_id, **columns):
+        self.site_id = site_id
+        for key, value in columns.items():
+            setattr(self, key, value)
+
+    def __repr__(self):
+        return f"<SiteSummary(site_id={self.site_id}, site_name='{self.site_name}', status='{self.status}')>"
+
+    def to_dict(self):
+        """Serialize in the shape the /site/all consumers already expect."""
+        _site = {
+            "site_id": self.site_id,
+            "status": self.status,
+            "name": self.site_name,
+            "site_name": self.site_name,
+            "organization_id": self.organization_id,
+            "organization_name": self.organization_name,
+            "organization_logo": self.organization_logo,
+            "unit_code": self.unit_code,
+            "sector": self.sector,
+            "target_live_date": self.target_live_date.isoformat() if self.target_live_date else None,
+            "suggested_go_live": self.suggested_go_live,
+            "assigned_ops_manager": self.assigned_ops_manager,
+            "assigned_deployment_engineer": self.assigned_deployment_engineer,
+            "progress": self.progress,
+            "current_step": self.current_step,
+        }
+        # Keep the payload as sparse as the old EAV pivot was; general_info
+        # keys without a column of their own come from extra
+        payload = dict(self.extra or {})
+        payload.update({key: value for key, value in _site.items() if value is not None or key in ("site_id", "status")})
+        return payload
+
+    @staticmethod
+    def get_by_site_id(site_id):
+        """Fetch a SiteSummary record safely by site ID."""
+        try:
+            return SiteSummary.query.get(site_id)
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return None
+
+    @staticmethod
+    def get_by_site_ids(site_ids):
+        """Fetch the SiteSummary rows of `site_ids` ordered by site ID."""
+        try:
+            if not site_ids:
+                return []
+            return SiteSummary.query.filter(SiteSummary.site_id.in_(site_ids)).order_by(SiteSummary.site_id).all()
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return None
+
+    @staticmethod
+    def get_all():
+        """Fetch every SiteSummary row ordered by site ID."""
+        try:
+            return SiteSummary.query.order_by(SiteSummary.site_id).all()
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return None
+
+    @staticmethod
+    def deployment_progress():
+        """
+        Per current_step rows of (current_step, sites, average_progress,
+        completed, not_started) over every site with a checklist, in one
+        GROUP BY on the (current_step, progress) index. Fully deployed sites
+        have current_step NULL.
+        """
+        try:
+            return (
+                db.session.query(
+                    SiteSummary.current_step,
+                    func.count(SiteSummary.site_id),
+                    func.avg(SiteSummary.progress),
+                    func.sum(case((SiteSummary.progress >= 100, 1), else_=0)),
+                    func.sum(case((SiteSummary.progress == 0, 1), else_=0)),
+                )
+                .filter(SiteSummary.progress.isnot(None))
+                .group_by(SiteSummary.current_step)
+                .all()
+            )
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return None
+
+    @staticmethod
+    def filtered_query(status=None, organization=None, sector=None, live_from=None, live_to=None):
+        """
+        Base query for the site listing with the optional filters applied;
+        live_from / live_to bound target_live_date (dates, inclusive).
+        """
+        query = SiteSummary.query
+        if status:
+            query = query.filter(SiteSummary.status == status)
+        if organization:
+            query = query.filter(or_(
+                SiteSummary.organization_name == organization,
+                SiteSummary.organization_id == organization,
+            ))
+        if sector:
+            query = query.filter(SiteSummary.sector == sector)
+        if live_from:
+            query = query.filter(SiteSummary.target_live_date >= live_from)
+        if live_to:
+            query = query.filter(SiteSummary.target_live_date <= live_to)
+        return query
+
+    @staticmethod
+    def count(status=None, organization=None, **filters):
+        """COUNT(*) of the filtered listing (ignores the cursor)."""
+        try:
+            query = SiteSummary.filtered_query(status, organization, **filters)
+            return query.with_entities(func.count(SiteSummary.site_id)).scalar()
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return None
+
+    @staticmethod
+    def get_page(limit=None, after=None, status=None, organization=None, sort="site_id", **filters):
+        """
+        Fetch one keyset page of the listing.
+
+        `after` is the decoded cursor of the previous page: [site_id] when
+        sorting by site_id, [target_live_date, site_id] when sorting by
+        target_live_date (rows without a date sort last). Returns limit + 1
+        rows when limit is set so the caller can tell whether a next page exists.
+        `filters` are the sector / live_from / live_to filters of filtered_query().
+        """
+        try:
+            query = SiteSummary.filtered_query(status, organization, **filters)
+
+            if sort == "target_live_date":
+                no_date = SiteSummary.target_live_date.is_(None)
+                if after:
+                    after_date, after_id = after
+                    if after_date is None:
+                        query = query.filter(and_(no_date, SiteSummary.site_id > after_id))
+                    else:
+                        after_date = date.fromisoformat(after_date)
+                        query = query.filter(or_(
+                            SiteSummary.target_live_date > after_date,
+                            and_(SiteSummary.target_live_date == after_date, SiteSummary.site_id > after_id),
+                            no_date,
+                        ))
+                query = query.order_by(no_date, SiteSummary.target_live_date, SiteSummary.site_id)
+            else:
+                if after:
+                    query = query.filter(SiteSummary.site_id > after[0])
+                query = query.order_by(SiteSummary.site_id)
+
+            if limit:
+                query = query.limit(limit + 1)
+            return query.all()
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return None
+
+    def cursor_key(self, sort="site_id"):
+        """Sort key values of this row, as stored in a pagination cursor."""
+        if sort == "target_live_date":
+            return (self.target_live_date, self.site_id)
+        return (self.site_id,)
@@ -0,0 +1,50 @@
+from datetime import datetime
+from ..db import db
+import traceback
+
+class SiteTombstone(db.Model):
+    """Marker left behind by a deleted site so delta sync clients can drop it.
+
+    site_id is not a foreign key: the site row is gone by the time anyone
+    reads this.
+    """
+    __tablename__ = 'site_tombstone'
+
+    site_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __init__(self, site_id, deleted_at=None):
+        self.site_id = site_id
+        self.deleted_at = deleted_at or datetime.utcnow()
+
+    def __repr__(self):
+        return f"<SiteTombstone(site_id={self.site_id}, deleted_at={self.deleted_at})>"
+
+    @staticmethod
+    def record(site_id):
+        """Add (or refresh) the tombstone for `site_id` without committing."""
+        tombstone = SiteTombstone.query.get(site_id)
+        if tombstone is None:
+            tombstone = SiteTombstone(site_id)
+            db.session.add(tombstone)
+        else:
+            tombstone.deleted_at = datetime.utcnow()
+        return tombstone
+
+    @staticmethod
+    def get_since(since):
+        """Ids of sites deleted at or after `since` (all tombstones when None)."""
+        try:
+            query = db.session.query(SiteTombstone.site_id)
+            if since is not None:
+                query = query.filter(SiteTombstone.deleted_at >= since)
+            return [site_id for (site_id,) in query.order_by(SiteTombstone.site_id).all()]
+        except Exception:
+            exceptionstring = traceback.format_exc()
+            print(exceptionstring)
+            return None
+
+    @staticmethod
+    def prune(before):
+        """Delete tombstones older than `before`; does not commit."""
+        return SiteTombstone.query.filter(SiteTombstone.deleted_at < before).delete(synchronize_session=False)
@@ -10,6 +10,14 @@ from flask_cors import CORS
 from flask_session import Session
 from sqlalchemy import text
 from .utils import messages, common_functions
+from .utils.site_summary import backfill_site_summaries, backfill_summary_extra, backfill_deployment_progress
+from .utils.cache_hooks import register_cache_hooks
+from .utils.site_search import site_search_index
+from .utils.site_purge import site_purge_worker
+from .utils.approval_audit import approval_audit_drainer
+from .utils.deployment_engine import ensure_default_template
+from .utils.blob_migration import alter_columns
+from .db_models.scoping_approval import ScopingApproval
 from .config import db_secrets
 
 logging.basicConfig(level=logging.INFO)
@@ -68,7 +76,9 @@ CREATE TABLE IF NOT EXISTS site (
     id INT AUTO_INCREMENT PRIMARY KEY,
     status VARCHAR(255) NOT NULL,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    deleted_at DATETIME NULL,
+    INDEX ix_site_deleted_at (deleted_at)
 );
 
 CREATE TABLE IF NOT EXISTS page (
@@ -183,10 +193,11 @@ CREATE TABLE IF NOT EXISTS scoping_approvals (
   reviewed_by INT NULL,
   review_comment TEXT NULL,
   rejection_reason TEXT NULL,
-  scoping_data JSON NOT NULL,
-  cost_breakdown JSON NOT NULL,
+  scoping_data LONGBLOB NOT NULL,
+  cost_breakdown LONGBLOB NOT NULL,
   version INT NOT NULL DEFAULT 1,
   previous_version_id INT NULL,
+  is_latest BOOLEAN NOT NULL DEFAULT TRUE,
   created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
   updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   FOREIGN KEY (site_id) REFERENCES site(id) ON DELETE CASCADE,
@@ -196,9 +207,21 @@ CREATE TABLE IF NOT EXISTS scoping_approvals (
   FOREIGN KEY (previous_version_id) REFERENCES scoping_approvals(id),
   INDEX idx_scoping_approvals_site_id (site_id),
   INDEX idx_scoping_approvals_status (status),
-  INDEX idx_scoping_approvals_deployment_engineer_id (deployment_engineer_id)
+  INDEX idx_scoping_approvals_deployment_engineer_id (deployment_engineer_id),
+  INDEX idx_scoping_approvals_created_at_id (created_at, id),
+  INDEX idx_scoping_approvals_site_status (site_id, status),
+  INDEX idx_scoping_approvals_site_version (site_id, version),
+  INDEX idx_scoping_approvals_latest_site (is_latest, site_id),
+  INDEX idx_scoping_approvals_status_engineer_site (status, deployment_engineer_id, site_id)
 );
 
+CREATE INDEX idx_scoping_approvals_created_at_id ON scoping_approvals (created_at, id);
+ALTER TABLE scoping_approvals ADD COLUMN is_latest BOOLEAN NOT NULL DEFAULT TRUE;
+CREATE INDEX idx_scoping_approvals_site_status ON scoping_approvals (site_id, status);
+CREATE INDEX idx_scoping_approvals_site_version ON scoping_approvals (site_id, version);
+CREATE INDEX idx_scoping_approvals_latest_site ON scoping_approvals (is_latest, site_id);
+CREATE INDEX idx_scoping_approvals_status_engineer_site ON scoping_approvals (status, deployment_engineer_id, site_id);
+
 CREATE TABLE IF NOT EXISTS approval_actions (
   id INT AUTO_INCREMENT PRIMARY KEY,
   approval_id INT NOT NULL,
@@ -214,6 +237,26 @@ CREATE TABLE IF NOT EXISTS approval_actions (
   INDEX idx_approval_actions_approval_id (approval_id)
 );
 
+CREATE TABLE IF NOT EXISTS approval_audit_outbox (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  approval_id INT NOT NULL,
+  action VARCHAR(50) NOT NULL,
+  performed_by INT NOT NULL,
+  performed_by_role VARCHAR(50) NOT NULL,
+  performed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  comment TEXT NULL,
+  action_metadata JSON NULL,
+  attempts INT NOT NULL DEFAULT 0,
+  last_error TEXT NULL,
+  dead_lettered_at DATETIME NULL,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (approval_id) REFERENCES scoping_approvals(id) ON DELETE CASCADE,
+  INDEX idx_approval_audit_outbox_dead_lettered (dead_lettered_at, id)
+);
+
+ALTER TABLE approval_audit_outbox ADD COLUMN dead_lettered_at DATETIME NULL;
+CREATE INDEX idx_approval_audit_outbox_dead_lettered ON approval_audit_outbox (dead_lettered_at, id);
+
 CREATE TABLE IF NOT EXISTS procurement_data (
     id INT AUTO_INCREMENT PRIMARY KEY,
     site_id INT NOT NULL,
@@ -247,6 +290,79 @@ CREATE TABLE IF NOT EXISTS go_live_data (
   INDEX idx_go_live_data_site_id (site_id),
   INDEX idx_go_live_data_status (status)
 );
+
+CREATE TABLE IF NOT EXISTS site_summary (
+  site_id INT PRIMARY KEY,
+  site_name VARCHAR(255) NULL,
+  organization_id VARCHAR(64) NULL,
+  organization_name VARCHAR(255) NULL,
+  organization_logo VARCHAR(512) NULL,
+  unit_code VARCHAR(100) NULL,
+  sector VARCHAR(100) NULL,
+  target_live_date DATE NULL,
+  suggested_go_live VARCHAR(50) NULL,
+  assigned_ops_manager VARCHAR(255) NULL,
+  assigned_deployment_engineer VARCHAR(255) NULL,
+  status VARCHAR(50) NULL,
+  progress SMALLINT NULL,
+  current_step VARCHAR(100) NULL,
+  extra JSON NULL,
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  FOREIGN KEY (site_id) REFERENCES site(id) ON DELETE CASCADE,
+  INDEX idx_site_summary_status (status),
+  INDEX idx_site_summary_organization_name (organization_name),
+  INDEX idx_site_summary_target_live_date (target_live_date),
+  INDEX ix_site_summary_sector (sector),
+  INDEX ix_site_summary_progress (progress),
+  INDEX idx_site_summary_current_step_progress (current_step, progress)
+);
+
+ALTER TABLE site_summary ADD COLUMN progress SMALLINT NULL;
+ALTER TABLE site_summary ADD COLUMN current_step VARCHAR(100) NULL;
+CREATE INDEX ix_site_summary_progress ON site_summary (progress);
+CREATE INDEX idx_site_summary_current_step_progress ON site_summary (current_step, progress);
+ALTER TABLE site_summary ADD COLUMN extra JSON NULL;
+CREATE INDEX ix_site_summary_sector ON site_summary (sector);
+
+DROP INDEX idx_field_fv_site_name ON field;
+ALTER TABLE field DROP COLUMN fv_site_name;
+DROP INDEX idx_field_fv_organization_id ON field;
+ALTER TABLE field DROP COLUMN fv_organization_id;
+DROP INDEX idx_field_fv_organization_name ON field;
+ALTER TABLE field DROP COLUMN fv_organization_name;
+DROP INDEX idx_field_fv_sector ON field;
+ALTER TABLE field DROP COLUMN fv_sector;
+DROP INDEX idx_field_fv_target_live_date ON field;
+ALTER TABLE field DROP COLUMN fv_target_live_date;
+
+CREATE TABLE IF NOT EXISTS site_tombstone (
+  site_id INT PRIMARY KEY,
+  deleted_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  INDEX ix_site_tombstone_deleted_at (deleted_at)
+);
+
+CREATE INDEX ix_site_updated_at ON site (updated_at);
+CREATE INDEX ix_page_updated_at ON page (updated_at);
+CREATE INDEX ix_section_updated_at ON section (updated_at);
+CREATE INDEX ix_field_updated_at ON field (updated_at);
+
+ALTER TABLE site ADD COLUMN deleted_at DATETIME NULL;
+CREATE INDEX ix_site_deleted_at ON site (deleted_at);
+
+CREATE TABLE IF NOT EXISTS deployment_templates (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  name VARCHAR(255) NOT NULL UNIQUE,
+  description TEXT NULL,
+  steps JSON NOT NULL,
+  version INT NOT NULL DEFAULT 1,
+  is_default BOOLEAN NOT NULL DEFAULT FALSE,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  INDEX ix_deployment_templates_is_default (is_default)
+);
+
+ALTER TABLE site ADD COLUMN deployment_template_id INT NULL;
+ALTER TABLE site ADD CONSTRAINT fk_site_deployment_template FOREIGN KEY (deployment_template_id) REFERENCES deployment_templates(id) ON DELETE SET NULL;
 """
 
 def get_main_app():
@@ -276,7 +392,10 @@ def configure_app(app):
 def register_extensions(app):
     db.init_app(app)
     Session(app)
-    CORS(app, supports_credentials=True)
+    CORS(app, supports_credentials=True, expose_headers=["X-Total-Count", "ETag"])
+    register_cache_hooks()
+    site_purge_worker.init_app(app)
+    approval_audit_drainer.init_app(app)
 
 
 def handle_bad_request(exception):
@@ -314,6 +433,34 @@ def setup_db_if_not_exists(app):
                             continue
 
                 logging.info("Database and tables created successfully.")
+
+                # Switch compressed JSON columns to LONGBLOB where they are not already
+                try:
+                    for statement in alter_columns():
+                        logging.info(f"Applied: {statement}")
+                except Exception as e:
+                    db.session.rollback()
+                    logging.warning(f"Compressed column migration failed: {e}")
+
+                # Store the built-in deployment checklist as the default template
+                ensure_default_template()
+
+                # Populate site_summary for sites created before the projection existed
+                backfill_site_summaries()
+                backfill_summary_extra()
+                backfill_deployment_progress()
+
+                # Flag the current approval of each site (rows predating is_latest)
+                ScopingApproval.backfill_latest()
+
+                # Warm the site search index so the first search is fast
+                site_search_index.rebuild()
+
+                # Finish purging sites deleted before the last shutdown
+                site_purge_worker.resume()
+
+                # Deliver audit actions queued before the last shutdown
+                approval_audit_drainer.resume()
                 return True
             except Exception as e:
                 logging.warning(f"Database setup failed (this is OK if database already exists): {e}")
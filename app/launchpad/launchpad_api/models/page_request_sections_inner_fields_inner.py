@@ -12,7 +12,7 @@ class PageRequestSectionsInnerFieldsInner(Model):
     Do not edit the class manually.
     """
 
-    def __init__(self, field_id=None, field_name=None, field_value=None):  # noqa: E501
+    def __init__(self, field_id=None, field_name=None, field_value=None, field_patch=None, field_merge_patch=None):  # noqa: E501
         """PageRequestSectionsInnerFieldsInner - a model defined in OpenAPI
 
         :param field_id: The field_id of this PageRequestSectionsInnerFieldsInner.  # noqa: E501
@@ -21,22 +21,32 @@ class PageRequestSectionsInnerFieldsInner(Model):
         :type field_name: str
         :param field_value: The field_value of this PageRequestSectionsInnerFieldsInner.  # noqa: E501
         :type field_value: str
+        :param field_patch: The field_patch of this PageRequestSectionsInnerFieldsInner.  # noqa: E501
+        :type field_patch: List[object]
+        :param field_merge_patch: The field_merge_patch of this PageRequestSectionsInnerFieldsInner.  # noqa: E501
+        :type field_merge_patch: object
         """
         self.openapi_types = {
             'field_id': int,
             'field_name': str,
-            'field_value': str
+            'field_value': str,
+            'field_patch': List[object],
+            'field_merge_patch': object
         }
 
         self.attribute_map = {
             'field_id': 'field_id',
             'field_name': 'field_name',
-            'field_value': 'field_value'
+            'field_value': 'field_value',
+            'field_patch': 'field_patch',
+            'field_merge_patch': 'field_merge_patch'
         }
 
         self._field_id = field_id
         self._field_name = field_name
         self._field_value = field_value
+        self._field_patch = field_patch
+        self._field_merge_patch = field_merge_patch
 
     @classmethod
     def from_dict(cls, dikt) -> 'PageRequestSectionsInnerFieldsInner':
@@ -115,3 +125,49 @@ class PageRequestSectionsInnerFieldsInner(Model):
             raise ValueError("Invalid value for `field_value`, must not be `None`")  # noqa: E501
 
         self._field_value = field_value
+
+    @property
+    def field_patch(self) -> List[object]:
+        """Gets the field_patch of this PageRequestSectionsInnerFieldsInner.
+
+        RFC 6902 JSON Patch applied to the stored value instead of sending field_value  # noqa: E501
+
+        :return: The field_patch of this PageRequestSectionsInnerFieldsInner.
+        :rtype: List[object]
+        """
+        return self._field_patch
+
+    @field_patch.setter
+    def field_patch(self, field_patch: List[object]):
+        """Sets the field_patch of this PageRequestSectionsInnerFieldsInner.
+
+        RFC 6902 JSON Patch applied to the stored value instead of sending field_value  # noqa: E501
+
+        :param field_patch: The field_patch of this PageRequestSectionsInnerFieldsInner.
+        :type field_patch: List[object]
+        """
+
+        self._field_patch = field_patch
+
+    @property
+    def field_merge_patch(self) -> object:
+        """Gets the field_merge_patch of this PageRequestSectionsInnerFieldsInner.
+
+        RFC 7396 JSON Merge Patch applied to the stored value instead of sending field_value  # noqa: E501
+
+        :return: The field_merge_patch of this PageRequestSectionsInnerFieldsInner.
+        :rtype: object
+        """
+        return self._field_merge_patch
+
+    @field_merge_patch.setter
+    def field_merge_patch(self, field_merge_patch: object):
+        """Sets the field_merge_patch of this PageRequestSectionsInnerFieldsInner.
+
+        RFC 7396 JSON Merge Patch applied to the stored value instead of sending field_value  # noqa: E501
+
+        :param field_merge_patch: The field_merge_patch of this PageRequestSectionsInnerFieldsInner.
+        :type field_merge_patch: object
+        """
+
+        self._field_merge_patch = field_merge_patch
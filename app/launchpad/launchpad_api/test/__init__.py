@@ -3,7 +3,7 @@ import logging
 import connexion
 from flask_testing import TestCase
 
-from .encoder import JSONEncoder
+from ..encoder import JSONEncoder
 
 
 class BaseTestCase(TestCase):
@@ -0,0 +1,119 @@
+import time
+import unittest
+
+from ..utils.cache import TTLCache, RedisCache
+
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover
+    fakeredis = None
+
+
+class CacheBackendTests:
+    """Behaviour every cache backend must share"""
+
+    def make_cache(self, ttl=30):
+        raise NotImplementedError
+
+    def test_get_or_load_caches_result(self):
+        cache = self.make_cache()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return {"sites": [1, 2]}
+
+        self.assertEqual(cache.get_or_load(("site-all",), loader, tags=("site-list",)), {"sites": [1, 2]})
+        self.assertEqual(cache.get_or_load(("site-all",), loader, tags=("site-list",)), {"sites": [1, 2]})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_none_is_not_cached(self):
+        cache = self.make_cache()
+        cache.get_or_load("k", lambda: None)
+        self.assertEqual(cache.get_or_load("k", lambda: 5), 5)
+
+    def test_invalidate_tags_only_drops_tagged_entries(self):
+        cache = self.make_cache()
+        cache.set("a", 1, tags=("site:1",))
+        cache.set("b", 2, tags=("site:2",))
+
+        self.assertEqual(cache.invalidate_tags(["site:1"]), 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+
+    def test_callable_tags(self):
+        cache = self.make_cache()
+        cache.get_or_load("listing", lambda: [3, 4], tags=lambda ids: [f"site:{i}" for i in ids])
+
+        cache.invalidate_tags(["site:4"])
+        self.assertIsNone(cache.get("listing"))
+
+    def test_load_racing_invalidation_is_not_stored(self):
+        cache = self.make_cache()
+
+        def loader():
+            cache.invalidate_tags(["site:1"])
+            return "stale"
+
+        self.assertEqual(cache.get_or_load("k", loader, tags=("site:1",)), "stale")
+        self.assertIsNone(cache.get("k"))
+
+    def test_delete(self):
+        cache = self.make_cache()
+        cache.set("otp", {"otp": "123456"})
+        cache.delete("otp")
+        self.assertIsNone(cache.get("otp"))
+
+    def test_pop_returns_value_once(self):
+        cache = self.make_cache()
+        cache.set("otp", {"otp": "123456"})
+        self.assertEqual(cache.pop("otp"), {"otp": "123456"})
+        self.assertIsNone(cache.pop("otp"))
+        self.assertEqual(cache.pop("missing", "default"), "default")
+        self.assertIsNone(cache.get("otp"))
+
+    def test_ttl_expiry(self):
+        cache = self.make_cache(ttl=1)
+        cache.set("k", "v")
+        time.sleep(1.1)
+        self.assertIsNone(cache.get("k"))
+
+
+class TestTTLCache(CacheBackendTests, unittest.TestCase):
+
+    def make_cache(self, ttl=30):
+        return TTLCache("test", maxsize=2, ttl=ttl)
+
+    def test_lru_eviction(self):
+        cache = self.make_cache()
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis not installed")
+class TestRedisCache(CacheBackendTests, unittest.TestCase):
+
+    def make_cache(self, ttl=30):
+        return RedisCache("test", fakeredis.FakeRedis(), ttl=ttl)
+
+    def test_namespaces_share_one_server(self):
+        server = fakeredis.FakeServer()
+        worker_a = RedisCache("site", fakeredis.FakeRedis(server=server))
+        worker_b = RedisCache("site", fakeredis.FakeRedis(server=server))
+
+        worker_a.set("listing", [1], tags=("site:1",))
+        self.assertEqual(worker_b.get("listing"), [1])
+
+        worker_b.invalidate_tags(["site:1"])
+        self.assertIsNone(worker_a.get("listing"))
+
+
+if __name__ == '__main__':
+    unittest.main()
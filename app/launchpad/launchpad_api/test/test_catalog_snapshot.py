@@ -0,0 +1,170 @@
+import pickle
+import unittest
+import unittest.mock
+
+from flask import Flask
+from sqlalchemy import event
+
+from ..db import db
+from ..db_models.software_category import SoftwareCategory
+from ..db_models.software_module import SoftwareModule
+from ..db_models.hardware_category import HardwareCategory
+from ..db_models.hardware_item import HardwareItem
+from ..db_models.recommendation_rule import RecommendationRule
+from ..controllers import platform_controller
+from ..utils import catalog_snapshot, generations
+from ..utils.cache_hooks import register_cache_hooks
+
+
+class CatalogSnapshotTestCase(unittest.TestCase):
+    """In-memory SQLite app with a small catalog in two software and one hardware category"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        register_cache_hooks()
+
+        pos, kiosk = SoftwareCategory("POS"), SoftwareCategory("Kiosk", is_active=False)
+        terminals = HardwareCategory("Terminals")
+        db.session.add_all([pos, kiosk, terminals])
+        db.session.flush()
+        db.session.add_all([
+            SoftwareModule("Till", pos.id, license_fee=100),
+            SoftwareModule("Self order", kiosk.id, license_fee=50),
+            SoftwareModule("Old till", pos.id, is_active=False),
+            HardwareItem("Terminal", terminals.id, unit_cost=250, support_cost=10),
+            RecommendationRule(kiosk.id, terminals.id, quantity=2),
+            RecommendationRule(pos.id, terminals.id, is_mandatory=True),
+        ])
+        db.session.commit()
+        self.category_ids = {"pos": pos.id, "kiosk": kiosk.id, "terminals": terminals.id}
+        db.session.expunge_all()
+        catalog_snapshot.reset_catalog_snapshot()
+
+        self.statements = []
+        event.listen(db.engine, "before_cursor_execute", self._count)
+
+        # Validators need counters every worker shares (Redis or SINGLE_WORKER)
+        patcher = unittest.mock.patch.object(generations.get_generation_store(), "shared", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self._count)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _get(self, handler, path, headers=None, **args):
+        with self.app.test_request_context(path, query_string=args, headers=headers or {}):
+            response = handler()
+            db.session.remove()
+        if not isinstance(response, tuple):
+            return response, response.status_code, response.headers
+        body, status = response[0], response[1]
+        return body.get_json(), status, response[2] if len(response) > 2 else {}
+
+
+class TestCatalogSnapshot(CatalogSnapshotTestCase):
+
+    def test_snapshot_matches_to_dict(self):
+        payload, status, _ = self._get(platform_controller.platform_software_modules_get,
+                                       "/api/platform/software-modules")
+        self.assertEqual(status, 200)
+        modules = SoftwareModule.query.order_by(SoftwareModule.id).all()
+        self.assertEqual(payload["data"], [module.to_dict() for module in modules])
+        self.assertEqual(payload["version"], catalog_snapshot.get_catalog_snapshot().version)
+
+    def test_built_with_one_query_per_collection(self):
+        self.statements.clear()
+        catalog_snapshot.get_catalog_snapshot()
+        # Categories are loaded first, so module / item categories come from the identity map
+        self.assertEqual(len(self.statements), len(catalog_snapshot.COLLECTIONS))
+
+        self.statements.clear()
+        for handler, path in ((platform_controller.platform_software_categories_get, "software-categories"),
+                              (platform_controller.platform_hardware_items_get, "hardware-items"),
+                              (platform_controller.platform_recommendation_rules_get, "recommendation-rules"),
+                              (platform_controller.platform_catalog_get, "catalog")):
+            payload, status, _ = self._get(handler, f"/api/platform/{path}")
+            self.assertEqual(status, 200)
+        self.assertEqual(self.statements, [])
+
+    def test_other_workers_load_the_shared_snapshot(self):
+        snapshot = catalog_snapshot.get_catalog_snapshot()
+        # What another worker gets back from the shared (pickling) backend
+        catalog_snapshot._snapshot = None
+        with unittest.mock.patch.object(catalog_snapshot.catalog_cache, "get",
+                                        side_effect=lambda key, default=None: pickle.loads(pickle.dumps(snapshot))):
+            self.statements.clear()
+            loaded = catalog_snapshot.get_catalog_snapshot()
+        self.assertEqual(self.statements, [])
+        self.assertIsNot(loaded, snapshot)
+        self.assertEqual(loaded.etag_version, snapshot.etag_version)
+        self.assertEqual(loaded.catalog_response().get_data(), snapshot.catalog_response().get_data())
+        self.assertEqual([entry.json for entry in loaded.select("software_modules", active_only=True)],
+                         [entry.json for entry in snapshot.select("software_modules", active_only=True)])
+
+    def test_filtered_views(self):
+        payload, _, _ = self._get(platform_controller.platform_software_modules_get,
+                                  "/api/platform/software-modules", is_active="true",
+                                  category_ids=str(self.category_ids["pos"]))
+        self.assertEqual([module["name"] for module in payload["data"]], ["Till"])
+
+        payload, _, _ = self._get(platform_controller.platform_software_categories_get,
+                                  "/api/platform/software-categories", is_active="false")
+        self.assertEqual([category["name"] for category in payload["data"]], ["POS", "Kiosk"])
+
+        # Same order as RecommendationRule.get_all()
+        payload, _, _ = self._get(platform_controller.platform_recommendation_rules_get,
+                                  "/api/platform/recommendation-rules")
+        self.assertEqual([rule["id"] for rule in payload["data"]],
+                         [rule.to_dict()["id"] for rule in RecommendationRule.get_all()])
+
+        payload, _, _ = self._get(platform_controller.platform_catalog_get, "/api/platform/catalog",
+                                  is_active="true")
+        self.assertEqual(sorted(payload["data"]), sorted(catalog_snapshot.COLLECTIONS))
+        self.assertEqual([category["name"] for category in payload["data"]["software_categories"]], ["POS"])
+        self.assertEqual(len(payload["data"]["recommendation_rules"]), 2)
+
+    def test_writes_bump_the_version_and_etag(self):
+        payload, status, headers = self._get(platform_controller.platform_catalog_get, "/api/platform/catalog")
+        version, etag = payload["version"], headers["ETag"]
+
+        response, status, _ = self._get(platform_controller.platform_catalog_get, "/api/platform/catalog",
+                                        headers={"If-None-Match": etag})
+        self.assertEqual(status, 304)
+
+        module = SoftwareModule.query.filter_by(name="Till").first()
+        module.is_active = False
+        module.update_row()
+
+        payload, status, headers = self._get(platform_controller.platform_catalog_get, "/api/platform/catalog",
+                                             headers={"If-None-Match": etag})
+        self.assertEqual(status, 200)
+        self.assertGreater(payload["version"], version)
+        self.assertNotEqual(headers["ETag"], etag)
+        till = [module for module in payload["data"]["software_modules"] if module["name"] == "Till"]
+        self.assertFalse(till[0]["is_active"])
+
+    def test_no_validators_with_per_process_counters(self):
+        payload, status, headers = self._get(platform_controller.platform_catalog_get, "/api/platform/catalog")
+        etag = headers["ETag"]
+
+        with unittest.mock.patch.object(generations.get_generation_store(), "shared", False):
+            payload, status, headers = self._get(platform_controller.platform_catalog_get, "/api/platform/catalog",
+                                                 headers={"If-None-Match": etag})
+        self.assertEqual(status, 200)
+        self.assertNotIn("ETag", headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
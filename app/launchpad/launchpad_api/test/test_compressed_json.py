@@ -0,0 +1,171 @@
+import unittest
+
+from flask import Flask
+from sqlalchemy import event, select
+from sqlalchemy.sql import table, column
+from sqlalchemy import Integer, LargeBinary, JSON
+
+from ..db import db
+from ..db_models.user import User
+from ..db_models import ScopingApproval
+from ..db_models.site import Site
+from ..db_models.page import Page
+from ..db_models.section import Section
+from ..db_models.fields import Field
+from ..db_models import compressed_json
+from ..db_models.compressed_json import encode, decode, is_compressed
+from ..utils import blob_migration
+
+
+LARGE = {"selected_hardware": [{"id": index, "name": f"Terminal {index}", "qty": 2} for index in range(200)]}
+SMALL = {"selected_hardware": [{"id": 1}]}
+
+
+class TestCompressedJSONCodec(unittest.TestCase):
+
+    def test_small_values_stay_plain(self):
+        stored = encode(SMALL)
+        self.assertEqual(stored[:1], compressed_json.PLAIN_MARKER)
+        self.assertEqual(decode(stored), SMALL)
+        self.assertEqual(encode(SMALL, envelope=True), SMALL)
+
+    def test_large_values_are_compressed(self):
+        stored = encode(LARGE)
+        self.assertEqual(stored[:1], compressed_json.ZLIB_MARKER)
+        self.assertLess(len(stored), len(str(LARGE)) / 4)
+        self.assertEqual(decode(stored), LARGE)
+
+        envelope = encode(LARGE, envelope=True)
+        self.assertTrue(is_compressed(envelope))
+        self.assertEqual(decode(envelope, envelope=True), LARGE)
+
+    def test_legacy_json_text_is_readable(self):
+        self.assertEqual(decode(b'{"a": 1}'), {"a": 1})
+        self.assertEqual(decode('{"a": 1}'), {"a": 1})
+        self.assertEqual(decode("plain string", envelope=True), "plain string")
+        self.assertIsNone(decode(None))
+
+    @unittest.skipIf(compressed_json.zstandard is None, "zstandard not installed")
+    def test_zstd_codec(self):
+        stored = encode(LARGE, codec="zstd")
+        self.assertEqual(stored[:1], compressed_json.ZSTD_MARKER)
+        self.assertEqual(decode(stored), LARGE)
+
+
+class CompressedColumnsTestCase(unittest.TestCase):
+    """In-memory SQLite app with one user, site and large scoping approval"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(name="Engineer", email="eng@example.com", role="deployment_engineer")
+        site = Site(status="created")
+        db.session.add_all([user, site])
+        db.session.flush()
+        approval = ScopingApproval(site.id, "Site", user.id, "Engineer", LARGE, {"total": 10})
+        db.session.add(approval)
+        db.session.commit()
+        self.approval_id = approval.id
+        self.site_id = site.id
+
+        page = Page(page_name="create_site", site_id=site.id)
+        db.session.add(page)
+        db.session.flush()
+        section = Section(section_name="general_info", page_id=page.id)
+        db.session.add(section)
+        db.session.flush()
+        db.session.add_all([Field("site_name", "Cafe", section.id), Field("notes", LARGE, section.id)])
+        db.session.commit()
+        db.session.expunge_all()
+
+        self.statements = []
+        event.listen(db.engine, "before_cursor_execute", self._count)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self._count)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+class TestCompressedColumns(CompressedColumnsTestCase):
+
+    def test_scoping_data_stored_compressed(self):
+        raw = table("scoping_approvals", column("id", Integer), column("scoping_data", LargeBinary()))
+        stored = db.session.execute(select(raw.c.scoping_data)).scalar()
+        self.assertEqual(stored[:1], compressed_json.ZLIB_MARKER)
+
+        approval = ScopingApproval.get_by_id(self.approval_id)
+        self.assertEqual(approval.to_dict()["scoping_data"], LARGE)
+        self.assertEqual(approval.cost_breakdown, {"total": 10})
+
+    def test_blobs_deferred_until_accessed(self):
+        approval = ScopingApproval.get_pending_by_site_id(self.site_id)
+        self.assertNotIn("scoping_data", approval.__dict__)
+        self.statements.clear()
+        self.assertEqual(approval.scoping_data, LARGE)
+        # both blob columns come back in one deferred load
+        self.assertEqual(len(self.statements), 1)
+        self.assertIn("cost_breakdown", approval.__dict__)
+
+    def test_getters_load_blobs_upfront(self):
+        approvals = ScopingApproval.get_all()
+        self.statements.clear()
+        [approval.to_dict() for approval in approvals]
+        self.assertEqual(self.statements, [])
+
+    def test_field_values_round_trip(self):
+        raw = table("field", column("field_name"), column("field_value", JSON()))
+        stored = dict(db.session.execute(select(raw.c.field_name, raw.c.field_value)).all())
+        self.assertEqual(stored["site_name"], "Cafe")
+        self.assertTrue(is_compressed(stored["notes"]))
+
+        values = {field.field_name: field.field_value for field in Field.query.all()}
+        self.assertEqual(values, {"site_name": "Cafe", "notes": LARGE})
+
+
+class TestBlobMigration(CompressedColumnsTestCase):
+
+    def _write_legacy(self):
+        raw = table("scoping_approvals", column("id", Integer), column("scoping_data", LargeBinary()))
+        db.session.execute(raw.update().values(scoping_data=b'{"legacy": true}'))
+        fields = table("field", column("field_name"), column("field_value", JSON()))
+        db.session.execute(fields.update().where(fields.c.field_name == "notes").values(field_value=LARGE))
+        db.session.commit()
+
+    def test_dry_run_counts_without_writing(self):
+        self._write_legacy()
+        result = blob_migration.migrate_column("scoping_approvals", "scoping_data", False, dry_run=True)
+        self.assertEqual(result["rewritten"], 1)
+        self.assertEqual(blob_migration.migrate_column("field", "field_value", True, dry_run=True)["rewritten"], 1)
+
+    def test_migration_rewrites_and_is_idempotent(self):
+        self._write_legacy()
+        for table_name, column_name, envelope in blob_migration.BLOB_COLUMNS:
+            blob_migration.migrate_column(table_name, column_name, envelope, batch_size=1)
+        for table_name, column_name, envelope in blob_migration.BLOB_COLUMNS:
+            result = blob_migration.migrate_column(table_name, column_name, envelope)
+            self.assertEqual(result["rewritten"], 0, result)
+
+        db.session.expunge_all()
+        self.assertEqual(ScopingApproval.get_by_id(self.approval_id).scoping_data, {"legacy": True})
+        self.assertEqual(Field.query.filter_by(field_name="notes").one().field_value, LARGE)
+
+    def test_benchmark_reports_sizes(self):
+        report = blob_migration.benchmark_column("scoping_approvals", "scoping_data", False)
+        self.assertEqual(report["rows"], 1)
+        self.assertEqual(report["compressed_rows"], 1)
+        self.assertLess(report["compressed_bytes"], report["plain_bytes"])
+
+
+if __name__ == '__main__':
+    unittest.main()
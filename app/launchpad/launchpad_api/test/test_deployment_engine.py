@@ -0,0 +1,301 @@
+import json
+import unittest
+
+from flask import Flask
+from sqlalchemy import event
+
+from ..db import db
+from ..db_models.user import User  # noqa: F401 - registers the users table
+from ..db_models import ScopingApproval  # noqa: F401
+from ..db_models.site import Site
+from ..db_models.page import Page
+from ..db_models.section import Section
+from ..db_models.fields import Field
+from ..db_models.site_summary import SiteSummary
+from ..db_models.deployment_template import DeploymentTemplate
+from ..controllers import page_controller, deployment_controller
+from ..utils import deployment_engine
+from ..utils.site_summary import backfill_deployment_progress
+from ..utils.deployment_engine import (BUILTIN_TEMPLATE, TemplateError, compile_template,
+                                       ensure_default_template, get_template)
+
+
+def default_steps(*statuses, **extra):
+    steps = BUILTIN_TEMPLATE.default_steps()
+    for step, status in zip(steps, statuses):
+        step["status"] = status
+        if status == "completed" and step["id"] == "hardware_delivery":
+            step["deliveryReceipt"] = "https://example.com/receipt.pdf"
+    for step in steps:
+        step.update(extra.get(step["id"], {}))
+    return steps
+
+
+class TestCompiledTemplate(unittest.TestCase):
+
+    def test_progress_completion_and_current_step(self):
+        evaluation = BUILTIN_TEMPLATE.evaluate(default_steps("completed", "in_progress"))
+        self.assertTrue(evaluation.valid, evaluation.error)
+        self.assertEqual((evaluation.progress, evaluation.completed, evaluation.current_step),
+                         (25, False, "software_installation"))
+
+        evaluation = BUILTIN_TEMPLATE.evaluate(default_steps(*["completed"] * 4))
+        self.assertEqual((evaluation.progress, evaluation.completed, evaluation.current_step), (100, True, None))
+
+        evaluation = BUILTIN_TEMPLATE.evaluate([])
+        self.assertEqual((evaluation.valid, evaluation.progress, evaluation.completed), (True, 0, False))
+
+    def test_step_errors(self):
+        steps = default_steps("completed", hardware_delivery={"deliveryReceipt": None})
+        self.assertEqual(BUILTIN_TEMPLATE.evaluate(steps).error,
+                         "Invalid step: hardware_delivery step requires deliveryReceipt when status is 'completed'")
+
+        steps = default_steps(software_installation={"estimatedHours": "many"})
+        self.assertEqual(BUILTIN_TEMPLATE.evaluate(steps).error, "Invalid step: estimatedHours must be a valid number")
+
+        steps = default_steps("bogus")
+        self.assertTrue(BUILTIN_TEMPLATE.evaluate(steps).error.startswith("Invalid step: Invalid status 'bogus'"))
+
+        self.assertEqual(BUILTIN_TEMPLATE.evaluate(["x"]).error, "Invalid step: Each step must be an object")
+
+    def test_ordering(self):
+        evaluation = BUILTIN_TEMPLATE.evaluate(default_steps("pending", "completed"))
+        self.assertEqual(evaluation.error, "Step progression error: Cannot complete "
+                                           "'Software Installation' before 'Hardware Delivery' is completed")
+
+        evaluation = BUILTIN_TEMPLATE.evaluate(default_steps("in_progress", "in_progress"))
+        self.assertEqual(evaluation.error, "Step progression error: Cannot start "
+                                           "'Software Installation' before 'Hardware Delivery' is completed")
+
+        # Steps absent from the submission are skipped, unknown steps only count for progress
+        steps = default_steps("completed")[:1] + default_steps("pending", "pending", "completed")[2:3]
+        steps.append({"id": "extra", "name": "Extra", "status": "pending", "estimatedHours": 1})
+        evaluation = BUILTIN_TEMPLATE.evaluate(steps)
+        self.assertTrue(evaluation.valid, evaluation.error)
+        self.assertEqual(evaluation.progress, 66)
+
+    def test_compile_errors(self):
+        for definitions in ([], [{"id": "a"}], [{"id": "a", "name": "A"}, {"id": "a", "name": "B"}],
+                            [{"id": "a", "name": "A", "estimatedHours": -1}],
+                            [{"id": "a", "name": "A", "requires": "x"}]):
+            with self.assertRaises(TemplateError, msg=definitions):
+                compile_template(definitions)
+
+
+class DeploymentTemplateTestCase(unittest.TestCase):
+    """In-memory SQLite app with the default template and one custom template"""
+
+    CUSTOM_STEPS = [
+        {"id": "survey", "name": "Survey", "estimatedHours": 2, "requires": ["surveyReport"]},
+        {"id": "install", "name": "Install", "estimatedHours": 6},
+    ]
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        deployment_engine._compiled.clear()
+
+        self.default = ensure_default_template()
+        self.custom = DeploymentTemplate("Kiosk only", self.CUSTOM_STEPS).create_row()
+
+        self.statements = []
+        event.listen(db.engine, "before_cursor_execute", self._count)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self._count)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+class TestTemplateCache(DeploymentTemplateTestCase):
+
+    def test_default_template_seeded_once(self):
+        self.assertIsNone(ensure_default_template())
+        self.assertEqual(get_template().template_id, self.default.id)
+        self.assertEqual([step["id"] for step in get_template().steps],
+                         [step["id"] for step in BUILTIN_TEMPLATE.steps])
+
+    def test_compiled_once_per_version(self):
+        compiled = get_template(self.custom.id)
+        self.statements.clear()
+        self.assertIs(get_template(self.custom.id), compiled)
+        # Only the (id, version) lookup
+        self.assertEqual(len(self.statements), 1)
+
+        self.custom.steps = self.CUSTOM_STEPS + [{"id": "signoff", "name": "Sign-off"}]
+        self.custom.update_row()
+        recompiled = get_template(self.custom.id)
+        self.assertEqual(recompiled.version, 2)
+        self.assertEqual(len(recompiled.steps), 3)
+
+    def test_unknown_template_falls_back_to_default(self):
+        self.assertEqual(get_template(9999).template_id, self.default.id)
+
+
+class TestSiteTemplates(DeploymentTemplateTestCase):
+    """page_post / page_put check deployment steps against the site's template"""
+
+    def setUp(self):
+        super().setUp()
+        site = Site(status="created")
+        db.session.add(site)
+        db.session.commit()
+        self.site_id = site.id
+
+    def _assign(self, template_id):
+        body = {"template_id": template_id}
+        with self.app.test_request_context("/api/site", method="PUT", json=body):
+            return deployment_controller.site_deployment_template_put(self.site_id, body)
+
+    def _post_deployment(self, fields):
+        body = {"site_id": self.site_id, "page_name": "deployment", "status": "created",
+                "sections": [{"section_name": "deployment_checklist", "fields": fields}]}
+        with self.app.test_request_context("/api/page", method="POST", json=body):
+            response, status = page_controller.page_post(body)
+        return response.get_json(), status
+
+    def test_new_checklist_uses_site_template(self):
+        response, status = self._assign(self.custom.id)
+        self.assertEqual(status, 200, response.get_json())
+
+        payload, status = self._post_deployment([])
+        self.assertEqual(status, 200, payload)
+        steps = Field.query.filter_by(field_name="steps").one().field_value
+        self.assertEqual([step["id"] for step in steps], ["survey", "install"])
+
+    def test_page_put_progress_from_site_template(self):
+        self._assign(self.custom.id)
+        payload, status = self._post_deployment([])
+        page = Page.query.filter_by(site_id=self.site_id, page_name="deployment").one()
+        section = Section.query.filter_by(page_id=page.id).one()
+        steps_field = Field.query.filter_by(section_id=section.id, field_name="steps").one()
+        installation = Section(section_name="installation", page_id=page.id)
+        db.session.add(installation)
+        db.session.flush()
+        progress = Field("progress", "0", installation.id)
+        db.session.add(progress)
+        db.session.commit()
+        progress_id, steps_id, section_id = progress.id, steps_field.id, section.id
+
+        def put(steps):
+            body = {"id": page.id, "site_id": self.site_id, "status": "created",
+                    "sections": [{"section_id": section_id,
+                                  "fields": [{"field_id": steps_id, "field_value": json.dumps(steps)}]}]}
+            with self.app.test_request_context("/api/page", method="PUT", json=body):
+                response, status = page_controller.page_put(body)
+            return response.get_json(), status
+
+        steps = [{"id": "survey", "name": "Survey", "status": "completed", "estimatedHours": 2},
+                 {"id": "install", "name": "Install", "status": "pending", "estimatedHours": 6}]
+        payload, status = put(steps)
+        self.assertEqual(status, 400)
+        self.assertEqual(payload["message"],
+                         "Invalid step: survey step requires surveyReport when status is 'completed'")
+
+        steps[0]["surveyReport"] = "done"
+        payload, status = put(steps)
+        self.assertEqual(status, 200, payload)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Field, progress_id).field_value, "50")
+
+        summary = db.session.get(SiteSummary, self.site_id)
+        self.assertEqual((summary.progress, summary.current_step), (50, "install"))
+
+        steps[1]["status"] = "completed"
+        payload, status = put(steps)
+        self.assertEqual(status, 200, payload)
+        self.assertEqual(Site.get_by_id(self.site_id).status, "deployed")
+        db.session.expire_all()
+        summary = db.session.get(SiteSummary, self.site_id)
+        self.assertEqual((summary.progress, summary.current_step), (100, None))
+
+        # Emptying the checklist clears the summary's progress
+        payload, status = put([])
+        self.assertEqual(status, 200, payload)
+        db.session.expire_all()
+        summary = db.session.get(SiteSummary, self.site_id)
+        self.assertEqual((summary.progress, summary.current_step), (None, None))
+
+    def test_new_checklist_sets_progress(self):
+        self._post_deployment([])
+        summary = db.session.get(SiteSummary, self.site_id)
+        self.assertEqual((summary.progress, summary.current_step), (0, "hardware_delivery"))
+
+    def test_deployment_progress_endpoint(self):
+        self._post_deployment([])
+        for progress, current_step in ((50, "software_installation"), (75, "software_installation"), (100, None)):
+            site = Site(status="created")
+            db.session.add(site)
+            db.session.flush()
+            db.session.add(SiteSummary(site.id, progress=progress, current_step=current_step))
+        # A site without a checklist is not counted
+        other = Site(status="created")
+        db.session.add(other)
+        db.session.flush()
+        db.session.add(SiteSummary(other.id))
+        db.session.commit()
+
+        self.statements.clear()
+        with self.app.test_request_context("/api/deployment/progress"):
+            response, status, headers = deployment_controller.deployment_progress_get()
+        self.assertEqual(status, 200)
+        self.assertEqual(len([s for s in self.statements if "site_summary" in s]), 1)
+        self.assertEqual(response.get_json()["data"], {
+            "sites": 4,
+            "average_progress": 56.2,
+            "completed": 1,
+            "in_progress": 2,
+            "not_started": 1,
+            "by_step": [
+                {"current_step": "software_installation", "sites": 2, "average_progress": 62.5},
+                {"current_step": "hardware_delivery", "sites": 1, "average_progress": 0.0},
+            ],
+        })
+
+    def test_backfill_deployment_progress(self):
+        self._post_deployment([])
+        summary = db.session.get(SiteSummary, self.site_id)
+        summary.progress = summary.current_step = None
+        steps_field = Field.query.filter_by(field_name="steps").one()
+        steps = BUILTIN_TEMPLATE.default_steps()
+        steps[0].update(status="completed", deliveryReceipt="receipt.pdf")
+        steps_field.field_value = json.dumps(steps)
+        db.session.commit()
+
+        self.assertEqual(backfill_deployment_progress(), 1)
+        db.session.expire_all()
+        summary = db.session.get(SiteSummary, self.site_id)
+        self.assertEqual((summary.progress, summary.current_step), (25, "software_installation"))
+        self.assertEqual(backfill_deployment_progress(), 0)
+
+    def test_template_endpoints(self):
+        body = {"name": "Kiosk only", "steps": self.CUSTOM_STEPS}
+        with self.app.test_request_context("/api/deployment/templates", method="POST", json=body):
+            response, status = deployment_controller.deployment_templates_post(body)
+        self.assertEqual(status, 409)
+
+        body = {"name": "Broken", "steps": [{"id": "a"}]}
+        with self.app.test_request_context("/api/deployment/templates", method="POST", json=body):
+            response, status = deployment_controller.deployment_templates_post(body)
+        self.assertEqual(status, 400)
+
+        body = {"is_default": True}
+        with self.app.test_request_context("/api/deployment/templates", method="PUT", json=body):
+            response, status = deployment_controller.deployment_templates_id_put(self.custom.id, body)
+        self.assertEqual(status, 200, response.get_json())
+        self.assertEqual(response.get_json()["data"]["version"], 2)
+        self.assertEqual(get_template().template_id, self.custom.id)
+        self.assertEqual([template.is_default for template in DeploymentTemplate.get_all()], [True, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
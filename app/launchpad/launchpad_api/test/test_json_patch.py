@@ -0,0 +1,65 @@
+import unittest
+
+from ..utils.json_patch import (apply_json_patch, apply_merge_patch, load_document,
+                                JsonPatchError, JsonPatchConflict)
+
+
+class TestJsonPatch(unittest.TestCase):
+
+    def setUp(self):
+        self.steps = [
+            {"id": "hardware_delivery", "status": "pending"},
+            {"id": "software_installation", "status": "pending"},
+        ]
+
+    def test_operations(self):
+        patched = apply_json_patch(self.steps, [
+            {"op": "test", "path": "/0/id", "value": "hardware_delivery"},
+            {"op": "replace", "path": "/0/status", "value": "completed"},
+            {"op": "add", "path": "/-", "value": {"id": "network_setup"}},
+            {"op": "copy", "from": "/0/status", "path": "/2/status"},
+            {"op": "move", "from": "/1", "path": "/0"},
+            {"op": "remove", "path": "/1/status"},
+            {"op": "add", "path": "/1/a~1b", "value": 1},
+        ])
+
+        self.assertEqual(patched, [
+            {"id": "software_installation", "status": "pending"},
+            {"id": "hardware_delivery", "a/b": 1},
+            {"id": "network_setup", "status": "completed"},
+        ])
+        # Input is never modified
+        self.assertEqual(self.steps[0]["status"], "pending")
+
+    def test_failed_test_is_a_conflict(self):
+        with self.assertRaises(JsonPatchConflict):
+            apply_json_patch(self.steps, [{"op": "test", "path": "/0/status", "value": "completed"}])
+
+    def test_invalid_patches(self):
+        for patch in (
+            {"op": "add"},
+            [{"op": "replace", "path": "/5/status", "value": "x"}],
+            [{"op": "remove", "path": "/0/missing"}],
+            [{"op": "add", "path": "/01", "value": "x"}],
+            [{"op": "move", "from": "/0", "path": "/0/id"}],
+            [{"op": "frobnicate", "path": "/0"}],
+            [{"op": "add", "path": "no-slash", "value": 1}],
+        ):
+            with self.assertRaises(JsonPatchError, msg=patch):
+                apply_json_patch(self.steps, patch)
+
+    def test_merge_patch(self):
+        document = {"title": "Site", "author": {"name": "A", "email": "a@x"}, "tags": ["x"]}
+        patched = apply_merge_patch(document, {"author": {"email": None}, "tags": ["y"], "new": 1})
+
+        self.assertEqual(patched, {"title": "Site", "author": {"name": "A"}, "tags": ["y"], "new": 1})
+        self.assertEqual(document["author"]["email"], "a@x")
+
+    def test_load_document(self):
+        self.assertEqual(load_document('[{"id": 1}]'), [{"id": 1}])
+        self.assertEqual(load_document("plain text"), "plain text")
+        self.assertEqual(load_document({"a": 1}), {"a": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,389 @@
+import json
+import unittest
+from unittest import mock
+
+from flask import Flask
+from sqlalchemy import event
+
+from ..db import db
+from ..db_models.user import User  # noqa: F401 - registers the users table
+from ..db_models import ScopingApproval  # noqa: F401
+from ..db_models.site import Site
+from ..db_models.page import Page
+from ..db_models.section import Section
+from ..db_models.fields import Field
+from ..controllers import page_controller
+from ..utils import queries
+from ..utils.deployment_utils import get_default_steps
+
+
+class PageQueriesTestCase(unittest.TestCase):
+    """In-memory SQLite app with one site_study page of 3 sections"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        site = Site(status="created")
+        db.session.add(site)
+        db.session.flush()
+        page = Page(page_name="site_study", site_id=site.id)
+        db.session.add(page)
+        db.session.flush()
+        for section_name in ("general_info", "layout", "empty"):
+            section = Section(section_name=section_name, page_id=page.id)
+            db.session.add(section)
+            db.session.flush()
+            if section_name != "empty":
+                for index in range(3):
+                    db.session.add(Field(f"{section_name}_{index}", {"value": index}, section.id))
+        db.session.commit()
+        self.site_id = site.id
+
+        self.statements = []
+        event.listen(db.engine, "before_cursor_execute", self._count)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self._count)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+class TestPageGetQueries(PageQueriesTestCase):
+    """page_get must fetch site, page, sections and fields in one round trip"""
+
+    def _page_get(self, page_name, site_id):
+        db.session.expunge_all()
+        self.statements.clear()
+        with self.app.test_request_context("/api/page"):
+            return page_controller.page_get(page_name, site_id)
+
+    def test_page_get_single_query(self):
+        response, status, _ = self._page_get("site_study", self.site_id)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(self.statements), 1, self.statements)
+
+        sections = response.get_json()["data"]["sections"]
+        self.assertEqual([s["section_name"] for s in sections], ["general_info", "layout", "empty"])
+        self.assertEqual([len(s["fields"]) for s in sections], [3, 3, 0])
+        self.assertEqual(sections[0]["fields"][1]["field_value"], {"value": 1})
+
+    def test_page_not_found_single_query(self):
+        response, status = self._page_get("missing_page", self.site_id)
+
+        self.assertEqual(status, 404)
+        self.assertEqual(len(self.statements), 1, self.statements)
+
+    def test_site_not_found_single_query(self):
+        response, status = self._page_get("site_study", self.site_id + 100)
+
+        self.assertEqual(status, 404)
+        self.assertEqual(response.get_json()["message"], "Site not found")
+        self.assertEqual(len(self.statements), 1, self.statements)
+
+
+class TestSitePagesQueries(PageQueriesTestCase):
+    """site_pages_get returns every page of a site from one query"""
+
+    def setUp(self):
+        super().setUp()
+        page = Page(page_name="deployment", site_id=self.site_id)
+        db.session.add(page)
+        db.session.flush()
+        section = Section(section_name="installation", page_id=page.id)
+        db.session.add(section)
+        db.session.flush()
+        db.session.add(Field("progress", "40", section.id))
+        db.session.commit()
+
+    def _site_pages_get(self, site_id, pages=None):
+        db.session.expunge_all()
+        self.statements.clear()
+        with self.app.test_request_context("/api/site/pages"):
+            response = page_controller.site_pages_get(site_id, pages)
+            if isinstance(response, tuple):
+                return response[0].get_json(), response[1]
+            return json.loads(response.get_data(as_text=True)), response.status_code
+
+    def test_all_pages_single_query(self):
+        payload, status = self._site_pages_get(self.site_id)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(self.statements), 1, self.statements)
+        pages = payload["data"]["pages"]
+        self.assertEqual([p["page_name"] for p in pages], ["site_study", "deployment"])
+        self.assertEqual([len(s["fields"]) for s in pages[0]["sections"]], [3, 3, 0])
+        self.assertEqual(pages[1]["sections"][0]["fields"][0]["field_name"], "progress")
+
+    def test_filter_pages(self):
+        payload, status = self._site_pages_get(self.site_id, "deployment,missing")
+
+        self.assertEqual(status, 200)
+        self.assertEqual([p["page_name"] for p in payload["data"]["pages"]], ["deployment"])
+
+        payload, status = self._site_pages_get(self.site_id, "missing")
+        self.assertEqual(payload["data"], {"site_id": self.site_id, "pages": []})
+
+    def test_site_not_found(self):
+        payload, status = self._site_pages_get(self.site_id + 100)
+
+        self.assertEqual(status, 404)
+        self.assertEqual(payload["message"], "Site not found")
+
+
+class TestPageBatchQueries(PageQueriesTestCase):
+    """page_batch_get fetches one page for many sites with chunked IN queries"""
+
+    def setUp(self):
+        super().setUp()
+        self.site_ids = [self.site_id]
+        for index in range(4):
+            site = Site(status="created")
+            db.session.add(site)
+            db.session.flush()
+            self.site_ids.append(site.id)
+            if index == 3:
+                continue  # site without the page
+            page = Page(page_name="site_study", site_id=site.id)
+            db.session.add(page)
+            db.session.flush()
+            section = Section(section_name="general_info", page_id=page.id)
+            db.session.add(section)
+            db.session.flush()
+            db.session.add(Field("site_name", f"site {index}", section.id))
+        db.session.commit()
+
+    def _page_batch_get(self, site_ids):
+        db.session.expunge_all()
+        self.statements.clear()
+        with self.app.test_request_context("/api/page/batch"):
+            response = page_controller.page_batch_get("site_study", site_ids)
+        return response[0].get_json(), response[1]
+
+    def test_batch_single_query(self):
+        missing = self.site_ids[-1] + 100
+        requested = list(reversed(self.site_ids)) + [missing]
+        payload, status = self._page_batch_get(",".join(map(str, requested)))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(self.statements), 1, self.statements)
+        data = payload["data"]
+        self.assertEqual([p["site_id"] for p in data["pages"]], list(reversed(self.site_ids[:-1])))
+        self.assertEqual(data["not_found"], [self.site_ids[-1], missing])
+        self.assertEqual([len(s["fields"]) for s in data["pages"][-1]["sections"]], [3, 3, 0])
+
+    def test_batch_chunks_long_id_lists(self):
+        with mock.patch.object(queries, "IN_CHUNK_SIZE", 2):
+            payload, status = self._page_batch_get(",".join(map(str, self.site_ids)))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(self.statements), 3, self.statements)
+        self.assertEqual(len(payload["data"]["pages"]), 4)
+
+    def test_batch_invalid_ids(self):
+        payload, status = self._page_batch_get("1,abc")
+        self.assertEqual(status, 400)
+
+
+class TestPagePutQueries(PageQueriesTestCase):
+    """page_put query count must not grow with the number of fields"""
+
+    def _page_put(self, field_count, value):
+        page = Page.get_by_siteid_and_pagename(self.site_id, "site_study")
+        sections = {}
+        for section in Section.get_by_pageid(page.id):
+            fields = Field.query.filter(Field.section_id == section.id).order_by(Field.id).all()
+            sections[section.id] = [
+                {"field_id": field.id, "field_name": field.field_name, "field_value": json.dumps({"value": value})}
+                for field in fields
+            ]
+
+        body_sections = []
+        remaining = field_count
+        for section_id, fields in sections.items():
+            if not fields or remaining <= 0:
+                continue
+            body_sections.append({"section_id": section_id, "fields": fields[:remaining]})
+            remaining -= len(fields[:remaining])
+
+        body = {"id": page.id, "site_id": self.site_id, "status": "site_study_done", "sections": body_sections}
+        db.session.expunge_all()
+        self.statements.clear()
+        with self.app.test_request_context("/api/page", method="PUT", json=body):
+            return page_controller.page_put(body)
+
+    def test_page_put_constant_queries(self):
+        # First write also creates the site_summary row
+        response, status = self._page_put(1, "warm-up")
+        self.assertEqual(status, 200, response.get_json())
+
+        response, status = self._page_put(2, "a")
+        self.assertEqual(status, 200, response.get_json())
+        few_fields = len(self.statements)
+
+        response, status = self._page_put(6, "b")
+        self.assertEqual(status, 200, response.get_json())
+        self.assertEqual(len(self.statements), few_fields, self.statements)
+
+        values = [field.field_value for field in Field.query.order_by(Field.id).all()]
+        self.assertEqual(values, [{"value": "b"}] * 6)
+
+    def test_page_put_unknown_field(self):
+        page = Page.get_by_siteid_and_pagename(self.site_id, "site_study")
+        section = Section.get_by_pageid(page.id)[0]
+        body = {"id": page.id, "site_id": self.site_id, "status": "created",
+                "sections": [{"section_id": section.id, "fields": [{"field_id": 9999, "field_value": "x"}]}]}
+
+        with self.app.test_request_context("/api/page", method="PUT", json=body):
+            response, status = page_controller.page_put(body)
+
+        self.assertEqual(status, 400)
+        self.assertEqual(response.get_json()["message"], "Invalid Field ID")
+
+
+class TestPagePutPatch(PageQueriesTestCase):
+    """page_put accepts JSON Patch / merge patch per field"""
+
+    def setUp(self):
+        super().setUp()
+        page = Page(page_name="deployment", site_id=self.site_id)
+        db.session.add(page)
+        db.session.flush()
+        section = Section(section_name="deployment_checklist", page_id=page.id)
+        db.session.add(section)
+        db.session.flush()
+        steps = Field("steps", json.dumps(get_default_steps()), section.id)
+        notes = Field("notes", {"meta": {"owner": "ops", "draft": True}}, section.id)
+        db.session.add_all([steps, notes])
+        db.session.commit()
+        self.page_id, self.section_id = page.id, section.id
+        self.steps_id, self.notes_id = steps.id, notes.id
+
+    def _put(self, *fields):
+        body = {"id": self.page_id, "site_id": self.site_id, "status": "created",
+                "sections": [{"section_id": self.section_id, "fields": list(fields)}]}
+        with self.app.test_request_context("/api/page", method="PUT", json=body):
+            response, status = page_controller.page_put(body)
+        return response.get_json(), status
+
+    def test_json_patch_is_validated_and_stored(self):
+        payload, status = self._put({"field_id": self.steps_id, "field_name": "steps", "field_patch": [
+            {"op": "test", "path": "/1/status", "value": "pending"},
+            {"op": "replace", "path": "/1/status", "value": "bogus"},
+        ]})
+        self.assertEqual(status, 400)
+        self.assertTrue(payload["message"].startswith("Invalid step"), payload)
+
+        payload, status = self._put({"field_id": self.steps_id, "field_name": "steps", "field_patch": [
+            {"op": "replace", "path": "/0/status", "value": "in_progress"},
+        ]})
+        self.assertEqual(status, 200, payload)
+
+        db.session.expire_all()
+        steps = db.session.get(Field, self.steps_id).field_value
+        self.assertEqual([step["status"] for step in steps], ["in_progress", "pending", "pending", "pending"])
+
+    def test_failed_test_op_conflicts(self):
+        payload, status = self._put({"field_id": self.steps_id, "field_name": "steps", "field_patch": [
+            {"op": "test", "path": "/0/status", "value": "completed"},
+        ]})
+        self.assertEqual(status, 409)
+
+    def test_merge_patch(self):
+        payload, status = self._put({"field_id": self.notes_id, "field_name": "notes",
+                                     "field_merge_patch": {"meta": {"draft": None}}})
+        self.assertEqual(status, 200, payload)
+
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Field, self.notes_id).field_value, {"meta": {"owner": "ops"}})
+
+    def test_value_or_patch_required(self):
+        payload, status = self._put({"field_id": self.notes_id, "field_name": "notes"})
+        self.assertEqual(status, 400)
+
+
+class TestPagePostQueries(PageQueriesTestCase):
+    """page_post validates first, inserts in batches and commits once"""
+
+    def _page_post(self, body):
+        self.statements.clear()
+        with self.app.test_request_context("/api/page", method="POST", json=body):
+            return page_controller.page_post(body)
+
+    def _body(self, section_count, field_count):
+        return {
+            "site_id": self.site_id,
+            "page_name": f"scoping_{section_count}_{field_count}",
+            "status": "created",
+            "sections": [
+                {"section_name": f"section_{s}",
+                 "fields": [{"field_name": f"field_{f}", "field_value": json.dumps({"n": f})}
+                            for f in range(field_count)]}
+                for s in range(section_count)
+            ],
+        }
+
+    def test_page_post_constant_queries(self):
+        # First write also creates the site_summary row
+        response, status = self._page_post(self._body(1, 1))
+        self.assertEqual(status, 200, response.get_json())
+
+        response, status = self._page_post(self._body(1, 2))
+        self.assertEqual(status, 200, response.get_json())
+        few = len(self.statements)
+
+        response, status = self._page_post(self._body(4, 5))
+        self.assertEqual(status, 200, response.get_json())
+        self.assertEqual(len(self.statements), few, self.statements)
+
+        sections = response.get_json()["data"]["sections"]
+        self.assertEqual([s["section_name"] for s in sections], [f"section_{s}" for s in range(4)])
+        self.assertEqual([f["field_name"] for f in sections[2]["fields"]], [f"field_{f}" for f in range(5)])
+        self.assertEqual(sections[2]["fields"][3]["field_value"], {"n": 3})
+
+    def test_page_post_is_atomic_with_error_map(self):
+        body = self._body(2, 2)
+        body["sections"][1]["fields"].append({"field_name": "field_0", "field_value": "dup"})
+        body["sections"].append({"section_name": "section_0", "fields": []})
+
+        response, status = self._page_post(body)
+
+        self.assertEqual(status, 400)
+        self.assertEqual(response.get_json()["errors"], {
+            "section_1.field_0": "Duplicate field in section 'section_1'. Each field_name must be unique per section.",
+            "section_0": "Duplicate section 'section_0'. Each section_name must be unique per page.",
+        })
+        self.assertEqual(self.statements, [])
+        self.assertIsNone(Page.get_by_siteid_and_pagename(self.site_id, body["page_name"]))
+
+    def test_page_post_deployment_defaults_and_step_errors(self):
+        body = {"site_id": self.site_id, "page_name": "deployment", "status": "created", "sections": [
+            {"section_name": "deployment_checklist", "fields": []},
+            {"section_name": "testing", "fields": [{"field_name": "notes", "field_value": "not-a-list"}]},
+        ]}
+
+        response, status = self._page_post(body)
+
+        self.assertEqual(status, 400)
+        self.assertEqual(list(response.get_json()["errors"]), ["testing.notes"])
+
+        body["sections"].pop()
+        response, status = self._page_post(body)
+
+        self.assertEqual(status, 200, response.get_json())
+        steps = response.get_json()["data"]["sections"][0]["fields"][0]
+        self.assertEqual(steps["field_name"], "steps")
+
+
+if __name__ == '__main__':
+    unittest.main()
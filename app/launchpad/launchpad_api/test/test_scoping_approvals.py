@@ -0,0 +1,546 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from flask import Flask
+from sqlalchemy import event, text
+
+from ..db import db
+from ..db_models.user import User
+from ..db_models import ScopingApproval, ApprovalAction, ApprovalAuditOutbox
+from ..db_models.site import Site
+from ..db_models.software_category import SoftwareCategory
+from ..db_models.software_module import SoftwareModule
+from ..db_models.hardware_category import HardwareCategory
+from ..db_models.hardware_item import HardwareItem
+from ..controllers import scoping_approval_controller
+from ..utils import approval_audit, approval_diff, approval_stats, cost_engine, generations
+from ..utils.cache_hooks import register_cache_hooks
+
+
+SCOPING = {"selected_hardware": [{"id": index, "name": f"Terminal {index}", "qty": 2} for index in range(50)]}
+
+
+class ScopingApprovalTestCase(unittest.TestCase):
+    """In-memory SQLite app with two sites and a few approval versions each"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.user = User(name="Engineer", email="eng@example.com",
+                         role=scoping_approval_controller.DEPLOYMENT_ENGINEER_ROLE)
+        self.sites = [Site(status="created"), Site(status="created")]
+        db.session.add_all([self.user] + self.sites)
+        db.session.flush()
+
+        # Site 1: rejected v1, pending v2; site 2: approved v1
+        created_at = datetime(2024, 1, 1)
+        self.approvals = []
+        for site, version, status in ((self.sites[0], 1, "rejected"), (self.sites[0], 2, "pending"),
+                                      (self.sites[1], 1, "approved")):
+            approval = ScopingApproval(site.id, f"Site {site.id}", self.user.id, "Engineer", SCOPING,
+                                       {"total": version * 100}, status=status, version=version)
+            # Same timestamp for two rows so the cursor tie-break on id is exercised
+            approval.created_at = created_at
+            created_at += timedelta(hours=1) if version == 2 else timedelta(0)
+            db.session.add(approval)
+            db.session.flush()
+            self.approvals.append(approval)
+        db.session.commit()
+        self.approval_ids = [approval.id for approval in self.approvals]
+        self.site_ids = [site.id for site in self.sites]
+        self.user_id = self.user.id
+        db.session.expunge_all()
+
+        # Catalog: software 1-2, hardware 1 active and 2 archived
+        software = SoftwareCategory("POS")
+        hardware = HardwareCategory("Terminals")
+        db.session.add_all([software, hardware])
+        db.session.flush()
+        db.session.add_all([
+            SoftwareModule("Till", software.id, license_fee=100),
+            SoftwareModule("Kiosk", software.id, license_fee="49.99"),
+            HardwareItem("Terminal", hardware.id, unit_cost="250.50", support_cost=10),
+            HardwareItem("Old terminal", hardware.id, unit_cost=90, is_active=False),
+        ])
+        db.session.commit()
+        register_cache_hooks()
+        cost_engine.reset_price_index()
+
+        self.statements = []
+        event.listen(db.engine, "before_cursor_execute", self._count)
+
+        patcher = mock.patch.object(scoping_approval_controller, "get_current_user", return_value=self.user)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self._count)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _get(self, handler, path="/api/scoping-approvals", **args):
+        with self.app.test_request_context(path, query_string=args):
+            response = handler()
+        return response[0].get_json(), response[1]
+
+
+class TestApprovalListing(ScopingApprovalTestCase):
+
+    def test_full_listing_is_unchanged(self):
+        payload, status = self._get(scoping_approval_controller.scoping_approvals_get)
+        self.assertEqual(status, 200)
+        self.assertNotIn("next_cursor", payload)
+        self.assertEqual([approval["id"] for approval in payload["data"]],
+                         [str(self.approval_ids[index]) for index in (2, 1, 0)])
+        self.assertEqual(payload["data"][0]["scoping_data"], SCOPING)
+
+    def test_summary_view_skips_blobs(self):
+        self.statements.clear()
+        payload, status = self._get(scoping_approval_controller.scoping_approvals_get, view="summary")
+        self.assertEqual(status, 200)
+        self.assertEqual(len(payload["data"]), 3)
+        self.assertNotIn("scoping_data", payload["data"][0])
+        self.assertNotIn("cost_breakdown", payload["data"][0])
+        self.assertEqual(payload["data"][0]["version"], 1)
+        # One SELECT, which never reads the blob columns
+        selects = [statement for statement in self.statements if statement.startswith("SELECT")]
+        self.assertEqual(len(selects), 1)
+        self.assertNotIn("scoping_data", selects[0])
+
+    def test_keyset_pages(self):
+        seen, after = [], None
+        while True:
+            args = {"limit": 1, "view": "summary"}
+            if after:
+                args["after"] = after
+            payload, status = self._get(scoping_approval_controller.scoping_approvals_get, **args)
+            self.assertEqual(status, 200)
+            seen.extend(approval["id"] for approval in payload["data"])
+            after = payload["next_cursor"]
+            if not after:
+                break
+        self.assertEqual(seen, [str(self.approval_ids[index]) for index in (2, 1, 0)])
+
+        payload, status = self._get(scoping_approval_controller.scoping_approvals_get,
+                                    limit=2, status="pending")
+        self.assertEqual([approval["status"] for approval in payload["data"]], ["pending"])
+        self.assertIsNone(payload["next_cursor"])
+
+    def test_invalid_parameters(self):
+        for args in ({"view": "compact"}, {"limit": 0}, {"after": "not-a-cursor"}):
+            payload, status = self._get(scoping_approval_controller.scoping_approvals_get, **args)
+            self.assertEqual(status, 400, args)
+
+    def test_blobs_still_returned_by_id(self):
+        approval_id = self.approval_ids[0]
+        with self.app.test_request_context(f"/api/scoping-approvals/{approval_id}"):
+            response, status = scoping_approval_controller.scoping_approvals_id_get(approval_id)
+        self.assertEqual(status, 200)
+        self.assertEqual(response.get_json()["data"]["scoping_data"], SCOPING)
+
+    def test_etag_depends_on_principal(self):
+        other = User(name="Manager", email="ops@example.com", role=self.user.role + 1)
+        db.session.add(other)
+        db.session.commit()
+
+        def get(user, headers=None):
+            with mock.patch.object(scoping_approval_controller, "get_current_user", return_value=user), \
+                    self.app.test_request_context("/api/scoping-approvals", headers=headers or {}):
+                return scoping_approval_controller.scoping_approvals_get()
+
+        with mock.patch.object(generations.get_generation_store(), "shared", True):
+            own = get(self.user)[2]["ETag"]
+            self.assertNotEqual(get(other)[2]["ETag"], own)
+            self.assertEqual(get(self.user, {"If-None-Match": own}).status_code, 304)
+            self.assertEqual(get(other, {"If-None-Match": own})[1], 200)
+
+
+
+class TestCurrentApprovals(ScopingApprovalTestCase):
+
+    def _latest_ids(self):
+        return sorted(approval_id for (approval_id,) in
+                      db.session.query(ScopingApproval.id).filter(ScopingApproval.is_latest.is_(True)))
+
+    def test_backfill_flags_one_approval_per_site(self):
+        # The fixture inserts rows directly, so every row starts flagged
+        self.assertEqual(len(self._latest_ids()), 3)
+        self.assertTrue(ScopingApproval.backfill_latest())
+        self.assertEqual(self._latest_ids(), [self.approval_ids[1], self.approval_ids[2]])
+        self.assertFalse(ScopingApproval.backfill_latest())
+
+    def test_create_and_delete_move_the_flag(self):
+        ScopingApproval.backfill_latest()
+        site_id = self.site_ids[0]
+        approval = ScopingApproval(site_id, "Site", self.user_id, "Engineer", SCOPING, {}, version=3,
+                                   previous_version_id=self.approval_ids[1])
+        approval.create_row()
+        self.assertEqual(self._latest_ids(), [self.approval_ids[2], approval.id])
+
+        approval.delete_row()
+        self.assertEqual(self._latest_ids(), [self.approval_ids[1], self.approval_ids[2]])
+
+    def test_current_approval_per_site_in_one_query(self):
+        ScopingApproval.backfill_latest()
+        self.statements.clear()
+        current = ScopingApproval.get_current_by_site_ids()
+        self.assertEqual(len(self.statements), 1)
+        self.assertEqual({site_id: approval.version for site_id, approval in current.items()},
+                         {self.site_ids[0]: 2, self.site_ids[1]: 1})
+        self.assertEqual(ScopingApproval.get_current_by_site_ids([self.site_ids[1]], status="pending"), {})
+
+        payload, status = self._get(scoping_approval_controller.scoping_approvals_get,
+                                    current="true", view="summary")
+        self.assertEqual(status, 200)
+        self.assertEqual([approval["id"] for approval in payload["data"]],
+                         [str(self.approval_ids[2]), str(self.approval_ids[1])])
+        self.assertTrue(all(approval["is_latest"] for approval in payload["data"]))
+
+
+
+class TestApprovalAudit(ScopingApprovalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.commits = 0
+        event.listen(db.engine, "commit", self._count_commit)
+
+    def tearDown(self):
+        event.remove(db.engine, "commit", self._count_commit)
+        super().tearDown()
+
+    def _count_commit(self, conn):
+        self.commits += 1
+
+    def _post(self, handler, *args, body=None):
+        with self.app.test_request_context("/api/scoping", method="POST", json=body or {}):
+            response, status = handler(*args, body or {})
+        return response.get_json(), status
+
+    def test_submit_queues_audit_in_the_same_commit(self):
+        self.commits = 0
+        payload, status = self._post(scoping_approval_controller.site_scoping_submit, self.site_ids[1],
+                                     body={"site_name": "Site", "selected_hardware": [{"id": 1}]})
+        self.assertEqual(status, 200, payload)
+        self.assertEqual(self.commits, 1)
+        self.assertEqual(ApprovalAction.query.count(), 0)
+        entry = ApprovalAuditOutbox.query.one()
+        approval_id = int(payload["data"]["id"])
+        self.assertEqual((entry.approval_id, entry.action), (approval_id, "submit"))
+
+        self.assertEqual(approval_audit.drain_outbox(), 1)
+        self.assertEqual(ApprovalAuditOutbox.query.count(), 0)
+        action = ApprovalAction.query.one()
+        self.assertEqual((action.approval_id, action.action, action.performed_by),
+                         (approval_id, "submit", self.user_id))
+
+    def test_review_and_resubmit_are_audited(self):
+        reviewer = User(name="Ops", email="ops@example.com", role=scoping_approval_controller.OPS_MANAGER_ROLE)
+        db.session.add(reviewer)
+        db.session.commit()
+        with mock.patch.object(scoping_approval_controller, "get_current_user", return_value=reviewer):
+            self.commits = 0
+            payload, status = self._post(scoping_approval_controller.scoping_approvals_id_reject,
+                                         self.approval_ids[1], body={"comment": "Too expensive"})
+            self.assertEqual(status, 200, payload)
+            self.assertEqual(self.commits, 1)
+
+        payload, status = self._post(scoping_approval_controller.site_scoping_resubmit, self.site_ids[0],
+                                     body={"previous_approval_id": self.approval_ids[1], "site_name": "Site",
+                                           "selected_hardware": [{"id": 1}]})
+        self.assertEqual(status, 200, payload)
+        new_id = int(payload["data"]["id"])
+
+        with mock.patch.object(scoping_approval_controller, "get_current_user", return_value=reviewer):
+            self.commits = 0
+            payload, status = self._post(scoping_approval_controller.scoping_approvals_id_approve, new_id)
+            self.assertEqual(status, 200, payload)
+            self.assertEqual(self.commits, 1)
+        self.assertEqual(Site.get_by_id(self.site_ids[0]).status, "approved")
+
+        self.assertEqual(approval_audit.drain_outbox(batch_size=2), 3)
+        self.assertEqual([(action.approval_id, action.action) for action in ApprovalAction.query.order_by(ApprovalAction.id)],
+                         [(self.approval_ids[1], "reject"), (new_id, "resubmit"), (new_id, "approve")])
+
+    def test_failed_sink_keeps_actions_for_retry(self):
+        delivered = []
+
+        def failing_sink(actions):
+            raise RuntimeError("sink unavailable")
+
+        approval_audit.record_action(self.approval_ids[0], "submit", self.user_id, "deployment_engineer")
+        db.session.commit()
+
+        approval_audit.register_sink(failing_sink)
+        try:
+            self.assertEqual(approval_audit.drain_outbox(), 0)
+        finally:
+            approval_audit.unregister_sink(failing_sink)
+        entry = ApprovalAuditOutbox.query.one()
+        self.assertEqual(entry.attempts, 1)
+        self.assertIn("sink unavailable", entry.last_error)
+        self.assertEqual(ApprovalAction.query.count(), 0)
+
+        approval_audit.register_sink(delivered.extend)
+        try:
+            self.assertEqual(approval_audit.drain_outbox(), 1)
+        finally:
+            approval_audit.unregister_sink(delivered.extend)
+        self.assertEqual([action["action"] for action in delivered], ["submit"])
+        self.assertEqual(ApprovalAction.query.count(), 1)
+
+    def test_poison_row_is_dead_lettered_without_blocking_the_queue(self):
+        # approval_actions.performed_by references users(id); the user is gone
+        db.session.execute(text("PRAGMA foreign_keys=ON"))
+        approval_audit.record_action(self.approval_ids[0], "submit", self.user_id + 100, "deployment_engineer")
+        db.session.commit()
+        poison_id = ApprovalAuditOutbox.query.one().id
+
+        for attempt in range(1, approval_audit.AUDIT_MAX_ATTEMPTS + 1):
+            approval_audit.record_action(self.approval_ids[1], f"review-{attempt}", self.user_id, "ops_manager")
+            db.session.commit()
+            with self.assertLogs(level="WARNING") as logs:
+                self.assertEqual(approval_audit.drain_outbox(batch_size=2), 1)
+            self.assertEqual(db.session.get(ApprovalAuditOutbox, poison_id).attempts, attempt)
+
+        self.assertTrue(any("DEAD-LETTERED" in line and line.startswith("ERROR") for line in logs.output))
+        poison = db.session.get(ApprovalAuditOutbox, poison_id)
+        self.assertIsNotNone(poison.dead_lettered_at)
+        self.assertIn("FOREIGN KEY", poison.last_error)
+        self.assertEqual(ApprovalAuditOutbox.pending_count(), 0)
+        self.assertEqual(ApprovalAuditOutbox.dead_letter_count(), 1)
+        self.assertEqual(ApprovalAction.query.count(), approval_audit.AUDIT_MAX_ATTEMPTS)
+
+        # Skipped from now on: new rows go through as whole batches again
+        approval_audit.record_action(self.approval_ids[1], "approve", self.user_id, "ops_manager")
+        approval_audit.record_action(self.approval_ids[1], "comment", self.user_id, "ops_manager")
+        db.session.commit()
+        self.assertEqual(approval_audit.drain_outbox(batch_size=2), 2)
+
+    def test_outage_does_not_dead_letter(self):
+        def failing_sink(actions):
+            raise RuntimeError("sink unavailable")
+
+        approval_audit.record_action(self.approval_ids[0], "submit", self.user_id, "deployment_engineer")
+        db.session.commit()
+        approval_audit.register_sink(failing_sink)
+        try:
+            for _ in range(approval_audit.AUDIT_MAX_ATTEMPTS + 1):
+                self.assertEqual(approval_audit.drain_outbox(), 0)
+        finally:
+            approval_audit.unregister_sink(failing_sink)
+        entry = ApprovalAuditOutbox.query.one()
+        self.assertEqual(entry.attempts, approval_audit.AUDIT_MAX_ATTEMPTS + 1)
+        self.assertIsNone(entry.dead_lettered_at)
+
+
+
+class TestCostEngine(ScopingApprovalTestCase):
+
+    def test_quote_prices_every_line(self):
+        quote = cost_engine.quote_selection([{"id": "1", "quantity": 2}, 2],
+                                            [{"id": 1, "quantity": 3}])
+        self.assertEqual([(line["id"], line["license_fee"], line["license_fee_total"]) for line in quote["software"]],
+                         [("1", 100.0, 200.0), ("2", 49.99, 49.99)])
+        self.assertEqual(quote["hardware"][0]["unit_cost_total"], 751.5)
+        self.assertEqual(quote["hardware"][0]["support_cost_total"], 30.0)
+        self.assertEqual((quote["softwareCost"], quote["hardwareCost"], quote["supportCost"],
+                          quote["totalCapex"], quote["totalInvestment"]),
+                         (249.99, 751.5, 30.0, 1001.49, 1031.49))
+
+    def test_invalid_items_are_listed(self):
+        with self.assertRaises(cost_engine.CostError) as raised:
+            cost_engine.quote_selection([{"id": 99}, {"id": "x"}], [{"id": 2}, {"id": 1, "quantity": 0}])
+        self.assertEqual(raised.exception.invalid, [
+            {"id": 99, "reason": "not found", "type": "software"},
+            {"id": "x", "reason": "malformed", "type": "software"},
+            {"id": 2, "reason": "archived", "type": "hardware"},
+            {"id": 1, "reason": "invalid quantity", "type": "hardware"},
+        ])
+
+    def test_index_is_reused_until_the_catalog_changes(self):
+        cost_engine.quote_selection([1], [])
+        self.statements.clear()
+        for _ in range(3):
+            cost_engine.quote_selection([1, 2], [1])
+        self.assertEqual(self.statements, [])
+
+        module = SoftwareModule.query.get(1)
+        module.license_fee = 120
+        module.update_row()
+        self.assertEqual(cost_engine.quote_selection([1], [])["softwareCost"], 120.0)
+
+    def test_submission_stores_server_costs(self):
+        payload, status = self._submit({"site_name": "Site", "selected_hardware": [{"id": "2"}]})
+        self.assertEqual(status, 400)
+        self.assertEqual(payload["invalid_items"], [{"id": "2", "reason": "archived", "type": "hardware"}])
+
+        payload, status = self._submit({"site_name": "Site", "selected_software": [{"id": "1", "quantity": 1}],
+                                        "selected_hardware": [{"id": "1", "quantity": 2}],
+                                        "cost_summary": {"totalInvestment": 1}})
+        self.assertEqual(status, 200, payload)
+        # The client's figures keep their place; the catalog quote sits next to them
+        cost_breakdown = payload["data"]["cost_breakdown"]
+        self.assertEqual(cost_breakdown["totalInvestment"], 1)
+        quote = cost_breakdown["server_quote"]
+        self.assertEqual(quote["totalInvestment"], 621.0)
+        self.assertEqual([(line["id"], line["quantity"]) for line in quote["hardware"]], [("1", 2)])
+
+    def _submit(self, body):
+        # Site 2 has no pending approval
+        with self.app.test_request_context("/api/scoping", method="POST", json=body):
+            response, status = scoping_approval_controller.site_scoping_submit(self.site_ids[1], body)
+        return response.get_json(), status
+
+
+class TestApprovalDiff(ScopingApprovalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        approval_diff._diff_cache.clear()
+        # Site 1: rejected v1 (legacy client costs) <- v2 <- v3, both priced by the server
+        self.chain_ids = [self.approval_ids[0]]
+        for version, software, hardware in ((2, [1], [{"id": 1, "quantity": 1}]),
+                                            (3, [{"id": 1, "quantity": 2}, 2], [])):
+            approval = ScopingApproval(self.site_ids[0], "Site", self.user_id, "Engineer",
+                                       {"selected_software": software, "selected_hardware": hardware},
+                                       scoping_approval_controller.priced_cost_breakdown(
+                                           software, hardware, {"totalInvestment": version * 100}),
+                                       status="pending",
+                                       version=version, previous_version_id=self.chain_ids[-1])
+            self.chain_ids.append(approval.create_row())
+        db.session.expunge_all()
+
+    def _diff(self, approval_id, **args):
+        return self._get(lambda: scoping_approval_controller.scoping_approvals_id_diff_get(approval_id),
+                         path=f"/api/scoping-approvals/{approval_id}/diff", **args)
+
+    def test_chain_is_walked_in_one_query(self):
+        chain = ScopingApproval.get_version_chain(self.chain_ids[2])
+        self.assertEqual([(row.id, row.depth) for row in chain],
+                         [(self.chain_ids[2], 0), (self.chain_ids[1], 1), (self.chain_ids[0], 2)])
+        self.assertEqual(ScopingApproval.get_version_chain(999), [])
+
+    def test_diff_against_previous_version(self):
+        payload, status = self._diff(self.chain_ids[2])
+        self.assertEqual(status, 200, payload)
+        diff = payload["data"]
+        self.assertEqual((diff["version"], diff["against_id"], diff["against_version"]),
+                         (3, str(self.chain_ids[1]), 2))
+        self.assertEqual([entry["version"] for entry in diff["chain"]], [3, 2, 1])
+
+        software = diff["software"]
+        self.assertEqual([line["id"] for line in software["added"]], ["2"])
+        self.assertEqual(software["changed"][0]["changes"]["quantity"], {"old": 1, "new": 2})
+        self.assertEqual(software["changed"][0]["changes"]["license_fee_total"], {"old": 100.0, "new": 200.0})
+        self.assertEqual([line["name"] for line in diff["hardware"]["removed"]], ["Terminal"])
+
+        costs = {entry["key"]: entry for entry in diff["costs"]["changed"]}
+        self.assertEqual(costs["totalInvestment"]["delta"], 100)
+        self.assertEqual(costs["server_quote.softwareCost"]["delta"], 149.99)
+        self.assertEqual(costs["server_quote.hardwareCost"]["delta"], -250.5)
+
+    def test_legacy_version_is_compared_on_the_selection(self):
+        # v1 has no server quote: both sides are compared on id and quantity only
+        payload, status = self._diff(self.chain_ids[1])
+        self.assertEqual(status, 200, payload)
+        hardware = payload["data"]["hardware"]
+        self.assertEqual(hardware["changed"], [
+            {"id": "1", "name": None, "changes": {"quantity": {"old": 2, "new": 1}}},
+        ])
+        self.assertEqual(len(hardware["removed"]), 49)
+        self.assertEqual(hardware["removed"][0], {"id": "0", "quantity": 2})
+        self.assertEqual(payload["data"]["software"]["added"], [{"id": "1", "quantity": 1}])
+
+    def test_diff_is_cached(self):
+        self._diff(self.chain_ids[2])
+        self.statements.clear()
+        payload, status = self._diff(self.chain_ids[2])
+        self.assertEqual(status, 200)
+        # Only the chain query; the blobs are neither read nor diffed again
+        self.assertEqual(len(self.statements), 1)
+        self.assertIn("version_chain", self.statements[0])
+        self.assertNotIn("scoping_data", self.statements[0])
+
+    def test_against_and_first_version(self):
+        payload, status = self._diff(self.chain_ids[2], against=self.chain_ids[0])
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["data"]["costs"]["removed"], {"total": 100})
+        self.assertEqual(len(payload["data"]["hardware"]["removed"]), 50)
+
+        payload, status = self._diff(self.chain_ids[0])
+        self.assertEqual(status, 200)
+        self.assertIsNone(payload["data"]["against_id"])
+        self.assertEqual(len(payload["data"]["hardware"]["added"]), 50)
+
+        payload, status = self._diff(self.chain_ids[2], against=self.approval_ids[2])
+        self.assertEqual(status, 400)
+        payload, status = self._diff(999)
+        self.assertEqual(status, 404)
+
+    def test_chain_read_failure_is_a_server_error(self):
+        with mock.patch.object(ScopingApproval, "get_version_chain", return_value=None):
+            payload, status = self._diff(self.chain_ids[2])
+        self.assertEqual(status, 500)
+
+
+class TestApprovalStats(ScopingApprovalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        approval_stats._stats_cache.clear()
+
+    def _stats(self, **args):
+        return self._get(scoping_approval_controller.scoping_approvals_stats_get,
+                         path="/api/scoping-approvals/stats", **args)
+
+    def test_counts_per_engineer_and_site(self):
+        self.statements.clear()
+        payload, status = self._stats()
+        self.assertEqual(status, 200)
+        stats = payload["data"]
+        self.assertEqual(stats["totals"], {"pending": 1, "approved": 1, "rejected": 1,
+                                           "changes_requested": 0, "total": 3})
+        self.assertEqual([(engineer["deployment_engineer_id"], engineer["total"]) for engineer in stats["by_engineer"]],
+                         [(str(self.user_id), 3)])
+        sites = {site["site_id"]: site for site in stats["by_site"]}
+        self.assertEqual((sites[str(self.site_ids[0])]["pending"], sites[str(self.site_ids[0])]["rejected"]), (1, 1))
+        self.assertEqual(sites[str(self.site_ids[1])]["approved"], 1)
+        # One grouped query
+        selects = [statement for statement in self.statements if statement.startswith("SELECT")]
+        self.assertEqual(len(selects), 1)
+        self.assertIn("GROUP BY", selects[0])
+
+        # The fixture inserts without create_row(), so flag the current versions first
+        ScopingApproval.backfill_latest()
+        payload, status = self._stats(current="true")
+        self.assertEqual(payload["data"]["totals"]["total"], 2)
+        self.assertEqual(payload["data"]["totals"]["rejected"], 0)
+
+    def test_cached_until_an_approval_changes_state(self):
+        self._stats()
+        self.statements.clear()
+        payload, status = self._stats()
+        self.assertEqual(status, 200)
+        self.assertEqual(self.statements, [])
+
+        approval = ScopingApproval.query.get(self.approval_ids[1])
+        approval.status = "approved"
+        approval.update_row()
+        payload, status = self._stats()
+        self.assertEqual((payload["data"]["totals"]["pending"], payload["data"]["totals"]["approved"]), (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
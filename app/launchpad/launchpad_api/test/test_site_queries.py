@@ -0,0 +1,521 @@
+import json
+import unittest
+import unittest.mock
+from contextlib import nullcontext
+
+from flask import Flask
+from sqlalchemy import event, text
+
+from ..db import db
+from ..db_models.user import User  # noqa: F401 - registers the users table
+from ..db_models import ScopingApproval  # noqa: F401
+from ..db_models.site import Site
+from ..db_models.page import Page
+from ..db_models.section import Section
+from ..db_models.fields import Field
+from ..db_models.site_summary import SiteSummary
+from ..db_models.site_tombstone import SiteTombstone
+from ..db_models.approval_action import ApprovalAction
+from ..db_models.procurement_data import ProcurementData
+from ..db_models.go_live_data import GoLiveData
+from ..utils.queries import get_all_site_details, get_changed_site_ids
+from ..utils.site_purge import purge_site
+from ..utils.cache import site_cache
+from ..utils.cache_hooks import register_cache_hooks
+from ..utils.generations import bump_generations
+from ..utils import site_search
+from ..utils.site_search import SiteSearchIndex
+from ..utils.site_summary import refresh_site_summary, backfill_summary_extra
+from ..utils.pagination import encode_cursor
+from ..controllers import site_controller, page_controller
+from datetime import datetime, timedelta
+
+
+class TestSiteListingFilters(unittest.TestCase):
+    """/site/all filters and sorts on the site_summary columns in SQL"""
+
+    SITES = [
+        {"sector": "Education", "target_live_date": "2025-03-01", "site_name": "Alpha"},
+        {"sector": {"value": "Healthcare"}, "target_live_date": "2025-01-15", "site_name": "Beta"},
+        {"sector": "Education", "target_live_date": "not a date", "site_name": "Gamma"},
+        {"sector": "Education", "target_live_date": "2024-12-31T00:00:00Z", "site_name": "Delta"},
+    ]
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        site_cache.clear()
+
+        self.site_ids = []
+        for values in self.SITES:
+            site = Site(status="created")
+            db.session.add(site)
+            db.session.flush()
+            page = Page(page_name="create_site", site_id=site.id)
+            db.session.add(page)
+            db.session.flush()
+            section = Section(section_name="general_info", page_id=page.id)
+            db.session.add(section)
+            db.session.flush()
+            for field_name, value in values.items():
+                db.session.add(Field(field_name, value, section.id))
+            db.session.flush()
+            with self.assertLogs(level="WARNING") if values["target_live_date"] == "not a date" else nullcontext():
+                refresh_site_summary(site.id)
+            self.site_ids.append(site.id)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _site_ids(self, **args):
+        with self.app.test_request_context("/api/site/all", query_string=args):
+            response, status, _ = site_controller.site_all_get(**args)
+        self.assertEqual(status, 200, response.get_json())
+        return [site["site_id"] for site in response.get_json()["data"]]
+
+    def test_sector_filter(self):
+        alpha, beta, gamma, delta = self.site_ids
+        self.assertEqual(self._site_ids(sector="Education"), [alpha, gamma, delta])
+        self.assertEqual(self._site_ids(sector="Healthcare"), [beta])
+
+    def test_live_date_range_and_sort(self):
+        alpha, beta, gamma, delta = self.site_ids
+        self.assertEqual(self._site_ids(target_live_from="2025-01-01", sort="target_live_date"), [beta, alpha])
+        self.assertEqual(self._site_ids(target_live_to="2025-01-15", sort="target_live_date"), [delta, beta])
+
+        # Malformed dates have no column value and sort last
+        self.assertEqual(self._site_ids(sector="Education", sort="target_live_date"), [delta, alpha, gamma])
+
+        with self.app.test_request_context("/api/site/all"):
+            response, status = site_controller.site_all_get(target_live_from="spring")
+        self.assertEqual(status, 400)
+
+    def test_values_written_by_page_post(self):
+        # page_post receives non-string values as JSON text
+        body = {"status": "created", "page_name": "create_site", "sections": [
+            {"section_name": "general_info", "fields": [
+                {"field_name": "sector", "field_value": json.dumps({"value": "Retail"})},
+                {"field_name": "target_live_date", "field_value": json.dumps({"value": "2025-02-01"})},
+            ]},
+        ]}
+        with self.app.test_request_context("/api/page", method="POST", json=body):
+            response, status = page_controller.page_post(body)
+        self.assertEqual(status, 200, response.get_json())
+        site_id = response.get_json()["data"]["site_id"]
+        self.assertEqual(Field.query.filter_by(field_name="sector").all()[-1].field_value, {"value": "Retail"})
+        self.assertEqual(self._site_ids(sector="Retail"), [site_id])
+        self.assertEqual(self._site_ids(target_live_from="2025-02-01", target_live_to="2025-02-01"), [site_id])
+
+
+class TestSiteSearchIndex(unittest.TestCase):
+    """Inverted index search, kept current by commits and generation checks"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        register_cache_hooks()
+
+        self.fields = {}
+        self.loaded = []
+        self.site_ids = []
+        for values in (
+            {"site_name": "Acme North Canteen", "organization_name": "Acme Corp", "unit_code": "U-100"},
+            {"site_name": "Beta Kitchen", "organization_name": {"value": "Acme Foods"},
+             "assigned_deployment_engineer": "Jane Doe"},
+            {"site_name": "Gamma Cafe", "organization_name": "Gamma Ltd", "unit_code": "U-200"},
+        ):
+            self.site_ids.append(self._create_site(values))
+
+        self.index = SiteSearchIndex()
+        from ..utils import cache_hooks
+        cache_hooks.on_commit(self.index.note_commit)
+        self.addCleanup(cache_hooks._commit_listeners.remove, self.index.note_commit)
+
+    def _create_site(self, values):
+        site = Site(status="created")
+        db.session.add(site)
+        db.session.flush()
+        page = Page(page_name="create_site", site_id=site.id)
+        db.session.add(page)
+        db.session.flush()
+        section = Section(section_name="general_info", page_id=page.id)
+        db.session.add(section)
+        db.session.flush()
+        for field_name, value in values.items():
+            field = Field(field_name, value, section.id)
+            db.session.add(field)
+            self.fields[(site.id, field_name)] = field
+        # Keep the parents loaded, as a controller would, so commits resolve the site
+        self.loaded.extend((site, page, section))
+        db.session.commit()
+        return site.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _ids(self, query):
+        return [hit["site_id"] for hit in self.index.search(query)]
+
+    def test_token_and_prefix_search(self):
+        acme_north, beta, gamma = self.site_ids
+        # site_name matches outrank organization matches
+        self.assertEqual(self._ids("acme"), [acme_north, beta])
+        self.assertEqual(self._ids("ACM kitch"), [beta])
+        self.assertEqual(self._ids("u-2"), [gamma])
+        self.assertEqual(self._ids("jane"), [beta])
+        self.assertEqual(self._ids("nothing"), [])
+        self.assertEqual(self._ids("  "), [])
+
+        hit = self.index.search("gamma")[0]
+        self.assertEqual(hit["site_name"], "Gamma Cafe")
+        self.assertEqual(hit["status"], "Created")
+
+    def test_local_commit_reindexes_only_that_site(self):
+        acme_north, beta, gamma = self.site_ids
+        self.index.search("acme")
+
+        field = self.fields[(gamma, "site_name")]
+        field.field_value = "Acme South"
+        db.session.commit()
+        new_site = self._create_site({"site_name": "Delta Acme"})
+
+        with unittest.mock.patch.object(self.index, "rebuild") as rebuild:
+            self.assertEqual(self._ids("acme"), [acme_north, gamma, new_site, beta])
+            rebuild.assert_not_called()
+        self.assertEqual(self._ids("cafe"), [])
+
+    def test_foreign_write_reindexes_changed_sites(self):
+        acme_north, beta, gamma = self.site_ids
+        self.index.search("acme")
+
+        # Another worker wrote: generations moved without a local commit
+        db.session.execute(text("UPDATE field SET field_value = '\"Zeta\"', updated_at = :now "
+                                "WHERE field_name = 'site_name' AND section_id = :id"),
+                           {"id": self.fields[(acme_north, "site_name")].section_id, "now": datetime.utcnow()})
+        db.session.commit()
+        bump_generations(["field"])
+
+        # Without the overlap only the site written after the first sync is re-read
+        with unittest.mock.patch.object(site_search, "SYNC_OVERLAP_SECONDS", 0), \
+                unittest.mock.patch.object(self.index, "rebuild") as rebuild, \
+                unittest.mock.patch.object(self.index, "reindex", wraps=self.index.reindex) as reindex:
+            self.assertEqual(self._ids("zeta"), [acme_north])
+            rebuild.assert_not_called()
+            self.assertEqual(set(reindex.call_args[0][0]), {acme_north})
+
+    def test_foreign_delete_drops_tombstoned_site(self):
+        acme_north, beta, gamma = self.site_ids
+        self.index.search("acme")
+
+        db.session.execute(text("UPDATE site SET deleted_at = :now WHERE id = :id"),
+                           {"id": beta, "now": datetime.utcnow()})
+        db.session.add(SiteTombstone(beta))
+        db.session.commit()
+        bump_generations(["site"])
+
+        self.assertEqual(self._ids("acme"), [acme_north])
+
+    def test_unknown_changes_fall_back_to_rebuild(self):
+        self.index.search("acme")
+        bump_generations(["field"])
+
+        with unittest.mock.patch.object(site_search, "get_changed_site_ids", return_value=None), \
+                unittest.mock.patch.object(self.index, "rebuild", wraps=self.index.rebuild) as rebuild:
+            self.index.search("acme")
+            rebuild.assert_called_once()
+
+
+class TestSiteChanges(unittest.TestCase):
+    """GET /site/changes returns changed sites and tombstones since a cursor"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.site_ids = []
+        self.fields = {}
+        for name in ("Alpha", "Beta", "Gamma"):
+            site = Site(status="created")
+            db.session.add(site)
+            db.session.flush()
+            page = Page(page_name="create_site", site_id=site.id)
+            db.session.add(page)
+            db.session.flush()
+            section = Section(section_name="general_info", page_id=page.id)
+            db.session.add(section)
+            db.session.flush()
+            self.fields[site.id] = Field("site_name", name, section.id)
+            db.session.add(self.fields[site.id])
+            db.session.flush()
+            refresh_site_summary(site.id)
+            self.site_ids.append(site.id)
+        db.session.commit()
+
+        # Everything above happened an hour ago
+        an_hour_ago = datetime.utcnow() - timedelta(hours=1)
+        for table in ("site", "page", "section", "field"):
+            db.session.execute(text(f"UPDATE {table} SET updated_at = :at"), {"at": an_hour_ago})
+        db.session.commit()
+        self.cursor = encode_cursor(datetime.utcnow() - timedelta(minutes=1))
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _changes(self, since=None):
+        with self.app.test_request_context("/api/site/changes"):
+            response, status = site_controller.site_changes_get(since)
+        return response.get_json(), status
+
+    def test_full_sync_without_cursor(self):
+        payload, status = self._changes()
+
+        self.assertEqual(status, 200)
+        self.assertTrue(payload["reset"])
+        self.assertEqual([site["site_id"] for site in payload["data"]], self.site_ids)
+        self.assertTrue(payload["next_cursor"])
+
+    def test_only_changed_sites_and_tombstones(self):
+        alpha, beta, gamma = self.site_ids
+        payload, status = self._changes(self.cursor)
+        self.assertEqual((payload["data"], payload["deleted"], payload["reset"]), ([], [], False))
+
+        field = db.session.get(Field, self.fields[beta].id)
+        field.field_value = "Beta 2"
+        refresh_site_summary(beta)
+        db.session.commit()
+
+        with self.app.test_request_context("/api/site"), \
+                unittest.mock.patch.object(site_controller.site_purge_worker, "enqueue"):
+            response, status = site_controller.site_delete(gamma)
+        self.assertEqual(status, 200, response.get_json())
+
+        payload, status = self._changes(self.cursor)
+        self.assertEqual(status, 200)
+        self.assertEqual([(site["site_id"], site["site_name"]) for site in payload["data"]], [(beta, "Beta 2")])
+        self.assertEqual(payload["deleted"], [gamma])
+
+    def test_invalid_cursor(self):
+        payload, status = self._changes("not-a-cursor")
+        self.assertEqual(status, 400)
+
+
+class TestSiteSoftDelete(unittest.TestCase):
+    """site_delete hides a site at once; purge_site removes its rows in chunks"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(name="Engineer", email="eng@example.com", role="deployment_engineer")
+        db.session.add(user)
+        db.session.flush()
+
+        self.site_ids = []
+        for name, status in (("Alpha", "created"), ("Beta", "created"), ("Gamma", "live")):
+            site = Site(status=status)
+            db.session.add(site)
+            db.session.flush()
+            for page_name in ("create_site", "site_study"):
+                page = Page(page_name=page_name, site_id=site.id)
+                db.session.add(page)
+                db.session.flush()
+                for section_name in ("general_info", "layout"):
+                    section = Section(section_name=section_name, page_id=page.id)
+                    db.session.add(section)
+                    db.session.flush()
+                    db.session.add(Field("site_name", name, section.id))
+                    for index in range(2):
+                        db.session.add(Field(f"extra_{index}", {"value": index}, section.id))
+            first = ScopingApproval(site.id, name, user.id, "Engineer", {"a": 1}, {"total": 1})
+            db.session.add(first)
+            db.session.flush()
+            second = ScopingApproval(site.id, name, user.id, "Engineer", {"a": 2}, {"total": 2},
+                                     version=2, previous_version_id=first.id)
+            db.session.add(second)
+            db.session.flush()
+            db.session.add(ApprovalAction(second.id, "submit", user.id, "deployment_engineer"))
+            db.session.add(ProcurementData(site.id))
+            db.session.add(GoLiveData(site.id))
+            db.session.flush()
+            refresh_site_summary(site.id)
+            self.site_ids.append(site.id)
+        db.session.commit()
+
+        patcher = unittest.mock.patch.object(site_controller.site_purge_worker, "enqueue")
+        self.enqueue = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _count(self, model, site_id):
+        if model is Field:
+            return (Field.query.join(Section, Section.id == Field.section_id)
+                    .join(Page, Page.id == Section.page_id).filter(Page.site_id == site_id).count())
+        if model is Section:
+            return Section.query.join(Page, Page.id == Section.page_id).filter(Page.site_id == site_id).count()
+        if model is ApprovalAction:
+            return (ApprovalAction.query.join(ScopingApproval, ScopingApproval.id == ApprovalAction.approval_id)
+                    .filter(ScopingApproval.site_id == site_id).count())
+        if model is Site:
+            return Site.query.filter(Site.id == site_id).count()
+        return model.query.filter(model.site_id == site_id).count()
+
+    def test_delete_hides_site_and_schedules_purge(self):
+        alpha, beta, _ = self.site_ids
+        since = datetime.utcnow() - timedelta(hours=1)
+
+        with self.app.test_request_context("/api/site"):
+            response, status = site_controller.site_delete(alpha)
+        self.assertEqual(status, 200, response.get_json())
+        self.enqueue.assert_called_once_with([alpha])
+
+        self.assertIsNone(Site.get_by_id(alpha))
+        self.assertIsNone(SiteSummary.get_by_site_id(alpha))
+        self.assertEqual({row.id for row in get_all_site_details(use_cache=False)}, set(self.site_ids) - {alpha})
+        self.assertNotIn(alpha, get_changed_site_ids(since))
+        # Nothing has been purged yet
+        self.assertEqual(self._count(Field, alpha), 12)
+
+        with self.app.test_request_context("/api/site"):
+            response, status = site_controller.site_delete(alpha)
+        self.assertEqual(status, 404)
+
+    def test_purge_removes_rows_in_chunks(self):
+        alpha, beta, _ = self.site_ids
+        with self.app.test_request_context("/api/site"):
+            site_controller.site_delete(alpha)
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("DELETE FROM field"):
+                statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            counts = purge_site(alpha, chunk_size=5)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+        self.assertEqual(counts["field"], 12)
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(counts["site"], 1)
+        for model in (Field, Section, Page, ApprovalAction, ScopingApproval, ProcurementData, GoLiveData, Site):
+            self.assertEqual(self._count(model, alpha), 0, model)
+            self.assertGreater(self._count(model, beta), 0, model)
+
+        # Already purged
+        self.assertIsNone(purge_site(alpha))
+
+    def test_purge_ignores_sites_not_deleted(self):
+        self.assertIsNone(purge_site(self.site_ids[1]))
+        self.assertEqual(self._count(Field, self.site_ids[1]), 12)
+
+    def test_bulk_delete(self):
+        alpha, beta, gamma = self.site_ids
+        body = {"site_ids": [alpha, beta, gamma, 9999]}
+        with self.app.test_request_context("/api/site/bulk-delete", method="POST", json=body):
+            response, status = site_controller.site_bulk_delete(body)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(response.get_json()["data"],
+                         {"deleted": [alpha, beta], "rejected": [gamma], "not_found": [9999]})
+        self.enqueue.assert_called_once_with([alpha, beta])
+        self.assertIsNone(Site.get_by_id(beta))
+        self.assertIsNotNone(Site.get_by_id(gamma))
+
+    def test_bulk_delete_validation(self):
+        for body in ({}, {"site_ids": []}, {"site_ids": ["x"]},
+                     {"site_ids": list(range(site_controller.MAX_BULK_DELETE_SITES + 1))}):
+            with self.app.test_request_context("/api/site/bulk-delete", method="POST", json=body):
+                response, status = site_controller.site_bulk_delete(body)
+            self.assertEqual(status, 400, body)
+
+
+class TestSiteSummaryExtra(unittest.TestCase):
+    """/site/all keeps general_info fields that have no site_summary column"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        site = Site(status="created")
+        db.session.add(site)
+        db.session.flush()
+        page = Page(page_name="create_site", site_id=site.id)
+        db.session.add(page)
+        db.session.flush()
+        section = Section(section_name="general_info", page_id=page.id)
+        db.session.add(section)
+        db.session.flush()
+        for field_name, value in (("site_name", "Alpha"), ("org_name", {"value": "Acme"}),
+                                  ("notes", {"text": "Back door"}), ("target_live_date", "next spring")):
+            db.session.add(Field(field_name, value, section.id))
+        db.session.flush()
+        with self.assertLogs(level="WARNING") as logs:
+            refresh_site_summary(site.id)
+        self.assertIn("next spring", logs.output[0])
+        db.session.commit()
+        self.site_id = site.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_extra_fields_are_returned(self):
+        site = db.session.get(SiteSummary, self.site_id).to_dict()
+        self.assertEqual(site["name"], "Alpha")
+        self.assertEqual(site["organization_name"], "Acme")
+        self.assertEqual(site["org_name"], {"value": "Acme"})
+        self.assertEqual(site["notes"], {"text": "Back door"})
+        # Unparseable dates are returned as stored instead of dropped
+        self.assertEqual(site["target_live_date"], "next spring")
+        self.assertIsNone(db.session.get(SiteSummary, self.site_id).target_live_date)
+
+    def test_backfill_fills_rows_without_extra(self):
+        db.session.execute(text("UPDATE site_summary SET extra = NULL"))
+        db.session.commit()
+        self.assertEqual(backfill_summary_extra(), 1)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(SiteSummary, self.site_id).to_dict()["notes"], {"text": "Back door"})
+        self.assertEqual(backfill_summary_extra(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
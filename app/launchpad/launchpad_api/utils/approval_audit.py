@@ -0,0 +1,243 @@
+"""
+Approval Audit Pipeline
+
+Approval handlers never write approval_actions directly. record_action()
+adds an ApprovalAuditOutbox row to the session, so the audit entry commits
+(or rolls back) together with the approval change in the handler's single
+commit - an approval can no longer change without its audit row.
+
+The ApprovalAuditDrainer thread then moves outbox rows in batches: downstream
+sinks registered with register_sink() receive each batch first, then the
+rows are bulk inserted into approval_actions and deleted from the outbox in
+one transaction. When a batch fails, its rows are retried one by one so a
+single bad row (e.g. performed_by pointing at a deleted user) does not hold
+back the others. A row that fails stays in the outbox (attempts/last_error
+updated) and is retried on the next drain, so delivery to sinks is
+at-least-once and to approval_actions exactly-once. Once a row has failed
+AUDIT_MAX_ATTEMPTS times it is dead-lettered: dead_lettered_at is set, an
+error is logged and the drainer skips it from then on. Rows are only
+dead-lettered in a drain that delivered something else, so an outage of a
+sink or the database does not dead-letter the whole queue.
+
+The drainer wakes up after every commit that touched the outbox and also
+polls every AUDIT_DRAIN_INTERVAL seconds for rows left by other processes
+or a previous run.
+"""
+
+import logging
+import threading
+import traceback
+from datetime import datetime
+
+from flask import current_app
+
+from ..db import db
+from ..db_models.approval_action import ApprovalAction
+from ..db_models.approval_audit_outbox import ApprovalAuditOutbox
+from .cache_hooks import on_commit
+
+
+# Outbox rows moved per transaction
+AUDIT_BATCH_SIZE = 200
+
+# Seconds between polls when nothing signalled new rows
+AUDIT_DRAIN_INTERVAL = 30
+
+# Failed deliveries after which an outbox row is dead-lettered
+AUDIT_MAX_ATTEMPTS = 5
+
+_sinks = []
+
+
+def register_sink(sink):
+    """
+    Deliver audit actions to sink(actions) as well, where actions is a list
+    of approval_actions column dicts. Raising makes the batch retry.
+    """
+    if sink not in _sinks:
+        _sinks.append(sink)
+
+
+def unregister_sink(sink):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+def record_action(approval_id, action, performed_by, performed_by_role, comment=None, action_metadata=None):
+    """Queue an audit action in the caller's transaction; does not commit."""
+    entry = ApprovalAuditOutbox(
+        approval_id=approval_id,
+        action=action,
+        performed_by=performed_by,
+        performed_by_role=performed_by_role,
+        comment=comment,
+        action_metadata=action_metadata,
+    )
+    db.session.add(entry)
+    return entry
+
+
+def drain_outbox(batch_size=None):
+    """
+    Move outbox rows to the sinks and approval_actions until the outbox is
+    empty or a batch fails; the rows of a failed batch are then delivered
+    one by one. Returns the number of actions delivered.
+    """
+    batch_size = batch_size or AUDIT_BATCH_SIZE
+    delivered = 0
+
+    while True:
+        entries = ApprovalAuditOutbox.get_batch(batch_size)
+        if not entries:
+            db.session.rollback()
+            return delivered
+
+        entry_ids = [entry.id for entry in entries]
+        try:
+            _deliver(entries)
+        except Exception as error:
+            db.session.rollback()
+            logging.warning(f"[drain_outbox] Batch of {len(entry_ids)} audit actions failed, retrying one by one: {error}")
+            return delivered + _deliver_one_by_one(entry_ids, delivered_before=delivered)
+
+        delivered += len(entries)
+        if len(entries) < batch_size:
+            return delivered
+
+
+def _deliver(entries):
+    """Sinks, approval_actions insert and outbox delete of `entries` in one transaction."""
+    actions = [entry.to_action() for entry in entries]
+    for sink in list(_sinks):
+        sink(actions)
+    db.session.bulk_insert_mappings(ApprovalAction, actions)
+    db.session.execute(
+        ApprovalAuditOutbox.__table__.delete()
+        .where(ApprovalAuditOutbox.id.in_([entry.id for entry in entries]))
+    )
+    db.session.commit()
+    # Deleted behind the ORM's back; a reused id must not find them in the identity map
+    for entry in entries:
+        db.session.expunge(entry)
+
+
+def _deliver_one_by_one(entry_ids, delivered_before=0):
+    delivered, failures = 0, {}
+    for entry_id in entry_ids:
+        entry = (
+            ApprovalAuditOutbox.query
+            .filter(ApprovalAuditOutbox.id == entry_id, ApprovalAuditOutbox.dead_lettered_at.is_(None))
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if entry is None:
+            # Taken by another drainer or removed with its approval
+            db.session.rollback()
+            continue
+        try:
+            _deliver([entry])
+            delivered += 1
+        except Exception as error:
+            db.session.rollback()
+            failures[entry_id] = error
+
+    # Nothing got through: more likely an outage than bad rows
+    _mark_failed(failures, dead_letter=bool(delivered or delivered_before))
+    return delivered
+
+
+def _mark_failed(failures, dead_letter=True):
+    """Count a failed attempt per entry id; dead-letter those out of attempts."""
+    try:
+        table = ApprovalAuditOutbox.__table__
+        for entry_id, error in failures.items():
+            db.session.execute(
+                table.update()
+                .where(table.c.id == entry_id)
+                .values(attempts=table.c.attempts + 1, last_error=str(error)[:1000])
+            )
+        dead = []
+        if dead_letter and failures:
+            dead = [
+                (entry.id, entry.approval_id, entry.action, entry.attempts)
+                for entry in ApprovalAuditOutbox.query.filter(
+                    ApprovalAuditOutbox.id.in_(list(failures)),
+                    ApprovalAuditOutbox.attempts >= AUDIT_MAX_ATTEMPTS,
+                ).all()
+            ]
+            if dead:
+                db.session.execute(
+                    table.update()
+                    .where(table.c.id.in_([entry_id for entry_id, _, _, _ in dead]))
+                    .values(dead_lettered_at=datetime.utcnow())
+                )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logging.warning(f"[drain_outbox] Could not record the failure:\n{traceback.format_exc()}")
+        return
+
+    for entry_id, approval_id, action, attempts in dead:
+        logging.error(
+            f"[drain_outbox] DEAD-LETTERED audit action outbox_id={entry_id} approval_id={approval_id} "
+            f"action={action} after {attempts} failed attempts: {failures[entry_id]}. "
+            f"It is no longer delivered; fix it and clear dead_lettered_at to retry."
+        )
+
+
+class ApprovalAuditDrainer:
+    """Background thread running drain_outbox() when new audit rows commit."""
+
+    def __init__(self):
+        self._app = None
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+        on_commit(self._on_commit)
+
+    def notify(self):
+        """Ask the drainer to run soon."""
+        if self._app is None:
+            self._app = current_app._get_current_object()
+        self._wakeup.set()
+        self._ensure_started()
+
+    def resume(self):
+        """Start draining rows left from a previous run (call on startup)."""
+        dead = ApprovalAuditOutbox.dead_letter_count()
+        if dead:
+            logging.error(f"[ApprovalAuditDrainer] {dead} dead-lettered audit actions in approval_audit_outbox need attention")
+        pending = ApprovalAuditOutbox.pending_count()
+        if pending:
+            logging.info(f"[ApprovalAuditDrainer] Resuming delivery of {pending} audit actions")
+            self.notify()
+        return pending or 0
+
+    def _on_commit(self, tables, tags):
+        if ApprovalAuditOutbox.__tablename__ in tables:
+            self.notify()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="approval-audit", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(AUDIT_DRAIN_INTERVAL)
+            self._wakeup.clear()
+            try:
+                with self._app.app_context():
+                    try:
+                        drain_outbox()
+                    finally:
+                        db.session.remove()
+            except Exception:
+                logging.error(f"[ApprovalAuditDrainer] Drain failed:\n{traceback.format_exc()}")
+
+
+approval_audit_drainer = ApprovalAuditDrainer()
@@ -0,0 +1,198 @@
+"""
+Scoping Approval Diff
+
+Structural diff between two versions of a scoping approval: the software and
+hardware lines added, removed or changed, and the cost totals that moved.
+
+The version chain (the approval and every version it was resubmitted from)
+comes from one recursive query on previous_version_id. The scoping_data and
+cost_breakdown blobs of a version never change once it is submitted - only
+its review columns do - so a computed diff is cached by (approval id,
+compared version id) and only the cheap chain query runs on a hit.
+"""
+
+import logging
+
+from sqlalchemy.orm import undefer_group
+
+from ..db_models.scoping_approval import ScopingApproval
+from .cache import get_cache
+from .cost_engine import SERVER_QUOTE_KEY
+
+
+# Diffs of immutable blobs; the TTL only bounds memory use
+APPROVAL_DIFF_TTL = 3600
+
+# (selection key in scoping_data, priced line key in cost_breakdown["server_quote"])
+LINE_KINDS = {
+    "software": ("selected_software", "software"),
+    "hardware": ("selected_hardware", "hardware"),
+}
+
+_diff_cache = get_cache("approval-diff", maxsize=512, ttl=APPROVAL_DIFF_TTL)
+
+
+def priced_lines(cost_breakdown, kind):
+    """
+    {line id: line} of one kind from the server quote in cost_breakdown
+    (names, prices, totals), or None for approvals submitted before the
+    server priced them.
+    """
+    lines = ((cost_breakdown or {}).get(SERVER_QUOTE_KEY) or {}).get(LINE_KINDS[kind][1])
+    if not isinstance(lines, list):
+        return None
+    return {str(line.get("id")): dict(line, id=str(line.get("id"))) for line in lines if isinstance(line, dict)}
+
+
+def selection_lines(scoping_data, kind):
+    """
+    {line id: {"id", "quantity"}} of one kind from the raw selection in
+    scoping_data, whose entries may be bare ids. Only id and quantity are
+    kept: client-sent names and prices are not comparable with a quote.
+    """
+    indexed = {}
+    for entry in (scoping_data or {}).get(LINE_KINDS[kind][0]) or []:
+        if isinstance(entry, dict):
+            line_id = str(entry.get("id"))
+            quantity = entry.get("quantity", entry.get("qty", 1))
+        else:
+            line_id, quantity = str(entry), 1
+        indexed[line_id] = {"id": line_id, "quantity": quantity}
+    return indexed
+
+
+def approval_lines(old, new, kind):
+    """
+    (old lines, new lines) of one kind to compare. Priced lines are used when
+    both versions have them; when either one lacks them both sides fall back
+    to their raw selection, so a priced line is never compared with a
+    client-sent one. `old` may be None (first version).
+    """
+    new_lines = priced_lines(new.cost_breakdown, kind)
+    if old is None:
+        return {}, new_lines if new_lines is not None else selection_lines(new.scoping_data, kind)
+
+    old_lines = priced_lines(old.cost_breakdown, kind)
+    if old_lines is None or new_lines is None:
+        return selection_lines(old.scoping_data, kind), selection_lines(new.scoping_data, kind)
+    return old_lines, new_lines
+
+
+def diff_lines(old, new):
+    """added / removed / changed lines between two {id: line} mappings."""
+    changed = []
+    for line_id in new.keys() & old.keys():
+        old_line, new_line = old[line_id], new[line_id]
+        fields = {
+            field: {"old": old_line.get(field), "new": new_line.get(field)}
+            for field in sorted(old_line.keys() | new_line.keys())
+            if old_line.get(field) != new_line.get(field)
+        }
+        if fields:
+            changed.append({"id": line_id, "name": new_line.get("name", old_line.get("name")), "changes": fields})
+
+    return {
+        "added": [new[line_id] for line_id in new if line_id not in old],
+        "removed": [old[line_id] for line_id in old if line_id not in new],
+        "changed": sorted(changed, key=lambda line: line["id"]),
+        "unchanged": len(new.keys() & old.keys()) - len(changed),
+    }
+
+
+def _scalars(values, prefix=""):
+    return {f"{prefix}{key}": value for key, value in values.items() if not isinstance(value, (dict, list))}
+
+
+def _cost_totals(cost_breakdown):
+    """
+    Scalar totals of a cost_breakdown: the client's figures as is and the
+    server quote's as "server_quote.<key>"; line lists are left out.
+    """
+    cost_breakdown = cost_breakdown or {}
+    totals = _scalars(cost_breakdown)
+    quote = cost_breakdown.get(SERVER_QUOTE_KEY)
+    if isinstance(quote, dict):
+        totals.update(_scalars(quote, prefix=f"{SERVER_QUOTE_KEY}."))
+    return totals
+
+
+def diff_costs(old, new):
+    """Cost totals added, removed or changed (with delta when both are numbers)."""
+    old, new = _cost_totals(old), _cost_totals(new)
+    changed = []
+    for key in sorted(old.keys() & new.keys()):
+        if old[key] == new[key]:
+            continue
+        entry = {"key": key, "old": old[key], "new": new[key]}
+        if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in (old[key], new[key])):
+            entry["delta"] = round(new[key] - old[key], 2)
+        changed.append(entry)
+
+    return {
+        "added": {key: new[key] for key in sorted(new.keys() - old.keys())},
+        "removed": {key: old[key] for key in sorted(old.keys() - new.keys())},
+        "changed": changed,
+    }
+
+
+def diff_versions(old, new):
+    """Diff of two approvals' blobs; `old` may be None (first version: everything added)."""
+    diff = {kind: diff_lines(*approval_lines(old, new, kind)) for kind in LINE_KINDS}
+    diff["costs"] = diff_costs(old.cost_breakdown if old is not None else {}, new.cost_breakdown)
+    return diff
+
+
+def _load_diff(approval_id, against_id):
+    ids = [approval_id] if against_id is None else [approval_id, against_id]
+    approvals = {
+        approval.id: approval
+        for approval in ScopingApproval.query.options(undefer_group("blobs"))
+        .filter(ScopingApproval.id.in_(ids)).all()
+    }
+    if approval_id not in approvals or (against_id is not None and against_id not in approvals):
+        return None
+    logging.info(f"[approval_diff] Computed diff of approval {approval_id} against {against_id}")
+    return diff_versions(approvals.get(against_id), approvals[approval_id])
+
+
+def approval_version_diff(approval_id, against_id=None):
+    """
+    Diff of `approval_id` against its previous version, or against the
+    earlier version `against_id` of the same chain. Returns None when the
+    approval does not exist; raises ValueError when against_id is not an
+    earlier version of it and RuntimeError when the chain cannot be read.
+    """
+    chain = ScopingApproval.get_version_chain(approval_id)
+    if chain is None:
+        raise RuntimeError(f"Could not read the version chain of approval {approval_id}")
+    if not chain:
+        return None
+
+    current = chain[0]
+    if against_id is None:
+        against_id = current.previous_version_id if len(chain) > 1 else None
+    against = next((row for row in chain[1:] if row.id == against_id), None)
+    if against_id is not None and against is None:
+        raise ValueError("against must be an earlier version of this approval")
+
+    diff = _diff_cache.get_or_load(("diff", approval_id, against_id),
+                                   lambda: _load_diff(approval_id, against_id))
+    if diff is None:
+        return None
+
+    return dict(
+        diff,
+        approval_id=str(current.id),
+        version=current.version,
+        against_id=str(against.id) if against is not None else None,
+        against_version=against.version if against is not None else None,
+        chain=[
+            {
+                "id": str(row.id),
+                "version": row.version,
+                "previous_version_id": str(row.previous_version_id) if row.previous_version_id else None,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+            }
+            for row in chain
+        ],
+    )
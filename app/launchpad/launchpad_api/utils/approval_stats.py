@@ -0,0 +1,65 @@
+"""
+Approval Queue Counters
+
+pending / approved / rejected / changes_requested counts per deployment
+engineer and per site, for the ops managers' badges, from one GROUP BY query
+instead of downloading the full approval listing.
+
+Results are cached for APPROVAL_STATS_TTL seconds under the generation
+counter of scoping_approvals (see generations.py): every committed approval
+change - submit, resubmit, approve, reject, delete - bumps it, so the next
+request misses the cache and recounts. With the Redis backend the counter is
+shared, so a state change on one worker is seen by all of them.
+"""
+
+from ..db_models.scoping_approval import ScopingApproval
+from .cache import get_cache
+from .generations import read_generations
+
+
+# Upper bound on staleness when the generation counters are unavailable
+APPROVAL_STATS_TTL = 5
+
+STATUSES = ("pending", "approved", "rejected", "changes_requested")
+
+_stats_cache = get_cache("approval-stats", maxsize=16, ttl=APPROVAL_STATS_TTL)
+
+
+def _empty_counts():
+    return dict.fromkeys(STATUSES + ("total",), 0)
+
+
+def fold_counts(rows):
+    """Totals, per engineer and per site counts from get_status_counts() rows."""
+    totals = _empty_counts()
+    engineers, sites = {}, {}
+
+    for status, engineer_id, engineer_name, site_id, site_name, count in rows:
+        engineer = engineers.setdefault(engineer_id, dict(
+            _empty_counts(), deployment_engineer_id=str(engineer_id), deployment_engineer_name=engineer_name,
+        ))
+        site = sites.setdefault(site_id, dict(_empty_counts(), site_id=str(site_id), site_name=site_name))
+        for counts in (totals, engineer, site):
+            counts[status] = counts.get(status, 0) + count
+            counts["total"] += count
+
+    return {
+        "totals": totals,
+        "by_engineer": sorted(engineers.values(), key=lambda counts: (-counts["pending"], counts["deployment_engineer_name"] or "")),
+        "by_site": sorted(sites.values(), key=lambda counts: (-counts["pending"], counts["site_name"] or "")),
+    }
+
+
+def _load_stats(current):
+    rows = ScopingApproval.get_status_counts(current=current)
+    if rows is None:
+        return None
+    return dict(fold_counts(rows), current=current)
+
+
+def approval_stats(current=False):
+    """Cached approval counters; None when the counting query failed."""
+    generations = read_generations((ScopingApproval.__tablename__,))
+    generation = (generations[0], generations[1][0]) if generations is not None else None
+    return _stats_cache.get_or_load(("stats", bool(current), generation),
+                                    lambda: _load_stats(bool(current)))
@@ -0,0 +1,212 @@
+"""
+Compressed JSON Blob Migration
+
+Rewrites existing rows of the CompressedJSON columns (see
+db_models/compressed_json.py) into their compressed storage format, and
+benchmarks stored size and decode latency before/after.
+
+    cd app/launchpad
+    python -m launchpad_api.utils.blob_migration --benchmark   # report only
+    python -m launchpad_api.utils.blob_migration --dry-run     # count rows to rewrite
+    python -m launchpad_api.utils.blob_migration               # migrate
+
+Rows are walked by primary key in batches, each batch committed on its own,
+so the migration can be interrupted and re-run. The decoded values do not
+change, so updated_at is left alone and no caches need invalidating.
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import time
+
+from sqlalchemy import Integer, LargeBinary, JSON, bindparam, func, select, text
+from sqlalchemy.sql import table, column
+
+from ..db import db
+from ..db_models.compressed_json import encode, decode, is_compressed
+
+
+# (table, column, envelope) of every CompressedJSON column
+BLOB_COLUMNS = (
+    ("scoping_approvals", "scoping_data", False),
+    ("scoping_approvals", "cost_breakdown", False),
+    ("field", "field_value", True),
+)
+
+# Applied before rewriting binary columns that are still JSON on MySQL
+MYSQL_ALTERS = {
+    "scoping_approvals": (
+        "ALTER TABLE scoping_approvals MODIFY scoping_data LONGBLOB NOT NULL",
+        "ALTER TABLE scoping_approvals MODIFY cost_breakdown LONGBLOB NOT NULL",
+    ),
+}
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def _raw_table(table_name, column_name, envelope):
+    """Core view of a column that skips CompressedJSON processing."""
+    return table(table_name, column("id", Integer), column(column_name, JSON() if envelope else LargeBinary()))
+
+
+def _iter_batches(table_name, column_name, envelope, batch_size, limit=None):
+    raw = _raw_table(table_name, column_name, envelope)
+    last_id, seen = 0, 0
+    while limit is None or seen < limit:
+        size = batch_size if limit is None else min(batch_size, limit - seen)
+        rows = db.session.execute(
+            select(raw.c.id, raw.c[column_name])
+            .where(raw.c.id > last_id)
+            .order_by(raw.c.id)
+            .limit(size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+        seen += len(rows)
+
+
+def _needs_rewrite(stored, packed, envelope):
+    if envelope:
+        return is_compressed(packed) and not is_compressed(stored)
+    return stored is not None and bytes(packed) != (stored.encode("utf-8") if isinstance(stored, str) else bytes(stored))
+
+
+def alter_columns():
+    """Switch binary CompressedJSON columns to LONGBLOB (MySQL only)."""
+    if db.engine.dialect.name != "mysql":
+        return []
+    applied = []
+    for table_name, statements in MYSQL_ALTERS.items():
+        types = dict(db.session.execute(text(
+            "SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"
+        ), {"table_name": table_name}).all())
+        for statement in statements:
+            column_name = statement.split()[4]
+            if types.get(column_name, "").lower() != "longblob":
+                db.session.execute(text(statement))
+                applied.append(statement)
+    db.session.commit()
+    return applied
+
+
+def migrate_column(table_name, column_name, envelope, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    Rewrite one column's rows into the current storage format.
+
+    :return: dict with rows scanned and rows (to be) rewritten
+    """
+    raw = _raw_table(table_name, column_name, envelope)
+    stmt = raw.update().where(raw.c.id == bindparam("_id")).values({column_name: bindparam("_value")})
+
+    scanned = rewritten = 0
+    for rows in _iter_batches(table_name, column_name, envelope, batch_size):
+        updates = []
+        for row_id, stored in rows:
+            packed = encode(decode(stored, envelope=envelope), envelope=envelope)
+            if _needs_rewrite(stored, packed, envelope):
+                updates.append({"_id": row_id, "_value": packed})
+        scanned += len(rows)
+        rewritten += len(updates)
+
+        if updates and not dry_run:
+            db.session.execute(stmt, updates)
+            db.session.commit()
+        logging.info(f"[blob_migration] {table_name}.{column_name}: {rewritten}/{scanned} rows rewritten")
+
+    return {"column": f"{table_name}.{column_name}", "scanned": scanned, "rewritten": rewritten}
+
+
+def benchmark_column(table_name, column_name, envelope, sample=1000, repeat=5):
+    """
+    Compare plain JSON with the compressed format on up to `sample` rows.
+
+    Reports total bytes as plain JSON, as currently stored and as compressed,
+    the time to fetch the stored rows, and the mean per-row decode latency
+    of plain JSON vs the compressed format.
+    """
+    raw = _raw_table(table_name, column_name, envelope)
+
+    started = time.perf_counter()
+    rows = [row for batch in _iter_batches(table_name, column_name, envelope, DEFAULT_BATCH_SIZE, limit=sample)
+            for row in batch]
+    fetch_ms = (time.perf_counter() - started) * 1000
+
+    values = [decode(stored, envelope=envelope) for _, stored in rows]
+    plain = [json.dumps(value, separators=(",", ":")) for value in values]
+    packed = [encode(value, envelope=envelope) for value in values]
+
+    def size(stored):
+        if stored is None:
+            return 0
+        if isinstance(stored, (bytes, bytearray, memoryview)):
+            return len(stored)
+        return len(json.dumps(stored, separators=(",", ":")).encode("utf-8"))
+
+    def per_row_us(decoder, items):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for item in items:
+                decoder(item)
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) / max(len(items), 1) * 1e6
+
+    stored_bytes = db.session.execute(select(func.sum(func.length(raw.c[column_name])))).scalar() or 0
+    plain_bytes = sum(len(item.encode("utf-8")) for item in plain)
+    compressed_bytes = sum(size(item) for item in packed)
+
+    return {
+        "column": f"{table_name}.{column_name}",
+        "rows": len(rows),
+        "compressed_rows": sum(1 for item in packed if is_compressed(item)),
+        "plain_bytes": plain_bytes,
+        "compressed_bytes": compressed_bytes,
+        "ratio": round(compressed_bytes / plain_bytes, 3) if plain_bytes else None,
+        "stored_bytes_all_rows": int(stored_bytes),
+        "fetch_ms": round(fetch_ms, 2),
+        "decode_plain_us": round(per_row_us(json.loads, plain), 2),
+        "decode_compressed_us": round(per_row_us(lambda item: decode(item, envelope=envelope), packed), 2),
+    }
+
+
+def _create_app():
+    from flask import Flask
+    from ..main import configure_app
+
+    app = Flask(__name__)
+    configure_app(app)
+    db.init_app(app)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compress existing JSON blob columns")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="count rows to rewrite without writing")
+    parser.add_argument("--benchmark", action="store_true", help="report sizes and decode latency only")
+    parser.add_argument("--sample", type=int, default=1000, help="rows per column for --benchmark")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    with _create_app().app_context():
+        if args.benchmark:
+            for table_name, column_name, envelope in BLOB_COLUMNS:
+                print(json.dumps(benchmark_column(table_name, column_name, envelope, sample=args.sample)))
+            return 0
+
+        if not args.dry_run:
+            for statement in alter_columns():
+                logging.info(f"[blob_migration] Applied: {statement}")
+        for table_name, column_name, envelope in BLOB_COLUMNS:
+            print(json.dumps(migrate_column(table_name, column_name, envelope,
+                                            batch_size=args.batch_size, dry_run=args.dry_run)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,414 @@
+"""
+Cache / key-value store with tag based invalidation.
+
+Two interchangeable backends:
+
+- TTLCache: in-process LRU + TTL (default, one copy per gunicorn worker)
+- RedisCache: shared across workers/instances, selected with
+  CACHE_BACKEND=redis and REDIS_URL=redis://host:6379/0
+
+Use get_cache(name) to obtain a namespace; the backend is picked from the
+environment so callers never depend on it.
+
+Entries are stored with a set of tags (e.g. "site:42", "site-list"). Writers
+never touch cache keys directly: the SQLAlchemy hooks in cache_hooks collect
+the tags affected by a transaction and invalidate them after commit, which
+drops every entry carrying any of those tags.
+
+Each cache also keeps an invalidation epoch. get_or_load() snapshots it before
+running the loader and refuses to store the result if an invalidation happened
+in the meantime, so a slow read racing a commit cannot put stale data back
+into the cache.
+"""
+
+import os
+import pickle
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is in requirements.txt
+    redis = None
+
+
+_MISSING = object()
+
+
+class BaseCache:
+    """Operations shared by every backend; subclasses implement the storage."""
+
+    def __init__(self, name, ttl=30):
+        self.name = name
+        self.ttl = ttl
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0, "errors": 0}
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, tags=(), ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def pop(self, key, default=None):
+        """Atomically remove `key` and return its value; one caller wins."""
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def epoch(self):
+        raise NotImplementedError
+
+    def set_if_epoch(self, key, value, epoch, tags=(), ttl=None):
+        """Store `value` only if no invalidation happened since `epoch`."""
+        raise NotImplementedError
+
+    def get_or_load(self, key, loader, tags=(), ttl=None):
+        """
+        Return the cached value for `key`, calling `loader()` on a miss.
+
+        `tags` may be a callable taking the loaded value, for entries whose
+        tags depend on the result (e.g. one tag per site in a listing).
+        Loader results of None are treated as failures and not cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        epoch = self.epoch()
+
+        value = loader()
+        if value is None:
+            return value
+
+        entry_tags = tags(value) if callable(tags) else tags
+        self.set_if_epoch(key, value, epoch, tags=entry_tags, ttl=ttl)
+        return value
+
+    def stats(self):
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return dict(
+            self._stats,
+            name=self.name,
+            backend=type(self).__name__,
+            ttl=self.ttl,
+            hit_ratio=round(self._stats["hits"] / lookups, 4) if lookups else None,
+        )
+
+
+class TTLCache(BaseCache):
+    """Thread-safe in-process LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, name, maxsize=256, ttl=30):
+        super().__init__(name, ttl)
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (value, expires_at, tags)
+        self._tag_keys = {}            # tag -> set(keys)
+        self._epoch = 0                # bumped on every invalidation
+        self._lock = threading.RLock()
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return default
+
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key, value, tags=(), ttl=None):
+        tags = frozenset(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._entries[key] = (value, expires_at, tags)
+            for tag in tags:
+                self._tag_keys.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                return default
+            self._remove(key)
+            return value
+
+    def epoch(self):
+        with self._lock:
+            return self._epoch
+
+    def set_if_epoch(self, key, value, epoch, tags=(), ttl=None):
+        with self._lock:
+            if self._epoch == epoch:
+                self.set(key, value, tags=tags, ttl=ttl)
+
+    def invalidate_tags(self, tags):
+        """Drop every entry carrying any of `tags`. Returns the number dropped."""
+        dropped = 0
+        with self._lock:
+            self._epoch += 1
+            for tag in tags:
+                for key in list(self._tag_keys.get(tag, ())):
+                    if key in self._entries:
+                        self._remove(key)
+                        dropped += 1
+            self._stats["invalidations"] += dropped
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._tag_keys.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(super().stats(), size=len(self._entries), maxsize=self.maxsize)
+
+
+class RedisCache(BaseCache):
+    """
+    Redis backed cache shared by every worker.
+
+    Values are pickled under "<prefix>:<name>:<key>"; each tag is a Redis set
+    of the keys carrying it. Redis errors are logged and treated as misses so
+    an unavailable Redis degrades to uncached reads instead of failing requests.
+    """
+
+    def __init__(self, name, client, ttl=30, prefix="launchpad"):
+        super().__init__(name, ttl)
+        self.client = client
+        self.prefix = f"{prefix}:{name}"
+        self._epoch_key = f"{self.prefix}:__epoch__"
+
+    def _key(self, key):
+        return f"{self.prefix}:{key!r}"
+
+    def _tag_key(self, tag):
+        return f"{self.prefix}:__tag__:{tag}"
+
+    def _error(self, operation, error):
+        self._stats["errors"] += 1
+        logging.warning(f"[RedisCache.{operation}] {self.name}: {error}")
+
+    def get(self, key, default=None):
+        try:
+            raw = self.client.get(self._key(key))
+        except redis.RedisError as error:
+            self._error("get", error)
+            return default
+
+        if raw is None:
+            self._stats["misses"] += 1
+            return default
+        self._stats["hits"] += 1
+        return pickle.loads(raw)
+
+    def _write(self, pipe, key, value, tags, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        redis_key = self._key(key)
+        pipe.set(redis_key, pickle.dumps(value), ex=ttl)
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            pipe.sadd(tag_key, redis_key)
+            # Tag sets only need to outlive the entries they point at
+            pipe.expire(tag_key, ttl + 60)
+
+    def set(self, key, value, tags=(), ttl=None):
+        try:
+            pipe = self.client.pipeline()
+            self._write(pipe, key, value, tags, ttl)
+            pipe.execute()
+        except redis.RedisError as error:
+            self._error("set", error)
+
+    def delete(self, key):
+        try:
+            self.client.delete(self._key(key))
+        except redis.RedisError as error:
+            self._error("delete", error)
+
+    def pop(self, key, default=None):
+        try:
+            # GET + DEL in one MULTI/EXEC (GETDEL needs Redis >= 6.2)
+            pipe = self.client.pipeline(transaction=True)
+            pipe.get(self._key(key))
+            pipe.delete(self._key(key))
+            raw, _ = pipe.execute()
+        except redis.RedisError as error:
+            self._error("pop", error)
+            return default
+
+        if raw is None:
+            self._stats["misses"] += 1
+            return default
+        self._stats["hits"] += 1
+        return pickle.loads(raw)
+
+    def epoch(self):
+        try:
+            return int(self.client.get(self._epoch_key) or 0)
+        except redis.RedisError as error:
+            self._error("epoch", error)
+            return None
+
+    def set_if_epoch(self, key, value, epoch, tags=(), ttl=None):
+        if epoch is None:
+            return
+        try:
+            with self.client.pipeline() as pipe:
+                pipe.watch(self._epoch_key)
+                if int(pipe.get(self._epoch_key) or 0) != epoch:
+                    pipe.unwatch()
+                    return
+                pipe.multi()
+                self._write(pipe, key, value, tags, ttl)
+                pipe.execute()
+        except redis.WatchError:
+            # Invalidated while we were writing; leave it uncached
+            return
+        except redis.RedisError as error:
+            self._error("set_if_epoch", error)
+
+    def invalidate_tags(self, tags):
+        try:
+            self.client.incr(self._epoch_key)
+            tag_keys = [self._tag_key(tag) for tag in tags]
+            pipe = self.client.pipeline()
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = set()
+            for keys in pipe.execute():
+                members.update(keys)
+
+            dropped = self.client.delete(*members) if members else 0
+            self.client.delete(*tag_keys)
+            self._stats["invalidations"] += dropped
+            return dropped
+        except redis.RedisError as error:
+            self._error("invalidate_tags", error)
+            return 0
+
+    def clear(self):
+        try:
+            self.client.incr(self._epoch_key)
+            keys = [key for key in self.client.scan_iter(match=f"{self.prefix}:*")
+                    if key != self._epoch_key.encode()]
+            if keys:
+                self.client.delete(*keys)
+        except redis.RedisError as error:
+            self._error("clear", error)
+
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+_caches = {}
+_redis_client = None
+_lock = threading.Lock()
+
+
+def get_redis_client():
+    global _redis_client
+    if _redis_client is None:
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis but the redis package is not installed")
+        _redis_client = redis.Redis.from_url(REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+    return _redis_client
+
+
+def get_cache(name, maxsize=256, ttl=30):
+    """
+    Return the cache namespace `name`, creating it with the configured backend
+    on first use. maxsize only applies to the in-memory backend (Redis relies
+    on its own maxmemory policy).
+    """
+    with _lock:
+        cache = _caches.get(name)
+        if cache is None:
+            if CACHE_BACKEND == "redis":
+                cache = RedisCache(name, get_redis_client(), ttl=ttl)
+            else:
+                cache = TTLCache(name, maxsize=maxsize, ttl=ttl)
+            _caches[name] = cache
+        return cache
+
+
+def all_cache_stats():
+    return [cache.stats() for cache in list(_caches.values())]
+
+
+def invalidate_tags(tags):
+    """Invalidate `tags` in every registered cache."""
+    tags = list(tags)
+    if not tags:
+        return 0
+    return sum(cache.invalidate_tags(tags) for cache in list(_caches.values()))
+
+
+def site_tag(site_id):
+    return f"site:{site_id}"
+
+
+def user_tag(user_id):
+    return f"user:{user_id}"
+
+
+# Tag carried by every principal entry; invalidated by bulk user updates
+USER_ANY_TAG = "user-any"
+# Tag carried by every site cache entry; invalidated when a change cannot be
+# attributed to a specific site
+SITE_ANY_TAG = "site-any"
+# Tag carried by every listing entry; invalidated when sites are added/removed
+SITE_LIST_TAG = "site-list"
+# Tag carried by filtered/paginated listings, whose membership can change
+# when any site's summary changes
+SITE_LIST_PARTIAL_TAG = "site-list-partial"
+
+
+# Site listing / site detail reads. Short TTL as a safety net for writes that
+# bypass the ORM (raw SQL, other processes); commits through the ORM
+# invalidate immediately.
+site_cache = get_cache(
+    "site",
+    maxsize=int(os.getenv("SITE_CACHE_MAXSIZE", "512")),
+    ttl=int(os.getenv("SITE_CACHE_TTL", "30")),
+)
@@ -0,0 +1,184 @@
+"""
+SQLAlchemy session hooks that keep the caches and generation counters coherent.
+
+after_flush collects the cache tags touched by the flushed Site / Page /
+Section / Field / SiteSummary / User rows, and the names of every table
+written, into session.info; after_commit invalidates the tags and bumps the
+table generations, after_rollback throws both away. Bulk query.update() /
+query.delete() are caught by do_orm_execute. Writes that go around the ORM
+(text() SQL, bulk_insert_mappings) should call record_change() themselves.
+
+Other in-process derived data (e.g. the site search index) can subscribe with
+on_commit() to be told which tables and tags every commit touched.
+"""
+
+import logging
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from ..db_models.site import Site
+from ..db_models.page import Page
+from ..db_models.section import Section
+from ..db_models.fields import Field
+from ..db_models.site_summary import SiteSummary
+from ..db_models.user import User
+from .generations import bump_generations
+from .cache import (invalidate_tags, site_tag, user_tag, SITE_ANY_TAG, SITE_LIST_TAG,
+                    SITE_LIST_PARTIAL_TAG, USER_ANY_TAG)
+
+
+_PENDING_KEY = "cache_invalidation_tags"
+_TABLES_KEY = "changed_tables"
+_SITE_TRACKED = (Site, Page, Section, Field, SiteSummary)
+_TRACKED = _SITE_TRACKED + (User,)
+_commit_listeners = []
+
+
+def _pending(session):
+    return session.info.setdefault(_PENDING_KEY, set())
+
+
+def _changed_tables(session):
+    return session.info.setdefault(_TABLES_KEY, set())
+
+
+def _table_name(obj):
+    table = getattr(type(obj), "__table__", None)
+    return table.name if table is not None else None
+
+
+def _loaded(session, model, pk):
+    if pk is None:
+        return None
+    return session.identity_map.get(identity_key(model, pk))
+
+
+def _resolve_site_id(session, obj):
+    """Site id owning `obj`, using only rows already in the session."""
+    if isinstance(obj, Site):
+        return obj.id
+    if isinstance(obj, SiteSummary):
+        return obj.site_id
+    if isinstance(obj, Field):
+        obj = _loaded(session, Section, obj.section_id)
+        if obj is None:
+            return None
+    if isinstance(obj, Section):
+        obj = _loaded(session, Page, obj.page_id)
+        if obj is None:
+            return None
+    if isinstance(obj, Page):
+        return obj.site_id
+    return None
+
+
+def _tags_for(session, obj, operation):
+    if isinstance(obj, User):
+        return {user_tag(obj.id)}
+
+    site_id = _resolve_site_id(session, obj)
+    if site_id is None:
+        # Could not map the row to a site without a query; drop everything
+        return {SITE_ANY_TAG}
+
+    tags = {site_tag(site_id)}
+    if isinstance(obj, (Site, SiteSummary)) and operation in ("insert", "delete"):
+        # Listing membership changed
+        tags.add(SITE_LIST_TAG)
+    elif isinstance(obj, SiteSummary):
+        # Filtered/paginated listings may gain or lose this site
+        tags.add(SITE_LIST_PARTIAL_TAG)
+    return tags
+
+
+def record_change(session, site_ids=None, tables=()):
+    """
+    Register a change made outside the ORM unit of work (raw SQL, bulk
+    mappings) so its cache tags are invalidated and the generations of
+    `tables` bumped when `session` commits. Without site_ids every site cache
+    entry is invalidated.
+    """
+    _changed_tables(session).update(tables)
+    tags = _pending(session)
+    if site_ids is None:
+        tags.add(SITE_ANY_TAG)
+    else:
+        tags.update(site_tag(site_id) for site_id in site_ids)
+        tags.update((SITE_LIST_TAG, SITE_LIST_PARTIAL_TAG))
+
+
+def on_commit(listener):
+    """
+    Call listener(tables, tags) after every commit that changed something,
+    once the caches have been invalidated. Listeners must be cheap; errors are
+    logged and ignored.
+    """
+    if listener not in _commit_listeners:
+        _commit_listeners.append(listener)
+
+
+def _after_flush(session, flush_context):
+    tags = _pending(session)
+    tables = _changed_tables(session)
+    for operation, objects in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            if operation == "update" and not session.is_modified(obj, include_collections=False):
+                continue
+            tables.add(_table_name(obj))
+            if isinstance(obj, _TRACKED):
+                tags.update(_tags_for(session, obj, operation))
+    tables.discard(None)
+
+
+def _do_orm_execute(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    _changed_tables(orm_execute_state.session).add(mapper.local_table.name)
+    if issubclass(mapper.class_, _SITE_TRACKED):
+        _pending(orm_execute_state.session).add(SITE_ANY_TAG)
+    elif issubclass(mapper.class_, User):
+        _pending(orm_execute_state.session).add(USER_ANY_TAG)
+
+
+def _after_commit(session):
+    tags = session.info.pop(_PENDING_KEY, None)
+    tables = session.info.pop(_TABLES_KEY, None)
+    try:
+        if tables:
+            bump_generations(tables)
+        if tags:
+            invalidate_tags(tags)
+    except Exception as error:
+        logging.warning(f"[cache_hooks] Cache invalidation failed: {error}")
+
+    if not (tables or tags):
+        return
+    for listener in list(_commit_listeners):
+        try:
+            listener(tables or set(), tags or set())
+        except Exception as error:
+            logging.warning(f"[cache_hooks] Commit listener {listener} failed: {error}")
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_TABLES_KEY, None)
+
+
+_LISTENERS = (
+    ("after_flush", _after_flush),
+    ("do_orm_execute", _do_orm_execute),
+    ("after_commit", _after_commit),
+    ("after_rollback", _after_rollback),
+)
+
+
+def register_cache_hooks():
+    """Attach the listeners to every Session (idempotent)."""
+    for name, listener in _LISTENERS:
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
@@ -0,0 +1,211 @@
+"""
+Platform Catalog Snapshot
+
+The platform catalog (software/hardware categories, software modules,
+hardware items, recommendation rules) is read on every scoping screen but
+changes rarely. Instead of querying and serializing it row by row per
+request, the GET handlers serve it from a CatalogSnapshot: an immutable copy
+of all five collections built with one query each, where every row is
+already encoded to JSON. A filtered listing is a scan over the pre-encoded
+rows and one bytes join; no query and no to_dict() runs per request.
+
+A snapshot is identified by its version, the sum of the generation counters
+of the five catalog tables (see generations.py). Every committed platform
+POST / PUT / DELETE / archive writes one of those tables and so bumps the
+version; the next request builds a fresh snapshot. The ETag of a response is
+derived from the version it was built from. With the Redis backend the
+counters are shared, so every worker sees catalog edits made by the others.
+
+Built snapshots are stored in get_cache("catalog") keyed by their version, so
+with CACHE_BACKEND=redis a version is built by one worker and loaded by the
+rest instead of each worker re-reading the five tables. Each worker also keeps
+the last snapshot it used and answers from it while the version is unchanged,
+without touching the cache.
+"""
+
+import json
+import logging
+import threading
+import time
+from types import MappingProxyType
+
+from flask import Response
+
+from ..db_models.software_category import SoftwareCategory
+from ..db_models.software_module import SoftwareModule
+from ..db_models.hardware_category import HardwareCategory
+from ..db_models.hardware_item import HardwareItem
+from ..db_models.recommendation_rule import RecommendationRule
+from .cache import get_cache
+from .conditional import conditional_version
+from .generations import read_generations
+
+
+# Collection name -> (model, filter column of ?category_ids=, row ordering)
+COLLECTIONS = {
+    "software_categories": (SoftwareCategory, None, (SoftwareCategory.id,)),
+    "hardware_categories": (HardwareCategory, None, (HardwareCategory.id,)),
+    "software_modules": (SoftwareModule, "category_id", (SoftwareModule.id,)),
+    "hardware_items": (HardwareItem, "category_id", (HardwareItem.id,)),
+    # Same order as RecommendationRule.get_all()
+    "recommendation_rules": (RecommendationRule, "software_category_id", (
+        RecommendationRule.software_category_id,
+        RecommendationRule.is_mandatory.desc(),
+        RecommendationRule.hardware_category_id,
+    )),
+}
+
+CATALOG_TABLES = tuple(model.__tablename__ for model, _, _ in COLLECTIONS.values())
+
+# Rebuild at least this often when the generation counters are unavailable
+CATALOG_SNAPSHOT_TTL = 60
+# Lifetime of a versioned snapshot in the shared cache; superseded versions
+# are never read again and just expire
+CATALOG_CACHE_TTL = 3600
+
+
+def _encode(value):
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+class CatalogEntry:
+    """One pre-encoded catalog row and the columns it can be filtered on."""
+
+    __slots__ = ("json", "is_active", "category_id")
+
+    def __init__(self, row, category_column):
+        self.json = _encode(row.to_dict())
+        self.is_active = getattr(row, "is_active", True)
+        self.category_id = getattr(row, category_column) if category_column else None
+
+
+class CatalogSnapshot:
+    """Immutable, pre-serialized copy of the whole platform catalog."""
+
+    def __init__(self, generation=None):
+        self.generation = generation
+        self.version = sum(generation[1]) if generation is not None else 0
+        self.built_at = time.time()
+
+        collections = {}
+        # Categories first: the modules' and items' to_dict() then resolve
+        # their category from the session identity map instead of querying.
+        # The identity map is weak, so the loaded rows are kept until done.
+        loaded = []
+        for name, (model, category_column, ordering) in COLLECTIONS.items():
+            rows = model.query.order_by(*ordering).all()
+            loaded.append(rows)
+            collections[name] = tuple(CatalogEntry(row, category_column) for row in rows)
+        self.collections = MappingProxyType(collections)
+        self._catalog_body = self._body(
+            "Successfully fetched the platform catalog",
+            {name: list(entries) for name, entries in collections.items()},
+        )
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["collections"] = dict(self.collections)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.collections = MappingProxyType(self.collections)
+
+    @property
+    def etag_version(self):
+        token = self.generation[0] if self.generation is not None else f"built-{self.built_at}"
+        return f"catalog|{token}|{self.version}"
+
+    @property
+    def modified(self):
+        return self.generation[2] if self.generation is not None else self.built_at
+
+    def select(self, name, active_only=None, category_ids=None):
+        """Entries of one collection, filtered like the model get_all() methods."""
+        entries = self.collections[name]
+        if active_only:
+            entries = [entry for entry in entries if entry.is_active]
+        if category_ids:
+            wanted = set(category_ids)
+            entries = [entry for entry in entries if entry.category_id in wanted]
+        return entries
+
+    def _body(self, message, data):
+        if isinstance(data, dict):
+            encoded = b"{" + b",".join(
+                _encode(name) + b":[" + b",".join(entry.json for entry in entries) + b"]"
+                for name, entries in data.items()
+            ) + b"}"
+        else:
+            encoded = b"[" + b",".join(entry.json for entry in data) + b"]"
+        return (b'{"message":' + _encode(message) + b',"version":' + _encode(self.version)
+                + b',"data":' + encoded + b"}")
+
+    def conditional(self):
+        """(not_modified_response, headers) for the current request, see conditional_get()."""
+        return conditional_version(self.etag_version, self.modified)
+
+    def response(self, name, message, active_only=None, category_ids=None):
+        """JSON Response with the filtered collection `name`."""
+        body = self._body(message, self.select(name, active_only=active_only, category_ids=category_ids))
+        return Response(body, mimetype="application/json")
+
+    def catalog_response(self, active_only=None):
+        """JSON Response with all five collections."""
+        if not active_only:
+            body = self._catalog_body
+        else:
+            body = self._body("Successfully fetched the platform catalog", {
+                name: self.select(name, active_only=True) for name in self.collections
+            })
+        return Response(body, mimetype="application/json")
+
+
+catalog_cache = get_cache("catalog", maxsize=4, ttl=CATALOG_CACHE_TTL)
+
+_snapshot = None  # last snapshot this worker answered from
+_snapshot_lock = threading.Lock()
+
+
+def _catalog_generation():
+    generations = read_generations(CATALOG_TABLES)
+    if generations is None:
+        return None
+    token, counters, modified = generations
+    return (token, tuple(counters), modified)
+
+
+def _build_snapshot(generation):
+    snapshot = CatalogSnapshot(generation)
+    logging.info(f"[catalog_snapshot] Built catalog snapshot version {snapshot.version}: " + ", ".join(
+        f"{len(entries)} {name}" for name, entries in snapshot.collections.items()))
+    return snapshot
+
+
+def get_catalog_snapshot():
+    """The current CatalogSnapshot, rebuilt when a catalog table changed."""
+    global _snapshot
+    generation = _catalog_generation()
+    snapshot = _snapshot
+    if snapshot is not None and generation is not None and snapshot.generation[:2] == generation[:2]:
+        return snapshot
+    if snapshot is not None and generation is None and time.time() - snapshot.built_at < CATALOG_SNAPSHOT_TTL:
+        return snapshot
+
+    with _snapshot_lock:
+        if _snapshot is not None and _snapshot is not snapshot:
+            return _snapshot
+        if generation is None:
+            _snapshot = _build_snapshot(None)
+        else:
+            key = ("snapshot", generation[0], generation[1])
+            _snapshot = catalog_cache.get_or_load(key, lambda: _build_snapshot(generation))
+        return _snapshot
+
+
+def reset_catalog_snapshot():
+    """Drop the cached snapshot (tests, manual catalog imports)."""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
+        catalog_cache.clear()
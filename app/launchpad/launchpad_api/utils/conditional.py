@@ -0,0 +1,109 @@
+"""
+Conditional GET support (ETag / Last-Modified / 304).
+
+Controllers call conditional_get() with the tables their response is built
+from, before running any query:
+
+    not_modified, headers = conditional_get(("site_summary",))
+    if not_modified:
+        return not_modified
+    ...
+    return jsonify(payload), 200, headers
+
+The validator is derived from the per-table generation counters plus the
+request path and query string, so it changes whenever a committed write
+touches one of the tables. Responses that depend on who is asking pass a
+`variant` that includes the principal.
+
+Validators are only issued when the counters are shared by every process
+(see generations_shared()); with per-process counters another worker's write
+would go unnoticed, so every request gets a full 200 response instead.
+"""
+
+import hashlib
+import logging
+import time
+from datetime import datetime, timezone
+
+from flask import request, Response
+from werkzeug.http import http_date
+
+from .generations import read_generations, generations_shared
+
+
+def _etag_matches(etag, header):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: ignore W/ prefixes on both sides
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def conditional_get(tables, variant=None):
+    """
+    Compute validators for a response built from `tables`.
+
+    Returns (not_modified_response, headers). not_modified_response is a 304
+    Response when the client's If-None-Match / If-Modified-Since still
+    matches, otherwise None and the caller should build the full response and
+    attach `headers`. On any failure both are empty so the endpoint simply
+    behaves unconditionally.
+    """
+    try:
+        generations = read_generations(tables)
+        if generations is None:
+            return None, {}
+
+        token, counters, modified = generations
+        return conditional_version(f"{token}|{','.join(tables)}|{','.join(map(str, counters))}", modified, variant)
+    except Exception as error:
+        logging.warning(f"[conditional_get] Skipping validators for {tables}: {error}")
+        return None, {}
+
+
+def conditional_version(version, modified, variant=None):
+    """
+    Same as conditional_get() for a response whose content is identified by
+    `version` (any string) and last changed at `modified` (epoch seconds),
+    e.g. an in-memory snapshot that carries its own version.
+    """
+    try:
+        if not generations_shared():
+            return None, {}
+        if variant is None:
+            variant = request.full_path
+        raw = f"{version}|{variant}"
+        etag = 'W/"%s"' % hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+        last_modified = datetime.fromtimestamp(int(modified), tz=timezone.utc)
+
+        headers = {
+            "ETag": etag,
+            "Last-Modified": http_date(last_modified),
+            "Cache-Control": "private, no-cache",
+        }
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            # If-None-Match takes precedence over If-Modified-Since (RFC 7232)
+            not_modified = _etag_matches(etag, if_none_match)
+        else:
+            # Last-Modified has one second resolution; don't trust it for
+            # writes within the current second
+            since = request.if_modified_since
+            not_modified = (since is not None and last_modified <= since
+                            and time.time() - modified >= 1)
+
+        if not_modified:
+            return Response(status=304, headers=headers), headers
+        return None, headers
+    except Exception as error:
+        logging.warning(f"[conditional_version] Skipping validators for {version}: {error}")
+        return None, {}
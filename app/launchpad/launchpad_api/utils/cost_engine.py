@@ -0,0 +1,242 @@
+"""
+Scoping Cost Engine
+
+Prices scoping selections on the server so reviewers do not have to trust
+the client's cost_summary alone; the quote is stored under "server_quote" in
+the approval's cost_breakdown, next to the client's figures. The catalog prices are loaded once into a PriceIndex: per
+catalog (software modules, hardware items) a set of flat arrays indexed
+directly by row id - integer cents for every price column plus a state byte
+(missing / active / archived). Quoting a selection is then a C-level gather
+of the selected slots (operator.itemgetter) and one sum of products per
+price column; no query runs per line.
+
+The index is tied to the generation counters of the catalog tables (see
+generations.py): any committed write to software_modules or hardware_items
+bumps them, and the next quote rebuilds the index. With the Redis backend the
+counters are shared, so every worker sees catalog edits made by the others.
+"""
+
+import logging
+import threading
+import time
+from array import array
+from decimal import Decimal, ROUND_HALF_UP
+from operator import itemgetter, mul
+
+from ..db import db
+from ..db_models.software_module import SoftwareModule
+from ..db_models.hardware_item import HardwareItem
+from .generations import read_generations
+
+
+CATALOG_TABLES = (SoftwareModule.__tablename__, HardwareItem.__tablename__)
+
+# Rebuild at least this often when the generation counters are unavailable
+PRICE_INDEX_TTL = 60
+
+# Values of the state arrays
+MISSING, ACTIVE, ARCHIVED = 0, 1, 2
+
+MAX_QUANTITY = 10000
+
+# Key of the server quote inside a stored cost_breakdown, next to the
+# client's cost_summary figures
+SERVER_QUOTE_KEY = "server_quote"
+
+
+class CostError(ValueError):
+    """A selection cannot be priced; `invalid` lists the offending entries."""
+
+    def __init__(self, message, invalid=None):
+        super().__init__(message)
+        self.invalid = invalid or []
+
+
+def to_cents(value):
+    """Numeric/float price -> integer cents (NULL prices count as 0)."""
+    if value is None:
+        return 0
+    return int(Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) * 100)
+
+
+def from_cents(cents):
+    return round(cents / 100, 2)
+
+
+class CatalogPrices:
+    """Dense, id-indexed price arrays for one catalog table."""
+
+    __slots__ = ("kind", "columns", "names", "state", "prices")
+
+    def __init__(self, kind, rows, columns):
+        """
+        :param rows: (id, name, is_active, price per column...) tuples
+        :param columns: names of the price columns, in row order
+        """
+        self.kind = kind
+        self.columns = columns
+        size = max((row[0] for row in rows), default=0) + 1
+        self.names = [None] * size
+        self.state = array("b", bytes(size))
+        self.prices = {column: array("q", bytes(8 * size)) for column in columns}
+
+        for row in rows:
+            item_id, name, is_active = row[0], row[1], row[2]
+            self.names[item_id] = name
+            self.state[item_id] = ACTIVE if is_active else ARCHIVED
+            for column, value in zip(columns, row[3:]):
+                self.prices[column][item_id] = to_cents(value)
+
+    def __len__(self):
+        return sum(1 for state in self.state if state != MISSING)
+
+    def parse(self, selection):
+        """
+        Validate a selected_software/selected_hardware list and return
+        (ids, quantities). Entries are {"id": ..., "quantity": ...} objects
+        (quantity defaults to 1) or bare ids. Raises CostError listing every
+        unknown, archived or malformed entry.
+        """
+        if selection is None:
+            return [], []
+        if not isinstance(selection, list):
+            raise CostError(f"selected_{self.kind} must be an array")
+
+        ids, quantities, invalid = [], [], []
+        size = len(self.state)
+        for entry in selection:
+            raw_id, quantity = (entry.get("id"), entry.get("quantity", 1)) if isinstance(entry, dict) else (entry, 1)
+            try:
+                item_id = int(raw_id)
+                quantity = int(quantity)
+            except (TypeError, ValueError):
+                invalid.append({"id": raw_id, "reason": "malformed"})
+                continue
+            if not 0 < quantity <= MAX_QUANTITY:
+                invalid.append({"id": raw_id, "reason": "invalid quantity"})
+            elif not 0 < item_id < size or self.state[item_id] == MISSING:
+                invalid.append({"id": raw_id, "reason": "not found"})
+            elif self.state[item_id] == ARCHIVED:
+                invalid.append({"id": raw_id, "reason": "archived"})
+            else:
+                ids.append(item_id)
+                quantities.append(quantity)
+
+        if invalid:
+            raise CostError(f"Invalid selected_{self.kind} entries", invalid)
+        return ids, quantities
+
+    def gather(self, ids, column):
+        """Prices (cents) of `ids` for one column, as a tuple."""
+        if not ids:
+            return ()
+        values = itemgetter(*ids)(self.prices[column])
+        return values if len(ids) > 1 else (values,)
+
+    def quote(self, ids, quantities):
+        """(line items, {column: total cents}) for validated ids/quantities."""
+        unit = {column: self.gather(ids, column) for column in self.columns}
+        line_totals = {column: list(map(mul, unit[column], quantities)) for column in self.columns}
+        totals = {column: sum(line_totals[column]) for column in self.columns}
+
+        lines = []
+        for position, item_id in enumerate(ids):
+            line = {"id": str(item_id), "name": self.names[item_id], "quantity": quantities[position]}
+            for column in self.columns:
+                line[column] = from_cents(unit[column][position])
+                line[f"{column}_total"] = from_cents(line_totals[column][position])
+            lines.append(line)
+        return lines, totals
+
+
+class PriceIndex:
+    """Prices of the whole catalog, built from two queries."""
+
+    def __init__(self, generation=None):
+        self.generation = generation
+        self.built_at = time.time()
+        self.software = CatalogPrices("software", db.session.query(
+            SoftwareModule.id, SoftwareModule.name, SoftwareModule.is_active, SoftwareModule.license_fee,
+        ).all(), ("license_fee",))
+        self.hardware = CatalogPrices("hardware", db.session.query(
+            HardwareItem.id, HardwareItem.name, HardwareItem.is_active,
+            HardwareItem.unit_cost, HardwareItem.support_cost,
+        ).all(), ("unit_cost", "support_cost"))
+
+    def quote(self, selected_software, selected_hardware):
+        """
+        Authoritative cost breakdown of a scoping selection; raises CostError.
+
+        softwareCost / hardwareCost / supportCost are the summed line totals,
+        totalCapex = softwareCost + hardwareCost and totalInvestment adds the
+        support costs.
+        """
+        invalid = []
+        parsed = {}
+        for catalog, selection in ((self.software, selected_software), (self.hardware, selected_hardware)):
+            try:
+                parsed[catalog.kind] = catalog.parse(selection)
+            except CostError as error:
+                if not error.invalid:
+                    raise
+                invalid.extend(dict(entry, type=catalog.kind) for entry in error.invalid)
+        if invalid:
+            raise CostError("Some selected items are unknown or archived", invalid)
+
+        software_lines, software_totals = self.software.quote(*parsed["software"])
+        hardware_lines, hardware_totals = self.hardware.quote(*parsed["hardware"])
+
+        software_cost = software_totals["license_fee"]
+        hardware_cost = hardware_totals["unit_cost"]
+        support_cost = hardware_totals["support_cost"]
+        return {
+            "software": software_lines,
+            "hardware": hardware_lines,
+            "softwareCost": from_cents(software_cost),
+            "hardwareCost": from_cents(hardware_cost),
+            "supportCost": from_cents(support_cost),
+            "totalCapex": from_cents(software_cost + hardware_cost),
+            "totalInvestment": from_cents(software_cost + hardware_cost + support_cost),
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _catalog_generation():
+    generations = read_generations(CATALOG_TABLES)
+    if generations is None:
+        return None
+    token, counters, _ = generations
+    return (token, tuple(counters))
+
+
+def get_price_index():
+    """The current PriceIndex, rebuilt when the catalog tables changed."""
+    global _index
+    generation = _catalog_generation()
+    index = _index
+    if index is not None and generation is not None and index.generation == generation:
+        return index
+    if index is not None and generation is None and time.time() - index.built_at < PRICE_INDEX_TTL:
+        return index
+
+    with _index_lock:
+        if _index is None or _index is index:
+            _index = PriceIndex(generation)
+            logging.info(f"[cost_engine] Built price index: {len(_index.software)} software modules, "
+                         f"{len(_index.hardware)} hardware items")
+        return _index
+
+
+def quote_selection(selected_software, selected_hardware):
+    """Cost breakdown of a scoping selection from the cached price index; raises CostError."""
+    return get_price_index().quote(selected_software, selected_hardware)
+
+
+def reset_price_index():
+    """Drop the cached index (tests, manual catalog imports)."""
+    global _index
+    with _index_lock:
+        _index = None
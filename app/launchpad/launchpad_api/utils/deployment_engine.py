@@ -0,0 +1,252 @@
+"""
+Deployment Step Engine
+
+Deployment checklists are DeploymentTemplate rows; a site uses the template
+in site.deployment_template_id, or the default template when unset. Before
+use a template is compiled once into a CompiledTemplate (step id -> position
+index, per-step completion requirements) that is cached per template
+version, so editing a template simply makes the next request compile the new
+version.
+
+CompiledTemplate.evaluate() validates a submitted step list, checks the step
+order, and computes progress, completion and the current step in a single
+pass over the steps.
+"""
+
+import logging
+import threading
+from collections import namedtuple
+
+from ..db import db
+from ..db_models.site import Site
+from ..db_models.deployment_template import DeploymentTemplate
+from .deployment_utils import DEFAULT_DEPLOYMENT_STEPS, VALID_STATUSES
+
+
+DEFAULT_TEMPLATE_NAME = "Standard deployment"
+
+# Keys a step of the built-in checklist must carry once completed
+DEFAULT_STEP_REQUIREMENTS = {"hardware_delivery": ["deliveryReceipt"]}
+
+StepEvaluation = namedtuple("StepEvaluation", ["valid", "error", "progress", "completed", "current_step"])
+
+# A checklist whose steps were all removed: no progress and no current step
+EMPTY_CHECKLIST = StepEvaluation(True, None, None, False, None)
+
+
+class TemplateError(ValueError):
+    """A template's step definitions are invalid."""
+
+
+def _check_hours(step, key):
+    """Error message if step[key] is not a non-negative number."""
+    try:
+        if float(step[key]) < 0:
+            return f"{key} must be a positive number"
+    except (ValueError, TypeError):
+        return f"{key} must be a valid number"
+    return None
+
+
+class CompiledTemplate:
+    """Immutable, indexed form of a template's step definitions."""
+
+    __slots__ = ("template_id", "version", "name", "steps", "index", "requires")
+
+    def __init__(self, template_id, version, name, steps):
+        self.template_id = template_id
+        self.version = version
+        self.name = name
+        self.steps = tuple(steps)
+        self.index = {step["id"]: position for position, step in enumerate(self.steps)}
+        self.requires = tuple(tuple(step.get("requires") or ()) for step in self.steps)
+
+    def default_steps(self):
+        """Fresh, all-pending step list for a new deployment checklist."""
+        return [
+            {"id": step["id"], "name": step["name"], "status": "pending", "estimatedHours": step["estimatedHours"]}
+            for step in self.steps
+        ]
+
+    def _check_step(self, step, position):
+        """Validation error for one submitted step, or None."""
+        if not isinstance(step, dict):
+            return "Each step must be an object"
+        for key in ("id", "name", "status", "estimatedHours"):
+            if key not in step:
+                return f"Step missing required field: {key}"
+        if step["status"] not in VALID_STATUSES:
+            return f"Invalid status '{step['status']}'. Must be one of: {', '.join(VALID_STATUSES)}"
+
+        error = _check_hours(step, "estimatedHours")
+        if error:
+            return error
+        if step.get("actualHours") is not None:
+            error = _check_hours(step, "actualHours")
+            if error:
+                return error
+        if step.get("completedAt") and not isinstance(step["completedAt"], str):
+            return "completedAt must be a valid ISO date string"
+        if step.get("deliveryReceipt") and not isinstance(step["deliveryReceipt"], str):
+            return "deliveryReceipt must be a valid URL string"
+
+        if position is not None and step["status"] == "completed":
+            for key in self.requires[position]:
+                if not step.get(key):
+                    return f"{step['id']} step requires {key} when status is 'completed'"
+        return None
+
+    def evaluate(self, steps):
+        """
+        Validate `steps` and summarize them in one pass. `error` is the
+        client-facing message ("Invalid step: ..." or "Step progression
+        error: ...") of the first problem found.
+
+        Steps whose id is not in the template are validated and counted
+        towards progress but take no part in the ordering rules: a step can
+        only be completed once every earlier template step present is
+        completed, and started once the step right before it is.
+        """
+        statuses = [None] * len(self.steps)
+        names = [None] * len(self.steps)
+        error = None
+        completed_count = 0
+
+        for step in steps:
+            step_id = step.get("id") if isinstance(step, dict) else None
+            position = self.index.get(step_id) if isinstance(step_id, str) else None
+            if error is None:
+                error = self._check_step(step, position)
+            if error is not None:
+                continue
+            if step["status"] == "completed":
+                completed_count += 1
+            if position is not None:
+                statuses[position] = step["status"]
+                names[position] = step["name"]
+
+        if error is not None:
+            return StepEvaluation(False, f"Invalid step: {error}", 0, False, None)
+
+        # Ordering and the current step, over the template positions
+        first_open = None
+        for position, status in enumerate(statuses):
+            if status is None:
+                continue
+            if status == "completed":
+                if first_open is not None:
+                    error = f"Step progression error: Cannot complete '{names[position]}' before '{names[first_open]}' is completed"
+                    break
+            else:
+                if status == "in_progress" and position > 0 and statuses[position - 1] not in (None, "completed"):
+                    error = f"Step progression error: Cannot start '{names[position]}' before '{names[position - 1]}' is completed"
+                    break
+                if first_open is None:
+                    first_open = position
+
+        total = len(steps)
+        progress = min(100, max(0, int(completed_count / total * 100))) if total else 0
+        completed = bool(total) and completed_count == total
+        current_step = self.steps[first_open]["id"] if first_open is not None else None
+        return StepEvaluation(error is None, error, progress, completed, current_step)
+
+
+def compile_template(step_definitions, template_id=None, version=0, name=DEFAULT_TEMPLATE_NAME):
+    """Validate step definitions and build a CompiledTemplate; raises TemplateError."""
+    if not isinstance(step_definitions, list) or not step_definitions:
+        raise TemplateError("steps must be a non-empty array")
+
+    steps, seen = [], set()
+    for definition in step_definitions:
+        if not isinstance(definition, dict):
+            raise TemplateError("Each step must be an object")
+        step_id, step_name = definition.get("id"), definition.get("name")
+        if not step_id or not isinstance(step_id, str):
+            raise TemplateError("Each step needs a string id")
+        if step_id in seen:
+            raise TemplateError(f"Duplicate step id '{step_id}'")
+        if not step_name or not isinstance(step_name, str):
+            raise TemplateError(f"Step '{step_id}' needs a name")
+        error = _check_hours(definition, "estimatedHours") if "estimatedHours" in definition else None
+        if error:
+            raise TemplateError(f"Step '{step_id}': {error}")
+        requires = definition.get("requires") or []
+        if not isinstance(requires, list) or not all(isinstance(key, str) for key in requires):
+            raise TemplateError(f"Step '{step_id}': requires must be an array of strings")
+
+        seen.add(step_id)
+        steps.append({
+            "id": step_id,
+            "name": step_name,
+            "estimatedHours": definition.get("estimatedHours", 0),
+            "requires": requires,
+        })
+    return CompiledTemplate(template_id, version, name, steps)
+
+
+def default_template_steps():
+    """Step definitions of the built-in checklist (seed for the default template)."""
+    return [
+        {"id": step["id"], "name": step["name"], "estimatedHours": step["estimatedHours"],
+         "requires": DEFAULT_STEP_REQUIREMENTS.get(step["id"], [])}
+        for step in DEFAULT_DEPLOYMENT_STEPS
+    ]
+
+
+# Used when no template is stored at all
+BUILTIN_TEMPLATE = compile_template(default_template_steps())
+
+_compiled = {}  # template id -> CompiledTemplate of the latest version seen
+_compiled_lock = threading.Lock()
+
+
+def get_template(template_id=None):
+    """
+    Compiled template `template_id`, or the default one when None.
+
+    Costs one (id, version) lookup; the template is only read and compiled
+    again when its version changed. Falls back to the default template, then
+    to the built-in checklist.
+    """
+    row = DeploymentTemplate.get_version(template_id)
+    if row is None and template_id is not None:
+        logging.warning(f"[deployment_engine] Template {template_id} not found, using the default")
+        row = DeploymentTemplate.get_version(None)
+    if row is None:
+        return BUILTIN_TEMPLATE
+
+    template_id, version = row
+    compiled = _compiled.get(template_id)
+    if compiled is not None and compiled.version == version:
+        return compiled
+
+    template = DeploymentTemplate.get_by_id(template_id)
+    try:
+        compiled = compile_template(template.steps, template.id, template.version, template.name)
+    except (TemplateError, AttributeError) as error:
+        logging.error(f"[deployment_engine] Template {template_id} is invalid: {error}")
+        return BUILTIN_TEMPLATE
+    with _compiled_lock:
+        _compiled[template_id] = compiled
+    return compiled
+
+
+def get_site_template(site_id):
+    """Compiled template of a site (the default for new or unassigned sites)."""
+    template_id = None
+    if site_id:
+        template_id = db.session.query(Site.deployment_template_id).filter(Site.id == site_id).scalar()
+    return get_template(template_id)
+
+
+def ensure_default_template():
+    """Store the built-in checklist as the default template if there is none."""
+    try:
+        if DeploymentTemplate.get_version(None) is not None:
+            return None
+        template = DeploymentTemplate(DEFAULT_TEMPLATE_NAME, default_template_steps(), is_default=True)
+        return template.create_row()
+    except Exception as error:
+        db.session.rollback()
+        logging.warning(f"[deployment_engine] Could not create the default template: {error}")
+        return None
@@ -1,8 +1,10 @@
 """
 Deployment Page Utility Functions
 
-This module provides helper functions for managing deployment page data,
-including step validation, progress calculation, and default step initialization.
+This module provides helper functions for managing deployment page data:
+parsing the steps field, notes and installation field validation, and the
+built-in default steps. Step validation, ordering and progress are handled
+by the template-driven engine in deployment_engine.py.
 """
 
 import json
@@ -10,7 +12,7 @@ import logging
 from typing import List, Dict, Optional, Tuple
 
 
-# Default deployment steps
+# Default deployment steps (seed of the default DeploymentTemplate)
 DEFAULT_DEPLOYMENT_STEPS = [
     {
         "id": "hardware_delivery",
@@ -38,9 +40,6 @@ DEFAULT_DEPLOYMENT_STEPS = [
     }
 ]
 
-# Step order for validation
-STEP_ORDER = ["hardware_delivery", "software_installation", "network_setup", "system_testing"]
-
 # Valid step statuses
 VALID_STATUSES = ["pending", "in_progress", "completed", "blocked"]
 
@@ -90,140 +89,6 @@ def parse_steps_field(field_value) -> Optional[List[Dict]]:
     return None
 
 
-def validate_step(step: Dict) -> Tuple[bool, Optional[str]]:
-    """
-    Validate a single deployment step.
-    
-    Args:
-        step: Step dictionary
-        
-    Returns:
-        Tuple of (is_valid, error_message)
-    """
-    # Required fields
-    required_fields = ["id", "name", "status", "estimatedHours"]
-    for field in required_fields:
-        if field not in step:
-            return False, f"Step missing required field: {field}"
-    
-    # Validate status
-    if step["status"] not in VALID_STATUSES:
-        return False, f"Invalid status '{step['status']}'. Must be one of: {', '.join(VALID_STATUSES)}"
-    
-    # Validate estimatedHours
-    try:
-        estimated_hours = float(step["estimatedHours"])
-        if estimated_hours < 0:
-            return False, "estimatedHours must be a positive number"
-    except (ValueError, TypeError):
-        return False, "estimatedHours must be a valid number"
-    
-    # Validate actualHours if provided
-    if "actualHours" in step and step["actualHours"] is not None:
-        try:
-            actual_hours = float(step["actualHours"])
-            if actual_hours < 0:
-                return False, "actualHours must be a positive number"
-        except (ValueError, TypeError):
-            return False, "actualHours must be a valid number"
-    
-    # Validate completedAt if provided
-    if "completedAt" in step and step["completedAt"]:
-        if not isinstance(step["completedAt"], str):
-            return False, "completedAt must be a valid ISO date string"
-    
-    # Validate deliveryReceipt if provided
-    if "deliveryReceipt" in step and step["deliveryReceipt"]:
-        if not isinstance(step["deliveryReceipt"], str):
-            return False, "deliveryReceipt must be a valid URL string"
-    
-    # Special validation: hardware_delivery requires deliveryReceipt when completed
-    if step["id"] == "hardware_delivery" and step["status"] == "completed":
-        if not step.get("deliveryReceipt"):
-            return False, "hardware_delivery step requires deliveryReceipt when status is 'completed'"
-    
-    return True, None
-
-
-def validate_step_progression(steps: List[Dict]) -> Tuple[bool, Optional[str]]:
-    """
-    Validate that steps are completed in the correct order.
-    
-    Args:
-        steps: List of step dictionaries
-        
-    Returns:
-        Tuple of (is_valid, error_message)
-    """
-    # Create a map of step_id -> step
-    step_map = {step["id"]: step for step in steps}
-    
-    # Check each step in order
-    for i, step_id in enumerate(STEP_ORDER):
-        if step_id not in step_map:
-            continue  # Step not present, skip
-        
-        step = step_map[step_id]
-        
-        # If this step is completed, all previous steps must be completed
-        if step["status"] == "completed":
-            # Check all previous steps
-            for prev_step_id in STEP_ORDER[:i]:
-                if prev_step_id in step_map:
-                    prev_step = step_map[prev_step_id]
-                    if prev_step["status"] != "completed":
-                        return False, f"Cannot complete '{step['name']}' before '{prev_step['name']}' is completed"
-        
-        # If this step is in_progress, previous step should be completed (unless it's the first)
-        if step["status"] == "in_progress" and i > 0:
-            prev_step_id = STEP_ORDER[i - 1]
-            if prev_step_id in step_map:
-                prev_step = step_map[prev_step_id]
-                if prev_step["status"] != "completed":
-                    return False, f"Cannot start '{step['name']}' before '{prev_step['name']}' is completed"
-    
-    return True, None
-
-
-def calculate_progress(steps: List[Dict]) -> int:
-    """
-    Calculate deployment progress percentage based on completed steps.
-    
-    Args:
-        steps: List of step dictionaries
-        
-    Returns:
-        Progress percentage (0-100)
-    """
-    if not steps:
-        return 0
-    
-    completed_count = sum(1 for step in steps if step.get("status") == "completed")
-    total_count = len(steps)
-    
-    if total_count == 0:
-        return 0
-    
-    progress = int((completed_count / total_count) * 100)
-    return min(100, max(0, progress))  # Clamp between 0 and 100
-
-
-def are_all_steps_completed(steps: List[Dict]) -> bool:
-    """
-    Check if all deployment steps are completed.
-    
-    Args:
-        steps: List of step dictionaries
-        
-    Returns:
-        True if all steps are completed, False otherwise
-    """
-    if not steps:
-        return False
-    
-    return all(step.get("status") == "completed" for step in steps)
-
-
 def validate_notes_field(field_value) -> Tuple[bool, Optional[List[Dict]], Optional[str]]:
     """
     Validate the notes field value.
@@ -0,0 +1,133 @@
+"""
+Per-table generation counters.
+
+Every committed ORM write bumps the counter of each table it touched (see
+cache_hooks). Read endpoints derive their ETag / Last-Modified from the
+counters of the tables they read, so validating a request costs a counter
+lookup instead of re-running the query.
+
+Counters live next to the cache: in-process by default, in Redis when
+CACHE_BACKEND=redis so every worker sees the same generations. Each store has
+a random token that is part of the validator, so counters restarting from
+zero (new process, flushed Redis) can never reproduce an old ETag.
+
+In-process counters only see this process's writes, so with several workers
+or instances a worker could answer 304 for data another worker changed. They
+are only trusted for validators (`shared`) when SINGLE_WORKER=true says the
+app runs as exactly one process; otherwise conditional GETs are disabled
+unless the Redis backend is used.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+
+from .cache import CACHE_BACKEND, get_redis_client, redis
+
+
+# The app runs as one process (one gunicorn worker, one instance)
+SINGLE_WORKER = os.getenv("SINGLE_WORKER", "false").lower() == "true"
+
+
+class MemoryGenerations:
+    """Counters for a single process (correct with one gunicorn worker)."""
+
+    def __init__(self, shared=SINGLE_WORKER):
+        self.shared = shared
+        self.token = uuid.uuid4().hex[:12]
+        self._started = time.time()
+        self._counters = {}
+        self._modified = {}
+        self._lock = threading.Lock()
+
+    def bump(self, tables):
+        now = time.time()
+        with self._lock:
+            for table in tables:
+                self._counters[table] = self._counters.get(table, 0) + 1
+                self._modified[table] = now
+
+    def read(self, tables):
+        """Return (token, [counter per table], last_modified epoch seconds)."""
+        with self._lock:
+            counters = [self._counters.get(table, 0) for table in tables]
+            modified = max([self._modified.get(table, self._started) for table in tables] or [self._started])
+            return self.token, counters, modified
+
+
+class RedisGenerations:
+    """Counters shared by every worker through two Redis hashes."""
+
+    shared = True
+
+    def __init__(self, client, prefix="launchpad:generation"):
+        self.client = client
+        self._counter_key = f"{prefix}:counter"
+        self._modified_key = f"{prefix}:modified"
+        self._token_key = f"{prefix}:token"
+
+    def _token(self):
+        """Return (token, created_at); created on first use."""
+        token = self.client.get(self._token_key)
+        if token is None:
+            self.client.set(self._token_key, f"{uuid.uuid4().hex[:12]}:{time.time()}", nx=True)
+            token = self.client.get(self._token_key)
+        token = token.decode() if isinstance(token, bytes) else token
+        value, _, created_at = token.partition(":")
+        return value, float(created_at or 0)
+
+    def bump(self, tables):
+        now = time.time()
+        try:
+            pipe = self.client.pipeline()
+            for table in tables:
+                pipe.hincrby(self._counter_key, table, 1)
+                pipe.hset(self._modified_key, table, now)
+            pipe.execute()
+        except redis.RedisError as error:
+            logging.warning(f"[RedisGenerations.bump] {error}")
+
+    def read(self, tables):
+        try:
+            token, created_at = self._token()
+            pipe = self.client.pipeline()
+            pipe.hmget(self._counter_key, tables)
+            pipe.hmget(self._modified_key, tables)
+            counters, modified = pipe.execute()
+        except redis.RedisError as error:
+            logging.warning(f"[RedisGenerations.read] {error}")
+            return None
+
+        counters = [int(value or 0) for value in counters]
+        modified = max([float(value) for value in modified if value is not None] or [created_at])
+        return token, counters, modified
+
+
+_store = None
+_lock = threading.Lock()
+
+
+def get_generation_store():
+    global _store
+    with _lock:
+        if _store is None:
+            _store = RedisGenerations(get_redis_client()) if CACHE_BACKEND == "redis" else MemoryGenerations()
+        return _store
+
+
+def bump_generations(tables):
+    tables = sorted(set(tables))
+    if tables:
+        get_generation_store().bump(tables)
+
+
+def read_generations(tables):
+    """(token, counters, last_modified) for `tables`, or None if unavailable."""
+    return get_generation_store().read(list(tables))
+
+
+def generations_shared():
+    """Whether every process serving requests sees the same counters."""
+    return get_generation_store().shared
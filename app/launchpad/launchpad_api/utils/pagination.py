@@ -0,0 +1,60 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last row returned, serialized as URL-safe
+base64 JSON so clients treat it as an opaque token and pass it back via
+`?after=`.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _encode_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(*values):
+    """Build an opaque cursor from the sort key values of the last row."""
+    raw = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, size):
+    """
+    Decode a cursor produced by encode_cursor().
+
+    Raises ValueError for anything that is not a list of `size` values, so
+    callers can answer 400 instead of 500.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def parse_limit(limit, default=None):
+    """
+    Validate a ?limit= value. Returns `default` when absent and clamps to
+    MAX_PAGE_SIZE; raises ValueError for non-positive or non-numeric values.
+    """
+    if limit is None or limit == "":
+        return default
+    limit = int(limit)
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, MAX_PAGE_SIZE)
@@ -0,0 +1,55 @@
+"""
+Resolved user principals.
+
+Authentication resolves the caller (session cookie email or X-User-Id) to a
+small immutable Principal on every request. The result is cached in the
+"principal" namespace so it is shared across workers when Redis is enabled;
+entries are dropped by the cache hooks whenever the users row changes.
+"""
+
+import os
+from collections import namedtuple
+
+from ..db_models.user import User
+from .cache import get_cache, user_tag, USER_ANY_TAG
+
+
+Principal = namedtuple("Principal", ["id", "name", "email", "role"])
+
+principal_cache = get_cache(
+    "principal",
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_MAXSIZE", "1024")),
+    ttl=int(os.getenv("PRINCIPAL_CACHE_TTL", "300")),
+)
+
+
+def _to_principal(user):
+    if not user:
+        return None
+    return Principal(id=user.id, name=user.name, email=user.email, role=user.role)
+
+
+def _tags(principal):
+    return (user_tag(principal.id), USER_ANY_TAG)
+
+
+def get_principal_by_email(email):
+    """Principal for `email`, or None if no such user (misses are not cached)."""
+    if not email:
+        return None
+    return principal_cache.get_or_load(
+        ("email", email),
+        lambda: _to_principal(User.get_by_email(email)),
+        tags=_tags,
+    )
+
+
+def get_principal_by_id(user_id):
+    """Principal for `user_id`, or None if no such user (misses are not cached)."""
+    if user_id is None:
+        return None
+    return principal_cache.get_or_load(
+        ("id", int(user_id)),
+        lambda: _to_principal(User.get_by_id(int(user_id))),
+        tags=_tags,
+    )
@@ -4,44 +4,59 @@ from ..db_models.site import Site
 from ..db_models.page import Page
 from ..db_models.section import Section
 from ..db_models.fields import Field
+from .cache import site_cache, site_tag, SITE_ANY_TAG, SITE_LIST_TAG
+from sqlalchemy import select, union
+from collections import namedtuple
 import traceback
 import logging
 
 
-def get_all_site_details(siteid=None):
+# Plain tuples so results can be pickled into a shared (Redis) cache
+SiteDetailRow = namedtuple("SiteDetailRow", ["id", "status", "field_name", "field_value"])
 
+# Largest IN (...) list sent in one statement; longer id lists are chunked
+IN_CHUNK_SIZE = 500
+
+
+def chunked(values, size=IN_CHUNK_SIZE):
+    """Split `values` into lists of at most `size` items."""
+    values = list(values)
+    return [values[index:index + size] for index in range(0, len(values), size)]
+
+
+def get_all_site_details(siteid=None, site_ids=None, use_cache=True):
+    """Return one row per (site, general_info field) for the requested sites.
+
+    :param siteid: restrict to a single site
+    :param site_ids: restrict to a list of sites (ignored when siteid is set)
+    :param use_cache: set to False when the read must see the caller's
+        uncommitted changes (e.g. refreshing site_summary inside a write)
+    """
+    if not use_cache:
+        return _query_site_details(siteid, site_ids)
+
+    if siteid:
+        key = ("site-details", siteid)
+        tags = (site_tag(siteid), SITE_ANY_TAG)
+    elif site_ids is not None:
+        key = ("site-details", tuple(sorted(set(site_ids))))
+        tags = tuple(site_tag(site_id) for site_id in key[1]) + (SITE_ANY_TAG,)
+    else:
+        key = ("site-details", None)
+
+        def tags(rows):
+            return {site_tag(row.id) for row in rows} | {SITE_LIST_TAG, SITE_ANY_TAG}
+
+    return site_cache.get_or_load(key, lambda: _query_site_details(siteid, site_ids), tags=tags)
+
+
+def _query_site_details(siteid=None, site_ids=None):
 
     p = aliased(Page)
     sec = aliased(Section)
     f = aliased(Field)
     try:
-
-        if siteid:
-            query = (
-                db.session.query(
-                    Site.id,
-                    Site.status,
-                    f.field_name,
-                    f.field_value
-                )
-                .outerjoin(
-                    p,
-                    (p.site_id == Site.id) &
-                    (p.page_name == 'create_site')
-                )
-                .outerjoin(
-                    sec,
-                    (sec.page_id == p.id) &
-                    (sec.section_name == 'general_info')
-                )
-                .outerjoin(
-                    f,
-                    f.section_id == sec.id
-                )
-            ).filter(Site.id == siteid)
-
-        else:
-            query = (
+        query = (
             db.session.query(
                 Site.id,
                 Site.status,
@@ -64,9 +79,144 @@ def get_all_site_details(siteid=None):
             )
         )
 
-        result = query.all()
+        query = query.filter(Site.deleted_at.is_(None))
+        if siteid:
+            query = query.filter(Site.id == siteid)
+        elif site_ids is not None:
+            if not site_ids:
+                return []
+            query = query.filter(Site.id.in_(site_ids))
+
+        result = [SiteDetailRow(*row) for row in query.all()]
         return result
 
     except Exception as error:
         logging.error("Failed to create database:\n%s", traceback.format_exc())
-        return None
\ No newline at end of file
+        return None
+
+
+def get_page_rows(site_id, page_name):
+    """Fetch a site's page with all its sections and fields in one query.
+
+    Returns one (site_id, Page, Section, Field) row per field, outer joined so
+    that missing pieces come back as None:
+
+    - no rows: the site does not exist
+    - Page is None: the site has no page with this name
+    - Section is None: the page has no sections
+    - Field is None: that section has no fields
+
+    Rows are ordered by section then field id. Returns None on error.
+    """
+    try:
+        rows = (
+            db.session.query(Site.id, Page, Section, Field)
+            .select_from(Site)
+            .outerjoin(
+                Page,
+                (Page.site_id == Site.id) &
+                (Page.page_name == page_name)
+            )
+            .outerjoin(Section, Section.page_id == Page.id)
+            .outerjoin(Field, Field.section_id == Section.id)
+            .filter(Site.id == site_id, Site.deleted_at.is_(None))
+            .order_by(Section.id, Field.id)
+            .all()
+        )
+        return rows
+
+    except Exception as error:
+        logging.error("Failed to fetch page rows:\n%s", traceback.format_exc())
+        return None
+
+
+def get_page_rows_for_sites(site_ids, page_name, chunk_size=None):
+    """Fetch the same page, with sections and fields, for many sites at once.
+
+    Same row shape and outer-join semantics as get_page_rows(), filtered with
+    Site.id IN (...) instead of one query per site. Id lists longer than
+    `chunk_size` (default IN_CHUNK_SIZE) are split into several queries.
+    Rows are ordered by site, section then field id. Returns None on error.
+    """
+    try:
+        rows = []
+        for chunk in chunked(sorted(set(site_ids)), chunk_size or IN_CHUNK_SIZE):
+            rows.extend(
+                db.session.query(Site.id, Page, Section, Field)
+                .select_from(Site)
+                .outerjoin(
+                    Page,
+                    (Page.site_id == Site.id) &
+                    (Page.page_name == page_name)
+                )
+                .outerjoin(Section, Section.page_id == Page.id)
+                .outerjoin(Field, Field.section_id == Section.id)
+                .filter(Site.id.in_(chunk), Site.deleted_at.is_(None))
+                .order_by(Site.id, Section.id, Field.id)
+                .all()
+            )
+        return rows
+
+    except Exception as error:
+        logging.error("Failed to fetch page rows for sites:\n%s", traceback.format_exc())
+        return None
+
+
+def iter_site_page_rows(site_id, page_names=None, batch_size=500):
+    """Stream every page of a site with its sections and fields from one query.
+
+    Yields (site_id, Page, Section, Field) rows like get_page_rows(), ordered
+    by page, section then field id, fetched from the cursor `batch_size` rows
+    at a time so large sites are never fully materialized. No rows means the
+    site does not exist; a single row with Page None means it has no
+    (matching) pages.
+
+    :param page_names: optional list of page names to restrict to
+    """
+    page_join = Page.site_id == Site.id
+    if page_names:
+        page_join = page_join & Page.page_name.in_(page_names)
+
+    query = (
+        db.session.query(Site.id, Page, Section, Field)
+        .select_from(Site)
+        .outerjoin(Page, page_join)
+        .outerjoin(Section, Section.page_id == Page.id)
+        .outerjoin(Field, Field.section_id == Section.id)
+        .filter(Site.id == site_id, Site.deleted_at.is_(None))
+        .order_by(Page.id, Section.id, Field.id)
+        .yield_per(batch_size)
+    )
+    return iter(query)
+
+
+def get_changed_site_ids(since):
+    """Ids of sites whose site, page, section or field rows have
+    updated_at >= `since` (a naive UTC datetime).
+
+    One UNION of four range scans on the updated_at indexes, each mapped back
+    to its site id. Deleted sites (including soft deleted ones still being
+    purged) are not included; see SiteTombstone. Returns None on error.
+    """
+    try:
+        changed = union(
+            select(Site.id).where(Site.updated_at >= since),
+            select(Page.site_id).where(Page.updated_at >= since),
+            select(Page.site_id)
+            .join(Section, Section.page_id == Page.id)
+            .where(Section.updated_at >= since),
+            select(Page.site_id)
+            .join(Section, Section.page_id == Page.id)
+            .join(Field, Field.section_id == Section.id)
+            .where(Field.updated_at >= since),
+        ).subquery()
+        live = (
+            select(changed.c.id)
+            .join(Site, Site.id == changed.c.id)
+            .where(Site.deleted_at.is_(None))
+        )
+        return sorted(site_id for (site_id,) in db.session.execute(live))
+
+    except Exception as error:
+        logging.error("Failed to fetch changed sites:\n%s", traceback.format_exc())
+        return None
@@ -0,0 +1,181 @@
+"""
+Site Purge Worker
+
+Deleting a site is two steps:
+
+1. site_delete / site_bulk_delete soft delete it: site.deleted_at is set, its
+   site_summary row removed and a tombstone recorded in one short
+   transaction, so it disappears from listings, search and lookups at once.
+2. This worker then removes the site's rows in bounded chunks - fields,
+   sections, pages, approval actions (and undelivered audit outbox rows), approvals, procurement, go-live and
+   finally the site row - committing after every chunk. No transaction ever
+   touches more than PURGE_CHUNK_SIZE rows, so purging a large site never
+   holds long row locks on the shared field table.
+
+Purging is idempotent: a site whose purge was interrupted (restart, error)
+keeps deleted_at and is picked up again by resume() on startup.
+"""
+
+import logging
+import queue
+import threading
+import traceback
+
+from flask import current_app
+from sqlalchemy import select
+
+from ..db import db
+from ..db_models.site import Site
+from ..db_models.page import Page
+from ..db_models.section import Section
+from ..db_models.fields import Field
+from ..db_models.site_summary import SiteSummary
+from ..db_models.scoping_approval import ScopingApproval
+from ..db_models.approval_action import ApprovalAction
+from ..db_models.approval_audit_outbox import ApprovalAuditOutbox
+from ..db_models.procurement_data import ProcurementData
+from ..db_models.go_live_data import GoLiveData
+from .cache_hooks import record_change
+
+
+# Most rows deleted by one purge transaction
+PURGE_CHUNK_SIZE = 1000
+
+
+def _purge_steps(site_id):
+    """(model, query selecting the ids to delete) in dependency order."""
+    approval_ids = select(ScopingApproval.id).where(ScopingApproval.site_id == site_id)
+    return (
+        (Field, select(Field.id)
+            .join(Section, Section.id == Field.section_id)
+            .join(Page, Page.id == Section.page_id)
+            .where(Page.site_id == site_id)),
+        (Section, select(Section.id)
+            .join(Page, Page.id == Section.page_id)
+            .where(Page.site_id == site_id)),
+        (Page, select(Page.id).where(Page.site_id == site_id)),
+        (ApprovalAction, select(ApprovalAction.id).where(ApprovalAction.approval_id.in_(approval_ids))),
+        (ApprovalAuditOutbox, select(ApprovalAuditOutbox.id).where(ApprovalAuditOutbox.approval_id.in_(approval_ids))),
+        (ScopingApproval, approval_ids),
+        (ProcurementData, select(ProcurementData.id).where(ProcurementData.site_id == site_id)),
+        (GoLiveData, select(GoLiveData.id).where(GoLiveData.site_id == site_id)),
+    )
+
+
+def _delete_chunks(site_id, model, id_query, chunk_size):
+    """Delete the rows selected by `id_query`, chunk_size ids per transaction."""
+    table = model.__table__
+    deleted = 0
+    while True:
+        ids = [row_id for (row_id,) in db.session.execute(id_query.order_by(None).limit(chunk_size))]
+        if not ids:
+            return deleted
+        db.session.execute(table.delete().where(table.c.id.in_(ids)))
+        record_change(db.session, site_ids=[site_id], tables=(table.name,))
+        db.session.commit()
+        deleted += len(ids)
+
+
+def purge_site(site_id, chunk_size=None):
+    """
+    Remove a soft deleted site and everything that belongs to it.
+
+    :return: {table name: rows deleted}, or None if the site is not soft
+        deleted (never purged, or already gone)
+    """
+    chunk_size = chunk_size or PURGE_CHUNK_SIZE
+    try:
+        deleted_at = db.session.execute(
+            select(Site.deleted_at).where(Site.id == site_id)
+        ).scalar()
+        if deleted_at is None:
+            return None
+
+        counts = {}
+        # Approvals point at their previous version; unlink them so they can
+        # be deleted in any chunk order
+        db.session.execute(
+            ScopingApproval.__table__.update()
+            .where(ScopingApproval.site_id == site_id, ScopingApproval.previous_version_id.isnot(None))
+            .values(previous_version_id=None)
+        )
+        db.session.commit()
+
+        for model, id_query in _purge_steps(site_id):
+            counts[model.__tablename__] = _delete_chunks(site_id, model, id_query, chunk_size)
+
+        db.session.execute(SiteSummary.__table__.delete().where(SiteSummary.site_id == site_id))
+        counts[Site.__tablename__] = db.session.execute(
+            Site.__table__.delete().where(Site.id == site_id, Site.deleted_at.isnot(None))
+        ).rowcount
+        record_change(db.session, site_ids=[site_id], tables=(SiteSummary.__tablename__, Site.__tablename__))
+        db.session.commit()
+
+        logging.info(f"[purge_site] Purged site {site_id}: {counts}")
+        return counts
+
+    except Exception:
+        db.session.rollback()
+        logging.error(f"[purge_site] Failed to purge site {site_id}:\n{traceback.format_exc()}")
+        return None
+
+
+class SitePurgeWorker:
+    """Background thread purging soft deleted sites one at a time."""
+
+    def __init__(self):
+        self._app = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+
+    def enqueue(self, site_ids):
+        """Schedule `site_ids` (already soft deleted and committed) for purging."""
+        if self._app is None:
+            self._app = current_app._get_current_object()
+        for site_id in site_ids:
+            self._queue.put(site_id)
+        self._ensure_started()
+
+    def resume(self):
+        """Re-enqueue sites whose purge never finished (call on startup)."""
+        try:
+            site_ids = [site_id for (site_id,) in
+                        db.session.query(Site.id).filter(Site.deleted_at.isnot(None)).all()]
+        except Exception:
+            logging.warning(f"[SitePurgeWorker] Could not list pending purges:\n{traceback.format_exc()}")
+            return 0
+        if site_ids:
+            logging.info(f"[SitePurgeWorker] Resuming purge of {len(site_ids)} sites")
+            self.enqueue(site_ids)
+        return len(site_ids)
+
+    def join(self):
+        """Block until every queued site has been processed."""
+        self._queue.join()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="site-purge", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            site_id = self._queue.get()
+            try:
+                with self._app.app_context():
+                    try:
+                        purge_site(site_id)
+                    finally:
+                        db.session.remove()
+            except Exception:
+                logging.error(f"[SitePurgeWorker] Purge of site {site_id} failed:\n{traceback.format_exc()}")
+            finally:
+                self._queue.task_done()
+
+
+site_purge_worker = SitePurgeWorker()
@@ -0,0 +1,303 @@
+"""
+Site Search Index
+
+In-process inverted index over the create_site -> general_info fields that
+users search sites by (name, organization, unit code, assigned people),
+backing GET /site/search.
+
+The index is built from get_all_site_details() and kept current without
+re-reading everything:
+
+- commits made by this process are reported through cache_hooks.on_commit();
+  the sites they touched are marked dirty and re-read with one query before
+  the next search
+- before answering, the generation counters of the site tables are compared
+  with the ones the index was synced at plus the local commits since; any
+  other difference means another worker (or an unattributed local write)
+  changed something, and the sites written since the last sync are found
+  with get_changed_site_ids() / SiteTombstone.get_since() and re-read
+- a full rebuild only happens on first use, when the changed sites cannot be
+  determined, and every SEARCH_REBUILD_INTERVAL seconds to pick up row
+  deletes that leave no updated_at behind
+
+Database reads happen outside the index lock: a rebuild builds a new index
+and swaps it in, and only one thread syncs at a time while the others keep
+answering from the current index. Searching is then a handful of dict/bisect
+lookups under a lock.
+"""
+
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from ..db_models.site_tombstone import SiteTombstone
+from .queries import get_all_site_details, get_changed_site_ids
+from .site_summary import build_summary_columns
+from .generations import read_generations
+from .cache_hooks import on_commit
+from .cache import SITE_ANY_TAG
+
+
+# Searchable summary column -> weight of a match in it
+SEARCH_FIELDS = {
+    "site_name": 3,
+    "organization_name": 2,
+    "unit_code": 2,
+    "sector": 1,
+    "assigned_ops_manager": 1,
+    "assigned_deployment_engineer": 1,
+}
+
+# Columns returned for every hit
+RESULT_FIELDS = ("site_id", "status") + tuple(SEARCH_FIELDS)
+
+# Tables whose writes can change a search document
+TRACKED_TABLES = ("site", "page", "section", "field")
+
+# Sites changed up to this many seconds before the last sync are re-read
+# again, covering clock skew between workers and in-flight transactions
+SYNC_OVERLAP_SECONDS = 5
+
+# Full rebuild at least this often
+SEARCH_REBUILD_INTERVAL = 900
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    """Lowercase word tokens of `text`."""
+    if text is None:
+        return []
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+class SiteSearchIndex:
+    """Token -> site ids postings with prefix lookup over a sorted token list."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()  # one thread reads the database at a time
+        self._postings = defaultdict(set)  # token -> {site_id}
+        self._documents = {}               # site_id -> (result columns, {token: weight})
+        self._sorted_tokens = []
+        self._tokens_stale = False
+        self._built = False
+        self._dirty = set()
+        self._dirty_all = False
+        self._synced = None                # (token, counters) at last sync
+        self._synced_at = None             # utcnow() taken before the last sync read
+        self._built_at = 0.0
+        self._local_commits = Counter()    # table -> commits by this process since sync
+
+    # --- maintenance ---
+
+    def note_commit(self, tables, tags):
+        """cache_hooks.on_commit() listener: remember which sites changed."""
+        tables = set(tables) & set(TRACKED_TABLES)
+        if not tables:
+            return
+        with self._lock:
+            self._local_commits.update(tables)
+            for tag in tags:
+                if tag == SITE_ANY_TAG:
+                    self._dirty_all = True
+                elif tag.startswith("site:"):
+                    self._dirty.add(int(tag.split(":", 1)[1]))
+
+    def _remove(self, site_id):
+        document = self._documents.pop(site_id, None)
+        if document is None:
+            return
+        for token in document[1]:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.discard(site_id)
+                if not postings:
+                    del self._postings[token]
+                    self._tokens_stale = True
+
+    def _add(self, site_id, columns):
+        weights = {}
+        for column, weight in SEARCH_FIELDS.items():
+            for token in tokenize(columns.get(column)):
+                weights[token] = max(weight, weights.get(token, 0))
+
+        result = {key: columns.get(key) for key in RESULT_FIELDS if columns.get(key) is not None}
+        result["site_id"] = site_id
+        self._documents[site_id] = (result, weights)
+        for token in weights:
+            if token not in self._postings:
+                self._tokens_stale = True
+            self._postings[token].add(site_id)
+
+    def rebuild(self):
+        """
+        Re-read every site into a new index and swap it in. Returns the
+        number of indexed sites, or None on failure.
+        """
+        with self._lock:
+            local, dirty = Counter(self._local_commits), set(self._dirty)
+        started_at = datetime.utcnow()
+        generations = read_generations(TRACKED_TABLES)
+        rows = get_all_site_details(use_cache=False)
+        if rows is None:
+            return None
+
+        fresh = SiteSearchIndex()
+        for site_id, columns in build_summary_columns(rows).items():
+            fresh._add(site_id, columns)
+
+        with self._lock:
+            self._postings, self._documents = fresh._postings, fresh._documents
+            self._tokens_stale = True
+            self._built = True
+            self._built_at = time.time()
+            self._mark_synced(generations, started_at, local, dirty, everything=True)
+            logging.info(f"[SiteSearchIndex] Indexed {len(self._documents)} sites")
+            return len(self._documents)
+
+    def reindex(self, site_ids):
+        """Re-read `site_ids`; sites that no longer exist are dropped."""
+        site_ids = list(site_ids)
+        rows = get_all_site_details(site_ids=site_ids, use_cache=False)
+        if rows is None:
+            return False
+
+        summaries = build_summary_columns(rows)
+        with self._lock:
+            for site_id in site_ids:
+                self._remove(site_id)
+                if site_id in summaries:
+                    self._add(site_id, summaries[site_id])
+        return True
+
+    def _mark_synced(self, generations, started_at, local, dirty, everything=False):
+        """
+        Record a sync that read the database from `started_at` on. Only the
+        local commits / dirty sites it consumed are cleared; commits noted
+        while it ran are picked up by the next sync.
+        """
+        self._synced = (generations[0], generations[1]) if generations else None
+        self._synced_at = started_at
+        self._local_commits.subtract(local)
+        self._local_commits += Counter()  # drop counts that reached zero
+        self._dirty -= dirty
+        if everything:
+            self._dirty_all = False
+
+    def _changed_since_sync(self):
+        """Ids of sites written or deleted since the last sync, or None if unknown."""
+        if self._synced_at is None:
+            return None
+        since = self._synced_at - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        changed = get_changed_site_ids(since)
+        deleted = SiteTombstone.get_since(since)
+        if changed is None or deleted is None:
+            return None
+        return set(changed) | set(deleted)
+
+    def sync(self):
+        """Bring the index up to date with committed writes before a search."""
+        if not self._built:
+            # Nothing to answer from yet: wait for the first build
+            with self._sync_lock:
+                if not self._built:
+                    self.rebuild()
+            return
+
+        if not self._sync_lock.acquire(blocking=False):
+            # Another thread is syncing; answer from the current index
+            return
+        try:
+            if time.time() - self._built_at >= SEARCH_REBUILD_INTERVAL:
+                self.rebuild()
+                return
+
+            with self._lock:
+                local, dirty, dirty_all = Counter(self._local_commits), set(self._dirty), self._dirty_all
+                synced = self._synced
+            started_at = datetime.utcnow()
+            generations = read_generations(TRACKED_TABLES)
+
+            foreign = False
+            if generations is not None and synced is not None:
+                token, counters = generations[0], generations[1]
+                synced_token, synced_counters = synced
+                expected = [count + local[table] for table, count in zip(TRACKED_TABLES, synced_counters)]
+                foreign = token != synced_token or counters != expected
+
+            site_ids = dirty
+            if foreign or dirty_all:
+                # Someone wrote sites we were not told about: look them up
+                changed = self._changed_since_sync()
+                if changed is None:
+                    self.rebuild()
+                    return
+                site_ids = site_ids | changed
+
+            if site_ids and not self.reindex(site_ids):
+                return
+            with self._lock:
+                self._mark_synced(generations, started_at, local, dirty, everything=dirty_all)
+        finally:
+            self._sync_lock.release()
+
+    # --- queries ---
+
+    def _tokens_with_prefix(self, prefix):
+        if self._tokens_stale:
+            self._sorted_tokens = sorted(self._postings)
+            self._tokens_stale = False
+        start = bisect.bisect_left(self._sorted_tokens, prefix)
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            yield token
+
+    def search(self, query, limit=20):
+        """
+        Sites matching every term of `query`, best first.
+
+        Each term matches whole tokens and token prefixes ("acm" finds
+        "Acme"); whole-token matches and matches in heavier fields score
+        higher. Returns a list of result dicts with a `score`.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        self.sync()
+
+        with self._lock:
+            scores = None
+            for term in terms:
+                term_scores = {}
+                for token in self._tokens_with_prefix(term):
+                    boost = 2 if token == term else 1
+                    for site_id in self._postings[token]:
+                        score = self._documents[site_id][1][token] * boost
+                        if score > term_scores.get(site_id, 0):
+                            term_scores[site_id] = score
+
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {site_id: score + term_scores[site_id]
+                              for site_id, score in scores.items() if site_id in term_scores}
+                if not scores:
+                    return []
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            return [dict(self._documents[site_id][0], score=score) for site_id, score in ranked]
+
+    def stats(self):
+        with self._lock:
+            return {"sites": len(self._documents), "tokens": len(self._postings), "built": self._built}
+
+
+site_search_index = SiteSearchIndex()
+on_commit(site_search_index.note_commit)
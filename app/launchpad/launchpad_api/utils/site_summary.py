@@ -0,0 +1,339 @@
+"""
+Site Summary Projection Helpers
+
+Builds and maintains the `site_summary` table: one typed row per site derived
+from the create_site -> general_info fields and the site status. Writers call
+refresh_site_summary() before committing so the projection lands in the same
+transaction as the change that produced it.
+
+The deployment columns (progress, current_step) come from the step engine
+rather than the general_info fields: writers that evaluate a deployment
+checklist pass the evaluation to refresh_site_summary(), every other refresh
+leaves them as they are.
+"""
+
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, date
+
+from sqlalchemy import and_
+
+from ..db import db
+from ..db_models.site import Site
+from ..db_models.site_summary import SiteSummary
+from ..db_models.page import Page
+from ..db_models.section import Section
+from ..db_models.fields import Field
+from .queries import get_all_site_details
+from .cache_hooks import record_change
+from .deployment_engine import get_template
+from .deployment_utils import parse_steps_field
+
+
+# Status values as stored by the various writers -> canonical frontend value
+STATUS_MAP = {
+    "site-created": "Created",
+    "created": "Created",
+    "site_study_done": "site_study_done",
+    "site-study-done": "site_study_done",
+    "scoping_done": "scoping_done",
+    "scoping-done": "scoping_done",
+    "approved": "approved",
+    "procurement_done": "procurement_done",
+    "procurement-done": "procurement_done",
+    "deployed": "deployed",
+    "live": "live",
+}
+
+# general_info field_name (or its legacy alias) -> SiteSummary column
+FIELD_COLUMNS = {
+    "site_name": "site_name",
+    "organization_id": "organization_id",
+    "organization_name": "organization_name",
+    "org_name": "organization_name",
+    "organization_logo": "organization_logo",
+    "unit_code": "unit_code",
+    "unit_id": "unit_code",
+    "sector": "sector",
+    "target_live_date": "target_live_date",
+    "suggested_go_live": "suggested_go_live",
+    "assigned_ops_manager": "assigned_ops_manager",
+    "assigned_deployment_engineer": "assigned_deployment_engineer",
+}
+
+# general_info field names stored in a column of the same name
+SUMMARY_FIELDS = {field_name for field_name, column in FIELD_COLUMNS.items() if field_name == column}
+
+# Column widths, so long free-text values never fail the owning write
+COLUMN_LENGTHS = {
+    "site_name": 255,
+    "organization_id": 64,
+    "organization_name": 255,
+    "organization_logo": 512,
+    "unit_code": 100,
+    "sector": 100,
+    "suggested_go_live": 50,
+    "assigned_ops_manager": 255,
+    "assigned_deployment_engineer": 255,
+    "status": 50,
+    "current_step": 100,
+}
+
+# Columns set from a deployment checklist evaluation, not from general_info
+DEPLOYMENT_COLUMNS = ("progress", "current_step")
+
+
+def normalize_status(status):
+    """Map internal statuses to the canonical values used by the frontend."""
+    if not status:
+        return status
+
+    s = str(status).strip().lower()
+    return STATUS_MAP.get(s, status)
+
+
+def extract_display_value(value):
+    """
+    Normalize field values that might be stored as simple strings or small
+    JSON objects (e.g. {"value": "asda"}).
+    """
+    try:
+        if isinstance(value, dict):
+            # Common patterns used for field_value payloads
+            for key in ("value", "text", "label"):
+                if key in value:
+                    return value[key]
+        return value
+    except Exception:
+        return value
+
+
+def parse_field_value(raw_value):
+    """
+    Decode a stored field_value which might be:
+    1. Plain strings: "Site Name"
+    2. JSON-encoded strings: "\"Site Name\"" or "{\"value\": \"Site Name\"}"
+    3. Already parsed objects/dicts: {"value": "Site Name"}
+    """
+    if isinstance(raw_value, str):
+        try:
+            return json.loads(raw_value)
+        except (json.JSONDecodeError, ValueError):
+            return raw_value
+    return raw_value
+
+
+def _as_text(value, column):
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        value = json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+    return value[:COLUMN_LENGTHS.get(column, 255)]
+
+
+def _as_date(value):
+    """YYYY-MM-DD[...] value -> date; None when it cannot be parsed."""
+    if value is None or isinstance(value, date):
+        return value
+    text = str(value).strip()
+    if len(text) < 10:
+        return None
+    try:
+        return datetime.strptime(text[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def build_summary_columns(rows):
+    """
+    Pivot get_all_site_details() rows into {site_id: {column: value}}.
+
+    The returned dicts hold exactly the SiteSummary column values so they can be
+    fed to SiteSummary(...) or bulk_insert_mappings(). Fields without a column
+    of their own (and legacy aliases) are kept in "extra" under their
+    field_name, with the decoded value the EAV pivot used to return.
+    """
+    sites = defaultdict(lambda: {"extra": {}})
+
+    for row in rows or []:
+        columns = sites[row.id]
+        columns["site_id"] = row.id
+        columns["status"] = _as_text(normalize_status(row.status), "status")
+
+        field_name = getattr(row, "field_name", None)
+        if not field_name:
+            continue
+        if field_name not in SUMMARY_FIELDS:
+            columns["extra"][field_name] = parse_field_value(row.field_value)
+
+        column = FIELD_COLUMNS.get(field_name)
+        if not column:
+            continue
+        # The canonical field name wins over its legacy alias
+        if column in columns and column != field_name:
+            continue
+
+        value = extract_display_value(parse_field_value(row.field_value))
+        if column == "target_live_date":
+            columns[column] = _as_date(value)
+            if columns[column] is None and value not in (None, ""):
+                logging.warning(f"[build_summary_columns] Site {row.id}: target_live_date {value!r} "
+                                f"is not a YYYY-MM-DD date; kept as text only")
+                columns["extra"][field_name] = value
+        else:
+            columns[column] = _as_text(value, column)
+
+    return sites
+
+
+def deployment_columns(evaluation):
+    """SiteSummary deployment column values of a StepEvaluation."""
+    return {
+        "progress": evaluation.progress,
+        "current_step": _as_text(evaluation.current_step, "current_step"),
+    }
+
+
+def refresh_site_summary(site_id, deployment=None):
+    """
+    Recompute the summary row for one site inside the caller's transaction.
+
+    Pending ORM changes are autoflushed by the read, so calling this right
+    before db.session.commit() picks up the values being written. Raises on
+    failure so the caller rolls back the whole write.
+
+    :param deployment: StepEvaluation of the site's deployment checklist when
+        the write changed it; progress and current_step are kept otherwise
+    """
+    rows = get_all_site_details(site_id, use_cache=False)
+    if rows is None:
+        raise RuntimeError(f"Unable to read site details for site {site_id}")
+
+    summaries = build_summary_columns(rows)
+    columns = summaries.get(site_id)
+
+    if not columns:
+        # Site no longer exists; the FK cascade normally removes the row
+        SiteSummary.query.filter(SiteSummary.site_id == site_id).delete(synchronize_session=False)
+        return None
+
+    if deployment is not None:
+        columns.update(deployment_columns(deployment))
+
+    summary = SiteSummary.get_by_site_id(site_id)
+    if summary is None:
+        summary = SiteSummary(**columns)
+        db.session.add(summary)
+    else:
+        for column in SiteSummary.__table__.columns.keys():
+            if column in ("site_id", "updated_at"):
+                continue
+            if column in DEPLOYMENT_COLUMNS and deployment is None:
+                continue
+            setattr(summary, column, columns.get(column))
+    return summary
+
+
+def backfill_site_summaries():
+    """Create summary rows for every site that does not have one yet."""
+    try:
+        missing_ids = [
+            site_id for (site_id,) in
+            db.session.query(Site.id)
+            .outerjoin(SiteSummary, SiteSummary.site_id == Site.id)
+            .filter(SiteSummary.site_id.is_(None), Site.deleted_at.is_(None))
+            .all()
+        ]
+        if not missing_ids:
+            return 0
+
+        rows = get_all_site_details(site_ids=missing_ids, use_cache=False)
+        if rows is None:
+            return 0
+
+        mappings = list(build_summary_columns(rows).values())
+        db.session.bulk_insert_mappings(SiteSummary, mappings)
+        record_change(db.session, tables=(SiteSummary.__tablename__,))
+        db.session.commit()
+        logging.info(f"[backfill_site_summaries] Created {len(mappings)} site summary rows")
+        return len(mappings)
+    except Exception as error:
+        db.session.rollback()
+        logging.warning(f"[backfill_site_summaries] Failed: {error}")
+        return 0
+
+
+def backfill_summary_extra():
+    """
+    Fill the extra column of summary rows created before it existed, so
+    /site/all returns their other general_info fields again.
+    """
+    try:
+        site_ids = [site_id for (site_id,) in db.session.query(SiteSummary.site_id)
+                    .filter(SiteSummary.extra.is_(None)).all()]
+        if not site_ids:
+            return 0
+
+        rows = get_all_site_details(site_ids=site_ids, use_cache=False)
+        if rows is None:
+            return 0
+
+        summaries = build_summary_columns(rows)
+        mappings = [dict(site_id=site_id, extra=summaries[site_id]["extra"])
+                    for site_id in site_ids if site_id in summaries]
+        if not mappings:
+            return 0
+        db.session.bulk_update_mappings(SiteSummary, mappings)
+        record_change(db.session, site_ids=[mapping["site_id"] for mapping in mappings],
+                      tables=(SiteSummary.__tablename__,))
+        db.session.commit()
+        logging.info(f"[backfill_summary_extra] Set extra on {len(mappings)} site summary rows")
+        return len(mappings)
+    except Exception as error:
+        db.session.rollback()
+        logging.warning(f"[backfill_summary_extra] Failed: {error}")
+        return 0
+
+
+def backfill_deployment_progress():
+    """
+    Fill progress/current_step for sites whose checklist predates the
+    columns: evaluates every stored deployment_checklist steps field of a
+    summary row without progress against the site's template.
+    """
+    try:
+        rows = (
+            db.session.query(SiteSummary.site_id, Site.deployment_template_id, Field.field_value)
+            .join(Site, Site.id == SiteSummary.site_id)
+            .join(Page, and_(Page.site_id == Site.id, Page.page_name == "deployment"))
+            .join(Section, and_(Section.page_id == Page.id, Section.section_name == "deployment_checklist"))
+            .join(Field, and_(Field.section_id == Section.id, Field.field_name == "steps"))
+            .filter(SiteSummary.progress.is_(None), Site.deleted_at.is_(None))
+            .all()
+        )
+        if not rows:
+            return 0
+
+        mappings = []
+        for site_id, template_id, field_value in rows:
+            steps = parse_steps_field(field_value)
+            if not steps:
+                continue
+            evaluation = get_template(template_id).evaluate(steps)
+            if not evaluation.valid:
+                logging.warning(f"[backfill_deployment_progress] Site {site_id}: {evaluation.error}")
+                continue
+            mappings.append(dict(site_id=site_id, **deployment_columns(evaluation)))
+
+        if not mappings:
+            return 0
+        db.session.bulk_update_mappings(SiteSummary, mappings)
+        record_change(db.session, tables=(SiteSummary.__tablename__,))
+        db.session.commit()
+        logging.info(f"[backfill_deployment_progress] Set progress on {len(mappings)} site summary rows")
+        return len(mappings)
+    except Exception as error:
+        db.session.rollback()
+        logging.warning(f"[backfill_deployment_progress] Failed: {error}")
+        return 0
@@ -0,0 +1,13 @@
+-- Database Migration Script for Approval Audit Dead Letters
+-- Run this script in your GCP database if the column is not created automatically
+-- The application will attempt to add it on startup, but for existing
+-- databases you may need to run this script manually.
+
+-- Outbox rows that still fail after AUDIT_MAX_ATTEMPTS deliveries are parked
+-- with dead_lettered_at set (see launchpad_api/utils/approval_audit.py); the
+-- drainer skips them so they no longer block the rows behind them.
+ALTER TABLE approval_audit_outbox ADD COLUMN dead_lettered_at DATETIME NULL;
+CREATE INDEX idx_approval_audit_outbox_dead_lettered ON approval_audit_outbox (dead_lettered_at, id);
+
+-- Verify column was created
+SELECT 'approval_audit_outbox.dead_lettered_at column created successfully' AS status;
@@ -0,0 +1,27 @@
+-- Database Migration Script for the Approval Audit Outbox
+-- Run this script in your GCP database if the table is not created automatically
+-- The application will attempt to create it on startup, but for existing
+-- databases you may need to run this script manually.
+
+-- Approval actions are queued here in the same transaction as the approval
+-- change and moved to approval_actions in batches by the background drainer
+-- in launchpad_api/utils/approval_audit.py
+CREATE TABLE IF NOT EXISTS approval_audit_outbox (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  approval_id INT NOT NULL,
+  action VARCHAR(50) NOT NULL,
+  performed_by INT NOT NULL,
+  performed_by_role VARCHAR(50) NOT NULL,
+  performed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  comment TEXT NULL,
+  action_metadata JSON NULL,
+  attempts INT NOT NULL DEFAULT 0,
+  last_error TEXT NULL,
+  dead_lettered_at DATETIME NULL,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (approval_id) REFERENCES scoping_approvals(id) ON DELETE CASCADE,
+  INDEX idx_approval_audit_outbox_dead_lettered (dead_lettered_at, id)
+);
+
+-- Verify table was created
+SELECT 'approval_audit_outbox table created successfully' AS status;
@@ -0,0 +1,20 @@
+-- Database Migration Script for Compressed JSON Blobs
+-- scoping_approvals.scoping_data / cost_breakdown are now stored as LONGBLOB
+-- (marker byte + plain or compressed JSON, see
+-- launchpad_api/db_models/compressed_json.py). The ALTERs below must be
+-- applied before the new code writes approvals: a JSON column rejects the
+-- binary payload. The application runs them on startup as well. Existing JSON
+-- text stays readable after the type change; rewrite it compressed with:
+--
+--   cd app/launchpad && python -m launchpad_api.utils.blob_migration
+--
+-- (which also runs the ALTERs below if they have not been applied).
+-- field.field_value stays a JSON column; large values are rewritten into a
+-- compressed JSON envelope by the same tool.
+
+ALTER TABLE scoping_approvals MODIFY scoping_data LONGBLOB NOT NULL;
+ALTER TABLE scoping_approvals MODIFY cost_breakdown LONGBLOB NOT NULL;
+
+-- Verify the column types
+SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS
+WHERE TABLE_NAME = 'scoping_approvals' AND COLUMN_NAME IN ('scoping_data', 'cost_breakdown');
@@ -0,0 +1,15 @@
+-- Database Migration Script for Deployment Progress
+-- Run this script in your GCP database if the columns are not created automatically
+-- The application will attempt to add them on startup, but for existing
+-- databases you may need to run this script manually.
+
+-- Deployment checklist progress (0-100) and current step id per site, kept
+-- in sync by page_post / page_put and aggregated by GET /deployment/progress.
+-- Existing checklists are backfilled on application startup.
+ALTER TABLE site_summary ADD COLUMN progress SMALLINT NULL;
+ALTER TABLE site_summary ADD COLUMN current_step VARCHAR(100) NULL;
+CREATE INDEX ix_site_summary_progress ON site_summary (progress);
+CREATE INDEX idx_site_summary_current_step_progress ON site_summary (current_step, progress);
+
+-- Verify columns were created
+SELECT 'site_summary progress columns created successfully' AS status;
@@ -0,0 +1,25 @@
+-- Database Migration Script for Deployment Templates
+-- Run this script in your GCP database if the table is not created automatically
+-- The application will attempt to create it on startup, but for existing
+-- databases you may need to run this script manually.
+
+-- Deployment checklists are stored per template; the application seeds the
+-- built-in checklist as the default template on startup
+CREATE TABLE IF NOT EXISTS deployment_templates (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  name VARCHAR(255) NOT NULL UNIQUE,
+  description TEXT NULL,
+  steps JSON NOT NULL,
+  version INT NOT NULL DEFAULT 1,
+  is_default BOOLEAN NOT NULL DEFAULT FALSE,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  INDEX ix_deployment_templates_is_default (is_default)
+);
+
+-- Sites without a template use the default one
+ALTER TABLE site ADD COLUMN deployment_template_id INT NULL;
+ALTER TABLE site ADD CONSTRAINT fk_site_deployment_template FOREIGN KEY (deployment_template_id) REFERENCES deployment_templates(id) ON DELETE SET NULL;
+
+-- Verify table was created
+SELECT 'deployment_templates table created successfully' AS status;
@@ -0,0 +1,26 @@
+-- Database Migration Script for Dropping the Indexed Field Columns
+-- Run this script in your GCP database if the columns are not dropped automatically
+-- The application drops them on startup, but for existing databases you may
+-- need to run this script manually.
+
+-- The generated fv_* columns on field (and their indexes) added by the indexed
+-- field registry had no reader: GET /site/all filters and sorts on the
+-- site_summary columns instead. Dropping them removes five index updates from
+-- every field write.
+DROP INDEX idx_field_fv_site_name ON field;
+ALTER TABLE field DROP COLUMN fv_site_name;
+DROP INDEX idx_field_fv_organization_id ON field;
+ALTER TABLE field DROP COLUMN fv_organization_id;
+DROP INDEX idx_field_fv_organization_name ON field;
+ALTER TABLE field DROP COLUMN fv_organization_name;
+DROP INDEX idx_field_fv_sector ON field;
+ALTER TABLE field DROP COLUMN fv_sector;
+DROP INDEX idx_field_fv_target_live_date ON field;
+ALTER TABLE field DROP COLUMN fv_target_live_date;
+
+-- site_summary.sector backs the ?sector= filter of GET /site/all
+CREATE INDEX ix_site_summary_sector ON site_summary (sector);
+
+-- Verify the columns were dropped
+SELECT COLUMN_NAME FROM information_schema.COLUMNS
+WHERE TABLE_NAME = 'field' AND COLUMN_NAME LIKE 'fv\_%';
@@ -0,0 +1,24 @@
+-- Database Migration Script for Current Scoping Approvals
+-- Run this script in your GCP database if the column is not created automatically
+-- The application will attempt to add it on startup, but for existing
+-- databases you may need to run this script manually.
+
+-- is_latest flags the current approval of each site (highest version, then
+-- newest); kept up to date on submit/resubmit
+ALTER TABLE scoping_approvals ADD COLUMN is_latest BOOLEAN NOT NULL DEFAULT TRUE;
+CREATE INDEX idx_scoping_approvals_site_status ON scoping_approvals (site_id, status);
+CREATE INDEX idx_scoping_approvals_site_version ON scoping_approvals (site_id, version);
+CREATE INDEX idx_scoping_approvals_latest_site ON scoping_approvals (is_latest, site_id);
+
+-- Flag only the current approval of each site (MySQL 8 window function)
+UPDATE scoping_approvals
+SET is_latest = id IN (
+  SELECT id FROM (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY site_id ORDER BY version DESC, created_at DESC, id DESC) AS site_rank
+    FROM scoping_approvals
+  ) AS ranked
+  WHERE site_rank = 1
+);
+
+-- Verify column was created
+SELECT 'scoping_approvals.is_latest column created successfully' AS status;
@@ -0,0 +1,10 @@
+-- Database Migration Script for the Scoping Approvals Listing
+-- Run this script in your GCP database if the index is not created automatically
+-- The application will attempt to add it on startup, but for existing
+-- databases you may need to run this script manually.
+
+-- Keyset pagination of GET /scoping-approvals (newest first)
+CREATE INDEX idx_scoping_approvals_created_at_id ON scoping_approvals (created_at, id);
+
+-- Verify index was created
+SELECT 'idx_scoping_approvals_created_at_id index created successfully' AS status;
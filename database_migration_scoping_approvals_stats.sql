@@ -0,0 +1,10 @@
+-- Database Migration Script for Scoping Approval Counters
+-- Run this script in your GCP database if the index is not created automatically
+-- The application will attempt to add it on startup, but for existing
+-- databases you may need to run this script manually.
+
+-- Covers GET /scoping-approvals/stats (GROUP BY status, deployment_engineer_id, site_id)
+CREATE INDEX idx_scoping_approvals_status_engineer_site ON scoping_approvals (status, deployment_engineer_id, site_id);
+
+-- Verify index was created
+SELECT 'idx_scoping_approvals_status_engineer_site index created successfully' AS status;
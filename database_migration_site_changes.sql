@@ -0,0 +1,20 @@
+-- Database Migration Script for Site Change Feed (GET /site/changes)
+-- Run this script in your GCP database if tables are not created automatically
+-- The application will attempt to create these on startup, but for existing
+-- databases you may need to run this script manually.
+
+-- Tombstones for deleted sites, so delta sync clients can drop them
+CREATE TABLE IF NOT EXISTS site_tombstone (
+    site_id INT PRIMARY KEY,
+    deleted_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_site_tombstone_deleted_at (deleted_at)
+);
+
+-- updated_at range scans used to find changed sites
+CREATE INDEX ix_site_updated_at ON site (updated_at);
+CREATE INDEX ix_page_updated_at ON page (updated_at);
+CREATE INDEX ix_section_updated_at ON section (updated_at);
+CREATE INDEX ix_field_updated_at ON field (updated_at);
+
+-- Verify table was created
+SELECT 'site_tombstone table created successfully' AS status;
@@ -0,0 +1,13 @@
+-- Database Migration Script for Site Soft Delete
+-- Run this script in your GCP database if the column is not created automatically
+-- The application will attempt to add it on startup, but for existing
+-- databases you may need to run this script manually.
+
+-- Deleted sites are hidden immediately (deleted_at set) and their rows are
+-- purged in small chunks by the background worker in
+-- launchpad_api/utils/site_purge.py
+ALTER TABLE site ADD COLUMN deleted_at DATETIME NULL;
+CREATE INDEX ix_site_deleted_at ON site (deleted_at);
+
+-- Verify column was created
+SELECT 'site.deleted_at column created successfully' AS status;
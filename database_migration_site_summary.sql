@@ -0,0 +1,28 @@
+-- Database Migration Script for Site Summary
+-- Run this script in your GCP database if tables are not created automatically
+-- The application will attempt to create this table on startup and backfill rows
+-- for existing sites, but for existing databases you may need to run this script manually.
+
+-- Create site_summary table (one row per site, read by GET /site/all)
+CREATE TABLE IF NOT EXISTS site_summary (
+    site_id INT PRIMARY KEY,
+    site_name VARCHAR(255) NULL,
+    organization_id VARCHAR(64) NULL,
+    organization_name VARCHAR(255) NULL,
+    organization_logo VARCHAR(512) NULL,
+    unit_code VARCHAR(100) NULL,
+    sector VARCHAR(100) NULL,
+    target_live_date DATE NULL,
+    suggested_go_live VARCHAR(50) NULL,
+    assigned_ops_manager VARCHAR(255) NULL,
+    assigned_deployment_engineer VARCHAR(255) NULL,
+    status VARCHAR(50) NULL,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (site_id) REFERENCES site(id) ON DELETE CASCADE,
+    INDEX idx_site_summary_status (status),
+    INDEX idx_site_summary_organization_name (organization_name),
+    INDEX idx_site_summary_target_live_date (target_live_date)
+);
+
+-- Verify table was created
+SELECT 'site_summary table created successfully' AS status;
@@ -0,0 +1,12 @@
+-- Database Migration Script for Site Summary Extra Fields
+-- Run this script in your GCP database if the column is not created automatically
+-- The application will attempt to add it on startup, but for existing
+-- databases you may need to run this script manually.
+
+-- general_info fields without a site_summary column of their own (and the raw
+-- text of unparseable target_live_date values), returned by /site/all as
+-- before. Existing rows are backfilled on application startup.
+ALTER TABLE site_summary ADD COLUMN extra JSON NULL;
+
+-- Verify column was created
+SELECT 'site_summary.extra column created successfully' AS status;